@@ -0,0 +1,98 @@
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+# Implicit-feedback ALS: latent factors per customer and book, training sweeps, L2
+# regularization, and how much confidence each copy bought adds to a purchase
+ALS_FACTORS = int(os.environ.get('BOOKSTORE_RECOMMENDATION_ALS_FACTORS', 32))
+ALS_ITERATIONS = int(os.environ.get('BOOKSTORE_RECOMMENDATION_ALS_ITERATIONS', 15))
+ALS_REGULARIZATION = float(os.environ.get('BOOKSTORE_RECOMMENDATION_ALS_REGULARIZATION', 0.1))
+ALS_ALPHA = float(os.environ.get('BOOKSTORE_RECOMMENDATION_ALS_ALPHA', 10))
+
+# Conjugate gradient steps per least-squares update, and rows updated per block
+# (a block's working set is its purchases x factors)
+ALS_CG_STEPS = 3
+ALS_BLOCK_SIZE = 4096
+
+def confidence(user_item, alpha=ALS_ALPHA):
+    """Confidence weights (minus the baseline of 1) for every purchase in the matrix"""
+    weights = user_item.astype(np.float32, copy=True).tocsr()
+    weights.data *= alpha
+    return weights
+
+def solve(weights, fixed, rows, factors, regularization=ALS_REGULARIZATION, cg_steps=ALS_CG_STEPS,
+          block_size=ALS_BLOCK_SIZE):
+    """
+    Update factors[rows] towards their weighted least-squares solution with `fixed` held constant
+
+    For each row u this solves (F'F + F'(C_u - I)F + reg I) x_u = F'C_u p_u, where F
+    is the fixed side's factors, C_u the row's confidences and p_u its purchases, by
+    a few conjugate gradient steps from the current x_u. Every row of a block is
+    stepped at once, with F'F computed once and the per-row terms applied as
+    sparse products, so the cost is O(purchases x factors + rows x factors^2).
+
+    Args:
+        weights: CSR matrix of confidences minus 1, rows x fixed rows (see confidence())
+        fixed: Factors of the other side, one row per column of `weights`
+        rows: Rows of `weights` (and `factors`) to update
+        factors: Factors being solved for, updated in place
+        regularization: L2 penalty on the factors
+        cg_steps: Conjugate gradient steps per update
+        block_size: Rows updated together
+    """
+    gram = fixed.T @ fixed + regularization * np.eye(fixed.shape[1], dtype=fixed.dtype)
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        block = weights[block_rows]
+        entry_rows = np.repeat(np.arange(len(block_rows)), np.diff(block.indptr))
+        fixed_entries = fixed[block.indices]
+
+        def product(x):
+            # (F'F + reg I) x + F'(C - I)F x, touching only the purchased entries
+            along = np.einsum('ef,ef->e', x[entry_rows], fixed_entries) * block.data
+            return x @ gram + sp.csr_matrix((along, block.indices, block.indptr), shape=block.shape) @ fixed
+
+        x = factors[block_rows]
+        target = sp.csr_matrix((block.data + 1, block.indices, block.indptr), shape=block.shape) @ fixed
+        residual = target - product(x)
+        direction = residual.copy()
+        norms = np.einsum('uf,uf->u', residual, residual)
+        for _ in range(cg_steps):
+            curved = product(direction)
+            curvature = np.einsum('uf,uf->u', direction, curved)
+            step = np.divide(norms, curvature, out=np.zeros_like(norms), where=curvature > 0)
+            x += step[:, None] * direction
+            residual -= step[:, None] * curved
+            new_norms = np.einsum('uf,uf->u', residual, residual)
+            direction = residual + np.divide(new_norms, norms, out=np.zeros_like(norms), where=norms > 0)[:, None] * direction
+            norms = new_norms
+        factors[block_rows] = x
+
+def train(user_item, n_factors=ALS_FACTORS, iterations=ALS_ITERATIONS, regularization=ALS_REGULARIZATION,
+          alpha=ALS_ALPHA, seed=0):
+    """
+    Factorize an implicit-feedback interaction matrix by alternating least squares
+
+    Args:
+        user_item: CSR matrix of customers x books, quantities bought
+        n_factors: Latent factors per customer and book
+        iterations: Alternating sweeps over customers and books
+        regularization: L2 penalty on the factors
+        alpha: Confidence added per copy bought
+        seed: Seed for the initial factors
+
+    Returns:
+        (user_factors, item_factors) float32 arrays, so a customer's score for every
+        book is item_factors @ user_factors[row]
+    """
+    rng = np.random.default_rng(seed)
+    n_users, n_items = user_item.shape
+    user_factors = (rng.standard_normal((n_users, n_factors)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((n_items, n_factors)) * 0.01).astype(np.float32)
+    weights = confidence(user_item, alpha)
+    weights_t = weights.T.tocsr()
+    for _ in range(iterations):
+        solve(weights, item_factors, np.arange(n_users), user_factors, regularization)
+        solve(weights_t, user_factors, np.arange(n_items), item_factors, regularization)
+    return user_factors, item_factors
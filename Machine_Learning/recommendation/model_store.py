@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+# Where built models are kept: one directory per build, plus a CURRENT file naming the live one
+ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts')
+MODELS_DIR = os.environ.get('BOOKSTORE_RECOMMENDATION_MODELS', os.path.join(ARTIFACTS_DIR, 'models'))
+
+# Bumped whenever the set, meaning or layout of the saved arrays changes
+MODEL_FORMAT_VERSION = 2
+# Number of builds kept on disk (older ones are deleted after a successful save)
+KEEP_MODELS = 3
+
+class ModelArtifactError(Exception):
+    """A saved model is missing, from an incompatible format version, or corrupt"""
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _checksum(arrays):
+    return hashlib.sha256(''.join(arrays[name]['sha256'] for name in sorted(arrays)).encode()).hexdigest()
+
+def save_model(arrays, metadata, models_dir=MODELS_DIR):
+    """
+    Write a model as one .npy file per array plus a manifest, then make it current
+
+    The build is written to a hidden directory and renamed into place, and the
+    CURRENT pointer is replaced atomically, so a reader never sees a partial model.
+    Processes that have an older model mapped keep reading it until they reload.
+
+    Args:
+        arrays: Dictionary of array name -> numpy array (no object dtypes)
+        metadata: JSON-serializable values stored in the manifest (e.g. last_sale_id)
+        models_dir: Directory holding the builds
+
+    Returns:
+        Path of the new model directory
+    """
+    name = time.strftime('%Y%m%dT%H%M%S') + f"-{metadata.get('last_sale_id', 0)}"
+    path = os.path.join(models_dir, name)
+    tmp_path = os.path.join(models_dir, f".{name}.{os.getpid()}.tmp")
+    os.makedirs(tmp_path)
+
+    manifest_arrays = {}
+    for array_name, array in arrays.items():
+        file_path = os.path.join(tmp_path, array_name + '.npy')
+        np.save(file_path, np.ascontiguousarray(array))
+        manifest_arrays[array_name] = {
+            'dtype': np.asarray(array).dtype.str,
+            'shape': list(np.shape(array)),
+            'sha256': _sha256(file_path),
+        }
+    manifest = {
+        'format_version': MODEL_FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        **metadata,
+        'arrays': manifest_arrays,
+        'checksum': _checksum(manifest_arrays),
+    }
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+    current_tmp = os.path.join(models_dir, f".CURRENT.{os.getpid()}.tmp")
+    with open(current_tmp, 'w') as f:
+        f.write(name)
+    os.replace(current_tmp, os.path.join(models_dir, 'CURRENT'))
+
+    builds = sorted(entry for entry in os.listdir(models_dir) if not entry.startswith('.') and entry != 'CURRENT')
+    for old in builds[:-KEEP_MODELS]:
+        if old != name:
+            shutil.rmtree(os.path.join(models_dir, old), ignore_errors=True)
+    return path
+
+def current_model_path(models_dir=MODELS_DIR):
+    """Directory of the current model, or None if nothing has been built yet"""
+    try:
+        with open(os.path.join(models_dir, 'CURRENT')) as f:
+            return os.path.join(models_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+def load_model(path=None, verify=False):
+    """
+    Memory-map a saved model
+
+    Arrays are opened read-only with mmap, so loading costs a few page faults
+    rather than a copy, and every process mapping the same build shares its pages.
+
+    Args:
+        path: Model directory (the current model if omitted)
+        verify: Also check every file against its SHA-256 in the manifest
+
+    Returns:
+        (arrays, manifest), or None if no model has been built
+
+    Raises:
+        ModelArtifactError: If the model has another format version or fails validation
+    """
+    path = path or current_model_path()
+    if path is None:
+        return None
+    try:
+        with open(os.path.join(path, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ModelArtifactError(f"Unreadable model manifest in {path}: {e}")
+
+    if manifest.get('format_version') != MODEL_FORMAT_VERSION:
+        raise ModelArtifactError(
+            f"Model in {path} has format version {manifest.get('format_version')}, expected {MODEL_FORMAT_VERSION}"
+        )
+    if _checksum(manifest['arrays']) != manifest['checksum']:
+        raise ModelArtifactError(f"Model manifest in {path} does not match its checksum")
+
+    arrays = {}
+    for array_name, spec in manifest['arrays'].items():
+        file_path = os.path.join(path, array_name + '.npy')
+        if verify and _sha256(file_path) != spec['sha256']:
+            raise ModelArtifactError(f"{file_path} does not match its checksum")
+        try:
+            array = np.load(file_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            raise ModelArtifactError(f"Cannot map {file_path}: {e}")
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ModelArtifactError(f"{file_path} has dtype/shape {array.dtype.str}{array.shape}, manifest says "
+                                     f"{spec['dtype']}{tuple(spec['shape'])}")
+        arrays[array_name] = array
+    return arrays, manifest
@@ -0,0 +1,217 @@
+import os
+
+import numpy as np
+
+# Neighbor search used to build the customer neighbor index: 'exact' or 'lsh'
+NEIGHBOR_BACKEND = os.environ.get('BOOKSTORE_RECOMMENDATION_NEIGHBORS', 'exact')
+
+# Customers per block when computing similarities, to bound peak memory
+USER_CHUNK_SIZE = 2048
+
+# MinHash LSH: hash tables, min-hashes combined per table (more = smaller, purer buckets),
+# and the most customers compared from any one bucket (crowded buckets are sampled down)
+LSH_TABLES = int(os.environ.get('BOOKSTORE_RECOMMENDATION_LSH_TABLES', 16))
+LSH_HASHES = int(os.environ.get('BOOKSTORE_RECOMMENDATION_LSH_HASHES', 1))
+LSH_MAX_BUCKET = int(os.environ.get('BOOKSTORE_RECOMMENDATION_LSH_MAX_BUCKET', 64))
+
+def _top_k(cols, sims, k, ids=None):
+    """The k highest-similarity (col, sim) pairs, best first; ties by ids[col] (by column if ids is None)"""
+    if len(sims) > k:
+        # Partition out the k best, plus every entry tied with the k-th, so the
+        # tie order (not the partition) decides which tied entries make the cut
+        kth = -np.partition(-sims, k - 1)[k - 1]
+        keep = sims >= kth
+        cols, sims = cols[keep], sims[keep]
+    order = np.lexsort((cols if ids is None else ids[cols], -sims))[:k]
+    return cols[order], sims[order]
+
+class ExactNeighbors:
+    """
+    Exact cosine neighbors: every customer is compared with every customer who
+    shares a book with them. Cost grows with the number of co-buying pairs, which
+    for popular books approaches customers x customers.
+    """
+
+    name = 'exact'
+
+    def __init__(self, chunk_size=USER_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def fill(self, normalized, rows, neighbors, scores, ids=None):
+        """
+        Fill in the top-k most similar customers for the given matrix rows
+
+        Similarities are computed block by block as sparse products of the
+        L2-normalized interaction matrix, so memory is bounded by one block
+        and never by the full customers x customers matrix.
+
+        Args:
+            normalized: L2-row-normalized CSR interaction matrix
+            rows: Matrix rows whose neighbor lists are (re)computed
+            neighbors: (customers, k) int array, updated in place for `rows`
+            scores: (customers, k) float array, updated in place for `rows`
+            ids: Customer ID of each matrix row; equally similar customers are kept
+                lowest ID first (lowest row first if omitted)
+        """
+        k = neighbors.shape[1]
+        if k == 0:
+            return
+        normalized_t = normalized.T.tocsr()
+        for start in range(0, len(rows), self.chunk_size):
+            block_rows = rows[start:start + self.chunk_size]
+            block = (normalized[block_rows] @ normalized_t).tocsr()
+            for offset, row in enumerate(block_rows):
+                cols = block.indices[block.indptr[offset]:block.indptr[offset + 1]]
+                sims = block.data[block.indptr[offset]:block.indptr[offset + 1]]
+                keep = (cols != row) & (sims > 0)
+                cols, sims = _top_k(cols[keep], sims[keep], k, ids)
+                neighbors[row] = -1
+                scores[row] = 0
+                neighbors[row, :len(cols)] = cols
+                scores[row, :len(cols)] = sims
+
+# Most matrix cells (block customers x books) densified at once when scoring LSH candidates
+DENSE_BLOCK_CELLS = 1 << 24
+
+def _pair_similarities(normalized, block_rows, query, candidate):
+    """Dot product of row block_rows[query[i]] with row candidate[i], for every pair i"""
+    # The block's rows densified, so each of a candidate's entries is a direct lookup
+    dense = normalized[block_rows].toarray()
+    lengths = np.diff(normalized.indptr)[candidate]
+    pair = np.repeat(np.arange(len(candidate)), lengths)
+    entries = normalized.indptr[candidate][pair] + (np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+    products = dense[query[pair], normalized.indices[entries]] * normalized.data[entries]
+    return np.bincount(pair, weights=products, minlength=len(candidate))
+
+class LSHNeighbors:
+    """
+    Approximate cosine neighbors by MinHash locality-sensitive hashing
+
+    In each of `tables` hash tables, the books are put in a random order and a
+    customer is bucketed by the first of their books in that order (or by the
+    first `hashes` books under as many orders). Two customers share a bucket with
+    probability equal to the overlap of what they bought (its Jaccard index, to
+    the power `hashes`), so close neighbors almost surely meet in some table.
+    Only customers sharing a bucket are compared, exactly, and a crowded bucket
+    is sampled down to `max_bucket` customers, so the cost per customer is at
+    most tables x max_bucket comparisons however popular their books are.
+    """
+
+    name = 'lsh'
+
+    def __init__(self, tables=LSH_TABLES, hashes=LSH_HASHES, max_bucket=LSH_MAX_BUCKET,
+                 chunk_size=USER_CHUNK_SIZE, seed=0):
+        self.tables = tables
+        self.hashes = hashes
+        self.max_bucket = max_bucket
+        self.chunk_size = chunk_size
+        self.seed = seed
+
+    def _hash(self, normalized):
+        """(customers, tables) array of bucket codes"""
+        rng = np.random.default_rng(self.seed)
+        n_users, n_items = normalized.shape
+        lengths = np.diff(normalized.indptr)
+        nonempty = lengths > 0
+        codes = np.zeros((n_users, self.tables), dtype=np.uint64)
+        for t in range(self.tables):
+            for _ in range(self.hashes):
+                # Rank of each book in a random order; a customer's min-hash is their lowest-ranked book
+                ranks = rng.permutation(n_items)
+                min_hash = np.zeros(n_users, dtype=np.uint64)
+                min_hash[nonempty] = np.minimum.reduceat(ranks[normalized.indices], normalized.indptr[:-1][nonempty])
+                codes[:, t] = codes[:, t] * np.uint64(n_items + 1) + min_hash
+        # Customers without purchases would otherwise all share one bucket
+        codes[~nonempty] = np.iinfo(np.uint64).max
+        return codes
+
+    def fill(self, normalized, rows, neighbors, scores, ids=None):
+        """
+        Fill in the approximate top-k most similar customers for the given matrix rows
+
+        Args:
+            normalized: L2-row-normalized CSR interaction matrix
+            rows: Matrix rows whose neighbor lists are (re)computed
+            neighbors: (customers, k) int array, updated in place for `rows`
+            scores: (customers, k) float array, updated in place for `rows`
+            ids: Customer ID of each matrix row; equally similar customers are kept
+                lowest ID first (lowest row first if omitted)
+        """
+        k = neighbors.shape[1]
+        rows = np.asarray(rows, dtype=np.int64)
+        if k == 0 or len(rows) == 0:
+            return
+        n_users = normalized.shape[0]
+        chunk_size = max(1, min(self.chunk_size, DENSE_BLOCK_CELLS // max(normalized.shape[1], 1)))
+        codes = self._hash(normalized)
+
+        # Per table: customers sorted by bucket, in random order within a bucket so
+        # truncating a crowded bucket to max_bucket takes an unbiased sample
+        shuffle = np.random.default_rng(self.seed + 1).permutation(n_users)
+        tables = []
+        for t in range(self.tables):
+            order = np.lexsort((shuffle, codes[:, t]))
+            tables.append((order, codes[order, t]))
+
+        for start in range(0, len(rows), chunk_size):
+            block_rows = rows[start:start + chunk_size]
+
+            # (query offset, candidate row) pairs from every table's matching bucket
+            queries, candidates = [], []
+            for t, (order, sorted_codes) in enumerate(tables):
+                block_codes = codes[block_rows, t]
+                starts = np.searchsorted(sorted_codes, block_codes, side='left')
+                sizes = np.minimum(np.searchsorted(sorted_codes, block_codes, side='right') - starts,
+                                   self.max_bucket)
+                query = np.repeat(np.arange(len(block_rows)), sizes)
+                within = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+                queries.append(query)
+                candidates.append(order[starts[query] + within])
+            pairs = np.sort(np.concatenate(queries) * n_users + np.concatenate(candidates))
+            pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]  # Met in several tables
+            query, candidate = pairs // n_users, pairs % n_users
+            keep = candidate != block_rows[query]
+            query, candidate = query[keep], candidate[keep]
+
+            # Exact cosine similarity of each candidate pair (rows are unit length)
+            sims = _pair_similarities(normalized, block_rows, query, candidate)
+            keep = sims > 0
+            query, candidate, sims = query[keep], candidate[keep], sims[keep].astype(np.float32)
+
+            # Best k per query: order by query, then similarity, then ID (as in the exact backend).
+            # Positive float32s order like their bit patterns, so one integer key covers the first two;
+            # the pairs are already in (query, row) order, which settles ties when there are no IDs.
+            key = (query << 32) | (np.uint32(0xFFFFFFFF) - sims.view(np.uint32)).astype(np.int64)
+            order = np.argsort(key, kind='stable') if ids is None else np.lexsort((ids[candidate], key))
+            query, candidate, sims = query[order], candidate[order], sims[order]
+            first = np.searchsorted(query, np.arange(len(block_rows)))
+            rank = np.arange(len(query)) - first[query]
+            top = rank < k
+
+            neighbors[block_rows] = -1
+            scores[block_rows] = 0
+            neighbors[block_rows[query[top]], rank[top]] = candidate[top]
+            scores[block_rows[query[top]], rank[top]] = sims[top]
+
+# Available backends by configuration name
+NEIGHBOR_BACKENDS = {
+    ExactNeighbors.name: ExactNeighbors,
+    LSHNeighbors.name: LSHNeighbors,
+}
+
+def neighbor_backend(name=NEIGHBOR_BACKEND, **options):
+    """
+    Create the neighbor search backend configured under `name`
+
+    Args:
+        name: 'exact' or 'lsh'
+        **options: Backend parameters (e.g. tables, hashes, max_bucket for 'lsh')
+
+    Returns:
+        The backend instance
+    """
+    try:
+        backend = NEIGHBOR_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown neighbor backend {name!r}; expected one of {', '.join(NEIGHBOR_BACKENDS)}")
+    return backend(**options)
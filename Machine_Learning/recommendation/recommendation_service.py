@@ -1,8 +1,187 @@
-import sqlite3
+import os
+import threading
+import traceback
+from collections import namedtuple
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
 import pandas as pd
 from app.connection import get_db_connection
+from app.popularity import PopularityRankings, popularity_rankings
+from Machine_Learning.recommendation import factorization
+from Machine_Learning.recommendation.model_store import ModelArtifactError, load_model, save_model
+from Machine_Learning.recommendation.neighbor_search import NEIGHBOR_BACKEND, _top_k, neighbor_backend
+
+# Collaborative filtering model: 'neighbors' (user-user cosine neighbors) or 'als'
+# (implicit-feedback matrix factorization)
+COLLABORATIVE_MODEL = os.environ.get('BOOKSTORE_RECOMMENDATION_COLLABORATIVE', 'neighbors')
+COLLABORATIVE_MODELS = ('neighbors', 'als')
+
+# Number of most similar customers kept per customer in the neighbor index
+USER_NEIGHBORS = 20
+# Customers scored per matrix product by batch ALS recommendations
+FACTOR_BATCH_SIZE = 256
+
+# Trending window (days) whose bestsellers are recommended when nothing personal is
+# available; all-time bestsellers if unset
+FALLBACK_WINDOW = int(os.environ['BOOKSTORE_RECOMMENDATION_FALLBACK_WINDOW']) \
+    if os.environ.get('BOOKSTORE_RECOMMENDATION_FALLBACK_WINDOW') else None
+# Number of most similar books kept per book, and books per block when computing them
+BOOK_NEIGHBORS = 20
+BOOK_CHUNK_SIZE = 1024
+
+# Seconds between incremental refreshes, and how many refreshes between full rebuilds
+# (a full rebuild is the only way edits and deletions of existing sales are picked up)
+REFRESH_INTERVAL = float(os.environ.get('BOOKSTORE_RECOMMENDATION_REFRESH', 300))
+FULL_REBUILD_EVERY = int(os.environ.get('BOOKSTORE_RECOMMENDATION_FULL_REBUILD_EVERY', 12))
+
+SALES_QUERY = """
+    SELECT s.SaleID, s.BookID, s.CustomerID, c.Name as CustomerName, s.Date, s.Quantity
+    FROM Sales s
+    JOIN Customers c ON s.CustomerID = c.CustomerID
+    WHERE s.SaleID > ?
+    ORDER BY s.SaleID
+"""
+SALES_COLUMNS = ['sale_id', 'book_id', 'customer_id', 'customer_name', 'date', 'quantity']
+
+# Everything collaborative filtering reads, replaced as a whole so a request never
+# sees a half-applied refresh. Every field is a plain numpy array (or built from
+# them), so a snapshot can be saved and memory-mapped back as-is.
+ModelSnapshot = namedtuple('ModelSnapshot', [
+    'catalog',  # Catalog arrays for result assembly
+    'user_item_matrix',  # scipy CSR matrix, customers x books, summed quantities
+    'user_ids',  # Customer ID for each matrix row
+    'item_ids',  # Book ID for each matrix column
+    'user_index',  # Customer ID -> matrix row, -1 if unknown
+    'item_index',  # Book ID -> matrix column, -1 if unknown
+    'item_offsets',  # Catalog offset of each matrix column's book, -1 if it is no longer in the catalog
+    'user_neighbors',  # (customers, USER_NEIGHBORS) rows of the most similar customers, -1 padded
+    'user_neighbor_scores',  # Cosine similarity for each entry of user_neighbors
+    'user_factors',  # (customers, factors) ALS factors per matrix row; zero-width in neighbors mode
+    'item_factors',  # (books, factors) ALS factors per matrix column
+    'last_purchases',  # Book ID of each customer's most recent purchase, per matrix row
+    'last_purchase_dates',  # Date of that purchase
+    'last_sale_id',  # High-water mark: every sale up to this ID is in the matrix
+])
+
+# Books as parallel arrays, with `offsets` mapping a book ID straight to its position
+Catalog = namedtuple('Catalog', ['offsets', 'book_ids', 'titles', 'authors', 'prices'])
+
+# Content-based neighbor table: `index` maps a book ID to its row
+BookNeighbors = namedtuple('BookNeighbors', ['index', 'book_ids', 'neighbors', 'scores'])
+
+def _build_index(ids):
+    """Array mapping each ID to its position in `ids`, -1 for IDs not present"""
+    ids = np.asarray(ids, dtype=np.int64)
+    index = np.full(ids.max() + 1 if len(ids) else 0, -1, dtype=np.int64)
+    index[ids] = np.arange(len(ids))
+    return index
+
+def _lookup(index, ids):
+    """Position of each ID in an index built by _build_index, -1 for unknown IDs"""
+    ids = np.asarray(ids, dtype=np.int64)
+    in_range = (ids >= 0) & (ids < len(index))
+    positions = np.full(len(ids), -1, dtype=np.int64)
+    positions[in_range] = index[ids[in_range]]
+    return positions
+
+def _position(index, item_id):
+    return int(index[item_id]) if 0 <= item_id < len(index) else -1
+
+def _build_catalog(books_df):
+    book_ids = books_df['book_id'].to_numpy(dtype=np.int64)
+    return Catalog(
+        offsets=_build_index(book_ids),
+        book_ids=book_ids,
+        titles=books_df['title'].to_numpy(dtype=str),
+        authors=books_df['author'].to_numpy(dtype=str),
+        prices=books_df['price'].to_numpy(dtype=np.float64),
+    )
+
+def _recommendations(catalog, offsets, recommendation_type):
+    """Result dictionaries for the books at the given catalog offsets"""
+    return [
+        {
+            'book_id': book_id,
+            'title': title,
+            'author': author,
+            'price': price,
+            'recommendation_type': recommendation_type
+        }
+        for book_id, title, author, price in zip(
+            catalog.book_ids[offsets].tolist(), catalog.titles[offsets].tolist(),
+            catalog.authors[offsets].tolist(), catalog.prices[offsets].tolist()
+        )
+    ]
+
+def _last_purchases(sales_df):
+    """Each customer's most recent sale (latest date, then highest SaleID)"""
+    return sales_df.sort_values(['date', 'sale_id']).drop_duplicates('customer_id', keep='last')
+
+def _extend_ids(ids, index, new_ids):
+    """Append IDs not yet in `index`; returns new (ids, index) without modifying the old ones"""
+    new_ids = np.unique(np.asarray(new_ids, dtype=np.int64))
+    added = new_ids[_lookup(index, new_ids) < 0]
+    if len(added) == 0:
+        return ids, index
+    extended = np.full(max(len(index), added.max() + 1), -1, dtype=np.int64)
+    extended[:len(index)] = index
+    extended[added] = len(ids) + np.arange(len(added))
+    return np.concatenate([ids, added.astype(ids.dtype)]), extended
+
+def _neighbor_top_n(model, rows, n):
+    """Matrix columns of the n best books for each row by the similarity of the neighbors who bought them"""
+    # Only the rows of the batch and its neighbors are copied (and binarized), not the whole matrix
+    neighbors = model.user_neighbors[rows]
+    valid = neighbors >= 0
+    needed = np.unique(np.concatenate([neighbors[valid], rows]))
+    bought = model.user_item_matrix[needed]
+    bought.data[:] = 1
+    
+    # Batch x needed-rows matrix of neighbor similarities
+    weights = sp.csr_matrix(
+        (model.user_neighbor_scores[rows][valid], (np.nonzero(valid)[0], np.searchsorted(needed, neighbors[valid]))),
+        shape=(len(rows), len(needed))
+    )
+    
+    # Score every book by the similarity of the neighbors who bought it, minus books already owned
+    scores = (weights @ bought).tocsr()
+    scores = (scores - scores.multiply(bought[np.searchsorted(needed, rows)])).tocsr()
+    scores.eliminate_zeros()
+    scores.sort_indices()
+    
+    top_cols = []
+    for offset in range(len(rows)):
+        cols = scores.indices[scores.indptr[offset]:scores.indptr[offset + 1]]
+        col_scores = scores.data[scores.indptr[offset]:scores.indptr[offset + 1]]
+        in_catalog = model.item_offsets[cols] >= 0
+        cols, col_scores = cols[in_catalog], col_scores[in_catalog]
+        top_cols.append(cols[np.lexsort((model.item_ids[cols], -col_scores))[:n]])
+    return top_cols
+
+def _factor_top_n(model, rows, n):
+    """Matrix columns of the n best-scoring books for each row by factor dot product, skipping owned books"""
+    rows = np.asarray(rows, dtype=np.int64)
+    scores = model.user_factors[rows] @ model.item_factors.T
+    scores[:, model.item_offsets < 0] = -np.inf
+    
+    # Owned books straight from the CSR arrays (a sorted column range per row)
+    matrix = model.user_item_matrix
+    starts = matrix.indptr[rows]
+    lengths = matrix.indptr[rows + 1] - starts
+    within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    scores[np.repeat(np.arange(len(rows)), lengths), matrix.indices[np.repeat(starts, lengths) + within]] = -np.inf
+    
+    n = min(n, scores.shape[1])
+    if n == 0:
+        return [np.zeros(0, dtype=np.int64) for _ in rows]
+    
+    # Partition out the n best per row, then order them by score (ties by column)
+    top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.lexsort((top, -top_scores), axis=1)
+    top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+    return [row_top[np.isfinite(row_scores)] for row_top, row_scores in zip(top, top_scores)]
 
 class RecommendationService:
     """
@@ -10,56 +189,470 @@ class RecommendationService:
     and book characteristics.
     """
     
-    def __init__(self):
-        self.conn = get_db_connection()
-        self.user_item_matrix = None
-        self.book_features_matrix = None
-        self.books_df = None
-        self.sales_df = None
-        
-    def _load_data(self):
-        """Load necessary data from database"""
-        
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT BookID, Title, Author, Price FROM Books")
-        books = cursor.fetchall()
-        self.books_df = pd.DataFrame(books, columns=['book_id', 'title', 'author', 'price'])
-        
-        cursor.execute("""
-            SELECT s.SaleID, s.BookID, s.CustomerID, c.Name as CustomerName, s.Date, s.Quantity
-            FROM Sales s
-            JOIN Customers c ON s.CustomerID = c.CustomerID
-        """)
-        sales = cursor.fetchall()
-        self.sales_df = pd.DataFrame(sales, columns=['sale_id', 'book_id', 'customer_id', 'customer_name', 'date', 'quantity'])
-    
-    def _build_user_item_matrix(self):
-        """Build user-item interaction matrix for collaborative filtering"""
-        if self.sales_df is None:
-            self._load_data()
+    def __init__(self, conn=None, n_neighbors=USER_NEIGHBORS, neighbor_search=NEIGHBOR_BACKEND,
+                 collaborative=COLLABORATIVE_MODEL, popularity=None, fallback_window=FALLBACK_WINDOW):
+        if collaborative not in COLLABORATIVE_MODELS:
+            raise ValueError(f"Unknown collaborative model {collaborative!r}; expected one of {', '.join(COLLABORATIVE_MODELS)}")
+        self.conn = conn
+        self.collaborative = collaborative  # Collaborative model that builds train
+        self.n_neighbors = n_neighbors  # Similar customers kept per customer
+        # Backend that finds them: a name from NEIGHBOR_BACKENDS or a backend instance
+        self.neighbor_search = neighbor_backend(neighbor_search) if isinstance(neighbor_search, str) else neighbor_search
+        self.snapshot = None  # Current ModelSnapshot, built or loaded on first use
+        self.book_table = None  # Current BookNeighbors, built or loaded on first use
+        # Bestseller rankings (loaded on first use), and the one used for cold-start fallbacks
+        self.popularity = popularity if popularity is not None else PopularityRankings()
+        if fallback_window is not None and fallback_window not in self.popularity.windows:
+            raise ValueError(f"Fallback window {fallback_window} is not one of the trending windows {self.popularity.windows}")
+        self.fallback_window = fallback_window
+        self._lock = threading.Lock()  # Serializes builds/refreshes (and use of self.conn)
+        self._scheduler = None
+        self._stop_scheduler = threading.Event()
+    
+    def _load_books(self):
+        if self.conn is None:
+            self.conn = get_db_connection()
+        books = self.conn.execute("SELECT BookID, Title, Author, Price FROM Books").fetchall()
+        return pd.DataFrame(books, columns=['book_id', 'title', 'author', 'price'])
+    
+    def _load_sales(self, after_sale_id=0):
+        """Load sales with an ID above after_sale_id, oldest first"""
+        if self.conn is None:
+            self.conn = get_db_connection()
+        sales = self.conn.execute(SALES_QUERY, (after_sale_id,)).fetchall()
+        return pd.DataFrame(sales, columns=SALES_COLUMNS)
+    
+    def _model(self):
+        """Return the current snapshot, building it from the database on first use"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            with self._lock:
+                if self.snapshot is None:
+                    self.snapshot = self._build_snapshot(self._load_books(), self._load_sales())
+                snapshot = self.snapshot
+        return snapshot
+    
+    def _popularity(self):
+        """Return the bestseller rankings, loading them from the database on first use"""
+        if not self.popularity.loaded:
+            with self._lock:
+                if not self.popularity.loaded:
+                    if self.conn is None:
+                        self.conn = get_db_connection()
+                    self.popularity.load(self.conn)
+        return self.popularity
+    
+    def build(self, books_df=None, sales_df=None):
+        """
+        Fully rebuild the model and swap it in
+        
+        Args:
+            books_df: Catalog to build from (loaded from the database if omitted)
+            sales_df: Sales to build from (loaded from the database if omitted)
+        
+        Returns:
+            The new ModelSnapshot
+        """
+        with self._lock:
+            if sales_df is not None:
+                self.popularity.load_sales(sales_df)  # Otherwise the rankings come from the database
+            books_df = self._load_books() if books_df is None else books_df
+            sales_df = self._load_sales() if sales_df is None else sales_df
+            self.snapshot = self._build_snapshot(books_df, sales_df)
+            return self.snapshot
+    
+    def _build_snapshot(self, books_df, sales_df):
+        quantities = sales_df.groupby(['customer_id', 'book_id'])['quantity'].sum()
+        user_ids, user_rows = np.unique(quantities.index.get_level_values('customer_id'), return_inverse=True)
+        item_ids, item_cols = np.unique(quantities.index.get_level_values('book_id'), return_inverse=True)
+        user_ids, item_ids = user_ids.astype(np.int64), item_ids.astype(np.int64)
+        
+        user_item = sp.csr_matrix(
+            (quantities.to_numpy(dtype=np.float32), (user_rows, item_cols)),
+            shape=(len(user_ids), len(item_ids))
+        )
+        user_item.sort_indices()  # Each row's book columns as a sorted int array
+        
+        k = self._neighbor_count(len(user_ids))
+        neighbors = np.full((len(user_ids), k), -1, dtype=np.int32)
+        scores = np.zeros((len(user_ids), k), dtype=np.float32)
+        self.neighbor_search.fill(normalize(user_item, norm='l2', axis=1), np.arange(len(user_ids)), neighbors, scores,
+                                  user_ids)
+        
+        if self.collaborative == 'als':
+            user_factors, item_factors = factorization.train(user_item)
+        else:
+            user_factors = np.zeros((len(user_ids), 0), dtype=np.float32)
+            item_factors = np.zeros((len(item_ids), 0), dtype=np.float32)
+        
+        last = _last_purchases(sales_df)
+        last_rows = np.searchsorted(user_ids, last['customer_id'].to_numpy())
+        last_dates = last['date'].astype(str).to_numpy(dtype=str)
+        last_purchases = np.zeros(len(user_ids), dtype=np.int64)
+        last_purchase_dates = np.full(len(user_ids), '', dtype=last_dates.dtype)
+        last_purchases[last_rows] = last['book_id'].to_numpy()
+        last_purchase_dates[last_rows] = last_dates
+        
+        catalog = _build_catalog(books_df)
+        item_offsets = _lookup(catalog.offsets, item_ids)
+        return ModelSnapshot(
+            catalog=catalog,
+            user_item_matrix=user_item,
+            user_ids=user_ids,
+            item_ids=item_ids,
+            user_index=_build_index(user_ids),
+            item_index=_build_index(item_ids),
+            item_offsets=item_offsets,
+            user_neighbors=neighbors,
+            user_neighbor_scores=scores,
+            user_factors=user_factors,
+            item_factors=item_factors,
+            last_purchases=last_purchases,
+            last_purchase_dates=last_purchase_dates,
+            last_sale_id=int(sales_df['sale_id'].max()) if len(sales_df) else 0,
+        )
+    
+    def _neighbor_count(self, n_users):
+        """Width of the neighbor index: n_neighbors, capped by the number of other customers"""
+        if self.collaborative != 'neighbors':
+            return 0
+        return min(self.n_neighbors, max(n_users - 1, 0))
+    
+    def refresh(self):
+        """
+        Fold sales recorded since the last build/refresh into a new snapshot
+        
+        Only rows newer than the snapshot's SaleID high-water mark are read.
+        Customers who bought something, and customers whose neighbor list
+        included one of them, get their neighbor lists recomputed; every other
+        customer only has the changed customers merged into their existing
+        list, which gives the same result as a full rebuild (with the exact
+        neighbor backend; with LSH the lists stay as approximate as a rebuild's).
+        Equally similar customers are ranked by customer ID, not matrix row, since
+        a refresh appends new customers while a rebuild sorts them in.
+        
+        Returns:
+            Number of new sales applied
+        """
+        with self._lock:
+            if self.snapshot is None:
+                sales_df = self._load_sales()
+                self.snapshot = self._build_snapshot(self._load_books(), sales_df)
+                return len(sales_df)
+            
+            old = self.snapshot
+            new_sales = self._load_sales(old.last_sale_id)
+            if new_sales.empty:
+                return 0
+            
+            # New customers and books are appended after the existing rows and columns
+            user_ids, user_index = _extend_ids(old.user_ids, old.user_index, new_sales['customer_id'])
+            item_ids, item_index = _extend_ids(old.item_ids, old.item_index, new_sales['book_id'])
             
-        user_item = self.sales_df.pivot_table(
-            index='customer_id', 
-            columns='book_id', 
-            values='quantity', 
-            aggfunc='sum',
-            fill_value=0
+            k = self._neighbor_count(len(user_ids))
+            if k != old.user_neighbors.shape[1] or (self.collaborative == 'als') != (old.user_factors.shape[1] > 0):
+                # The neighbor lists themselves get wider (only happens on tiny datasets),
+                # or the snapshot came from the other collaborative model
+                self.snapshot = self._build_snapshot(self._load_books(), self._load_sales())
+                return len(new_sales)
+            
+            delta = new_sales.groupby(['customer_id', 'book_id'])['quantity'].sum()
+            delta_rows = _lookup(user_index, delta.index.get_level_values('customer_id'))
+            delta_cols = _lookup(item_index, delta.index.get_level_values('book_id'))
+            shape = (len(user_ids), len(item_ids))
+            
+            indptr = np.concatenate([old.user_item_matrix.indptr,
+                                     np.full(shape[0] - old.user_item_matrix.shape[0], old.user_item_matrix.indptr[-1])])
+            padded = sp.csr_matrix((old.user_item_matrix.data, old.user_item_matrix.indices, indptr), shape=shape)
+            user_item = (padded + sp.csr_matrix(
+                (delta.to_numpy(dtype=np.float32), (delta_rows, delta_cols)), shape=shape
+            )).tocsr()
+            user_item.sort_indices()
+            
+            neighbors = np.full((shape[0], k), -1, dtype=np.int32)
+            scores = np.zeros((shape[0], k), dtype=np.float32)
+            neighbors[:len(old.user_ids)] = old.user_neighbors
+            scores[:len(old.user_ids)] = old.user_neighbor_scores
+            
+            changed = np.unique(delta_rows)
+            if k:
+                normalized = normalize(user_item, norm='l2', axis=1)
+                
+                # Lists that contained a changed customer may lose it or see its score drop
+                recompute = np.union1d(changed, np.flatnonzero(np.isin(neighbors, changed).any(axis=1)))
+                self.neighbor_search.fill(normalized, recompute, neighbors, scores, user_ids)
+                
+                # Everyone else: merge the changed customers' new similarities into the list
+                changed_sims = (normalized @ normalized[changed].T).tocsr()
+                merge_rows = np.setdiff1d(np.flatnonzero(np.diff(changed_sims.indptr)), recompute, assume_unique=True)
+                for row in merge_rows:
+                    cols = changed[changed_sims.indices[changed_sims.indptr[row]:changed_sims.indptr[row + 1]]]
+                    sims = changed_sims.data[changed_sims.indptr[row]:changed_sims.indptr[row + 1]]
+                    valid = neighbors[row] >= 0
+                    cols, sims = _top_k(
+                        np.concatenate([neighbors[row][valid], cols]),
+                        np.concatenate([scores[row][valid], sims]),
+                        k, user_ids
+                    )
+                    neighbors[row, :len(cols)] = cols
+                    scores[row, :len(cols)] = sims
+            
+            # ALS: customers and books new to the matrix start from zero factors. Books that
+            # gained buyers are re-solved against the customer factors, then customers who
+            # bought something against the updated book factors.
+            user_factors = np.concatenate([
+                old.user_factors, np.zeros((shape[0] - len(old.user_ids), old.user_factors.shape[1]), dtype=np.float32)
+            ])
+            item_factors = np.concatenate([
+                old.item_factors, np.zeros((shape[1] - len(old.item_ids), old.item_factors.shape[1]), dtype=np.float32)
+            ])
+            if user_factors.shape[1]:
+                weights = factorization.confidence(user_item)
+                factorization.solve(weights.T.tocsr(), user_factors, np.unique(delta_cols), item_factors)
+                factorization.solve(weights, item_factors, changed, user_factors)
+            
+            # A customer's latest purchase moves to a new sale unless that sale is backdated
+            last = _last_purchases(new_sales)
+            last_rows = _lookup(user_index, last['customer_id'])
+            last_dates = last['date'].astype(str).to_numpy(dtype=str)
+            added = shape[0] - len(old.user_ids)
+            last_purchases = np.concatenate([old.last_purchases, np.zeros(added, dtype=np.int64)])
+            last_purchase_dates = np.concatenate([old.last_purchase_dates, np.full(added, '', dtype=last_dates.dtype)])
+            newer = last_dates >= last_purchase_dates[last_rows]
+            last_purchases[last_rows[newer]] = last['book_id'].to_numpy()[newer]
+            last_purchase_dates[last_rows[newer]] = last_dates[newer]
+            
+            # New sales may reference books added since the last load
+            catalog = old.catalog
+            if (_lookup(catalog.offsets, new_sales['book_id'].unique()) < 0).any():
+                catalog = _build_catalog(self._load_books())
+            item_offsets = _lookup(catalog.offsets, item_ids)
+            
+            self.snapshot = ModelSnapshot(
+                catalog=catalog,
+                user_item_matrix=user_item,
+                user_ids=user_ids,
+                item_ids=item_ids,
+                user_index=user_index,
+                item_index=item_index,
+                item_offsets=item_offsets,
+                user_neighbors=neighbors,
+                user_neighbor_scores=scores,
+                user_factors=user_factors,
+                item_factors=item_factors,
+                last_purchases=last_purchases,
+                last_purchase_dates=last_purchase_dates,
+                last_sale_id=int(new_sales['sale_id'].max()),
+            )
+            return len(new_sales)
+    
+    def start_refresh_scheduler(self, interval=REFRESH_INTERVAL, full_rebuild_every=FULL_REBUILD_EVERY):
+        """
+        Apply new sales in a background thread now and then every `interval` seconds
+        
+        Reads keep using the previous snapshot until the new one is swapped in.
+        The bestseller rankings are reloaded on each run as well. A run that fails
+        is reported and retried on the next tick, so the thread never dies.
+        """
+        if self._scheduler is not None:
+            return
+        self._stop_scheduler.clear()
+        
+        def run():
+            ticks = 0
+            while True:
+                # Catch everything: an exception escaping here would end the thread silently.
+                # The rankings are reloaded even if the model refresh fails
+                try:
+                    if full_rebuild_every and ticks and ticks % full_rebuild_every == 0:
+                        self.build()
+                    else:
+                        self.refresh()
+                except Exception as e:
+                    print(f"Recommendation refresh failed: {type(e).__name__}: {e}")
+                    traceback.print_exc()
+                try:
+                    self.load_popularity()
+                except Exception as e:
+                    print(f"Bestseller rankings reload failed: {type(e).__name__}: {e}")
+                    traceback.print_exc()
+                if self._stop_scheduler.wait(interval):
+                    break
+                ticks += 1
+        
+        self._scheduler = threading.Thread(target=run, name='recommendation-refresh', daemon=True)
+        self._scheduler.start()
+    
+    def load_popularity(self):
+        """Reload the bestseller rankings from the database, picking up other processes' writes"""
+        with self._lock:
+            if self.conn is None:
+                self.conn = get_db_connection()
+            self.popularity.load(self.conn)
+    
+    def stop_refresh_scheduler(self):
+        if self._scheduler is None:
+            return
+        self._stop_scheduler.set()
+        self._scheduler.join()
+        self._scheduler = None
+    
+    def _build_book_features(self, books_df):
+        """Build the sparse, row-normalized book features matrix for content-based filtering"""
+        # Price scaled to [0, 1] so it doesn't drown out the author columns
+        prices = books_df['price'].to_numpy(dtype=np.float32)
+        price_range = prices.max() - prices.min() if len(prices) else 0
+        scaled_prices = (prices - prices.min()) / price_range if price_range > 0 else np.zeros_like(prices)
+        
+        # One-hot author encoding built directly as a sparse matrix (one column per author)
+        author_codes, _ = pd.factorize(books_df['author'])
+        n_books = len(books_df)
+        authors = sp.csr_matrix(
+            (np.ones(n_books, dtype=np.float32), (np.arange(n_books), author_codes)),
+            shape=(n_books, author_codes.max() + 1 if n_books else 0)
         )
-        self.user_item_matrix = user_item
-        return user_item
+        
+        book_features = sp.hstack([sp.csr_matrix(scaled_prices[:, None]), authors], format='csr')
+        return normalize(book_features, norm='l2', axis=1)
     
-    def _build_book_features(self):
-        """Build book features matrix for content-based filtering"""
-        if self.books_df is None:
-            self._load_data()
+    def build_book_neighbors(self, books_df=None, k=BOOK_NEIGHBORS, chunk_size=BOOK_CHUNK_SIZE):
+        """
+        Precompute the top-k most similar books for every book
+        
+        Similarities are computed for one block of books at a time against the
+        whole catalog, so peak memory is chunk_size x books rather than books x books.
+        
+        Args:
+            books_df: Catalog to build from (loaded from the database if omitted)
+            k: Number of neighbors kept per book
+            chunk_size: Number of books per block
+        
+        Returns:
+            The new BookNeighbors table
+        """
+        if books_df is None:
+            with self._lock:
+                books_df = self._load_books()
+        book_ids = books_df['book_id'].to_numpy(dtype=np.int64)
+        features = self._build_book_features(books_df)
+        features_t = features.T.tocsr()
+        n_books = features.shape[0]
+        k = min(k, max(n_books - 1, 0))
+        
+        neighbors = np.full((n_books, k), -1, dtype=np.int64)
+        scores = np.zeros((n_books, k), dtype=np.float32)
+        
+        for start in range(0, n_books if k else 0, chunk_size):
+            sims = (features[start:start + chunk_size] @ features_t).toarray()
+            rows = np.arange(sims.shape[0])
+            sims[rows, start + rows] = -np.inf  # A book is not its own neighbor
+            
+            # Partition out the k best, then order them by similarity (ties by catalog position)
+            top = np.sort(np.argpartition(-sims, k - 1, axis=1)[:, :k], axis=1)
+            top_sims = np.take_along_axis(sims, top, axis=1)
+            order = np.argsort(-top_sims, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
             
-        authors_dummies = pd.get_dummies(self.books_df['author'], prefix='author')
+            neighbors[start:start + len(rows)] = book_ids[top]
+            scores[start:start + len(rows)] = np.take_along_axis(top_sims, order, axis=1)
         
-        book_features = pd.concat([self.books_df[['book_id', 'price']], authors_dummies], axis=1)
-        book_features.set_index('book_id', inplace=True)
+        self.book_table = BookNeighbors(_build_index(book_ids), book_ids, neighbors, scores)
+        return self.book_table
+    
+    def save_model(self):
+        """
+        Persist the current model and book neighbor table as a new versioned build
         
-        self.book_features_matrix = book_features
-        return book_features
+        Returns:
+            Path of the saved model directory
+        """
+        model, books = self._model(), self.book_table
+        if books is None:
+            books = self.build_book_neighbors()
+        matrix = model.user_item_matrix
+        arrays = {
+            'catalog_book_ids': model.catalog.book_ids,
+            'catalog_titles': model.catalog.titles,
+            'catalog_authors': model.catalog.authors,
+            'catalog_prices': model.catalog.prices,
+            'user_item_data': matrix.data,
+            'user_item_indices': matrix.indices,
+            'user_item_indptr': matrix.indptr,
+            'user_ids': model.user_ids,
+            'item_ids': model.item_ids,
+            'user_neighbors': model.user_neighbors,
+            'user_neighbor_scores': model.user_neighbor_scores,
+            'user_factors': model.user_factors,
+            'item_factors': model.item_factors,
+            'last_purchases': model.last_purchases,
+            'last_purchase_dates': model.last_purchase_dates,
+            'book_neighbor_ids': books.book_ids,
+            'book_neighbors': books.neighbors,
+            'book_neighbor_scores': books.scores,
+        }
+        return save_model(arrays, {
+            'last_sale_id': model.last_sale_id,
+            'n_neighbors': self.n_neighbors,
+            'neighbor_search': self.neighbor_search.name,
+            'collaborative': self.collaborative,
+        })
+    
+    def load_model(self, path=None, verify=False):
+        """
+        Memory-map a saved model and make it current
+        
+        Only the small ID -> position indexes are rebuilt in memory; everything
+        else is read straight from the mapped files.
+        
+        Args:
+            path: Model directory (the current build if omitted)
+            verify: Check every file against its checksum first
+        
+        Returns:
+            True if a model was loaded, False if none has been built
+        """
+        loaded = load_model(path, verify=verify)
+        if loaded is None:
+            return False
+        arrays, manifest = loaded
+        
+        matrix = sp.csr_matrix(
+            (arrays['user_item_data'], arrays['user_item_indices'], arrays['user_item_indptr']),
+            shape=(len(arrays['user_ids']), len(arrays['item_ids'])), copy=False
+        )
+        catalog = Catalog(
+            offsets=_build_index(arrays['catalog_book_ids']),
+            book_ids=arrays['catalog_book_ids'],
+            titles=arrays['catalog_titles'],
+            authors=arrays['catalog_authors'],
+            prices=arrays['catalog_prices'],
+        )
+        item_offsets = _lookup(catalog.offsets, arrays['item_ids'])
+        snapshot = ModelSnapshot(
+            catalog=catalog,
+            user_item_matrix=matrix,
+            user_ids=arrays['user_ids'],
+            item_ids=arrays['item_ids'],
+            user_index=_build_index(arrays['user_ids']),
+            item_index=_build_index(arrays['item_ids']),
+            item_offsets=item_offsets,
+            user_neighbors=arrays['user_neighbors'],
+            user_neighbor_scores=arrays['user_neighbor_scores'],
+            user_factors=arrays['user_factors'],
+            item_factors=arrays['item_factors'],
+            last_purchases=arrays['last_purchases'],
+            last_purchase_dates=arrays['last_purchase_dates'],
+            last_sale_id=manifest['last_sale_id'],
+        )
+        book_table = BookNeighbors(
+            _build_index(arrays['book_neighbor_ids']), arrays['book_neighbor_ids'],
+            arrays['book_neighbors'], arrays['book_neighbor_scores']
+        )
+        with self._lock:
+            self.n_neighbors = manifest['n_neighbors']
+            self.collaborative = manifest['collaborative']
+            self.snapshot, self.book_table = snapshot, book_table
+        return True
     
     def get_collaborative_recommendations(self, customer_id, n=5):
         """
@@ -68,47 +661,102 @@ class RecommendationService:
         Args:
             customer_id: The ID of the customer to recommend books for
             n: Number of recommendations to return
-            
+        
         Returns:
             List of dictionaries containing book recommendations
         """
-        if self.user_item_matrix is None:
-            self._build_user_item_matrix()
-            
-        if customer_id not in self.user_item_matrix.index:
-            return self.get_popular_books(n)
-            
-        user_similarity = cosine_similarity(self.user_item_matrix)
-        user_similarity_df = pd.DataFrame(
-            user_similarity,
-            index=self.user_item_matrix.index,
-            columns=self.user_item_matrix.index
-        )
+        model = self._model()
+        row = _position(model.user_index, customer_id)
+        if row < 0:
+            return self._fallback(n)
         
-        similar_users = user_similarity_df[customer_id].sort_values(ascending=False)[1:6].index
+        if model.user_factors.shape[1]:
+            # ALS: one dot product with every book's factors, then a top-n partition
+            cols = _factor_top_n(model, [row], n)[0]
+            if len(cols) == 0:
+                return self._fallback(n)
+            return _recommendations(model.catalog, model.item_offsets[cols], 'collaborative_filtering')
         
-        customer_books = set(self.sales_df[self.sales_df['customer_id'] == customer_id]['book_id'])
+        # Only the precomputed neighbors' rows are touched, so the cost is O(k), not O(customers)
+        matrix = model.user_item_matrix
+        neighbor_rows = model.user_neighbors[row]
+        valid = neighbor_rows >= 0
+        neighbor_rows, weights = neighbor_rows[valid], model.user_neighbor_scores[row][valid]
         
-        recommended_books = []
-        for similar_user in similar_users:
-            similar_user_books = set(self.sales_df[self.sales_df['customer_id'] == similar_user]['book_id'])
-            new_books = similar_user_books - customer_books
-            recommended_books.extend(list(new_books))
+        starts, ends = matrix.indptr[neighbor_rows], matrix.indptr[neighbor_rows + 1]
+        if (ends - starts).sum() == 0:
+            return self._fallback(n)  # No customer shares a purchase with this one
+        candidate_cols = np.concatenate([matrix.indices[a:b] for a, b in zip(starts, ends)])
+        candidate_weights = np.repeat(weights, ends - starts)
         
-        recommended_books = list(set(recommended_books))[:n]
+        # Score each candidate book by the similarity of the neighbors who bought it
+        cols, inverse = np.unique(candidate_cols, return_inverse=True)
+        col_scores = np.bincount(inverse, weights=candidate_weights)
         
-        recommendations = []
-        for book_id in recommended_books:
-            book = self.books_df[self.books_df['book_id'] == book_id].iloc[0]
-            recommendations.append({
-                'book_id': int(book['book_id']),
-                'title': book['title'],
-                'author': book['author'],
-                'price': float(book['price']),
-                'recommendation_type': 'collaborative_filtering'
-            })
-            
-        return recommendations
+        # Drop books the customer already owns (a sorted int array) and books no longer in the catalog
+        owned = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+        keep = ~np.isin(cols, owned, assume_unique=True) & (model.item_offsets[cols] >= 0)
+        cols, col_scores = cols[keep], col_scores[keep]
+        if len(cols) == 0:
+            return self._fallback(n)  # The neighbors bought nothing new to this customer
+        
+        top = np.lexsort((model.item_ids[cols], -col_scores))[:n]
+        return _recommendations(model.catalog, model.item_offsets[cols[top]], 'collaborative_filtering')
+    
+    def get_batch_recommendations(self, customer_ids, n=5):
+        """
+        Collaborative filtering recommendations for many customers at once
+        
+        Every customer is scored in one sparse product of their neighbor weights
+        with the (binary) interaction matrix, or with the ALS model in one dense
+        product per FACTOR_BATCH_SIZE customers, rather than one call per
+        customer. Rankings match get_collaborative_recommendations.
+        
+        Args:
+            customer_ids: IDs of the customers to recommend books for
+            n: Number of recommendations per customer
+        
+        Returns:
+            Dictionary mapping each customer ID to a list of book recommendations
+        """
+        model = self._model()
+        customer_ids = list(dict.fromkeys(customer_ids))
+        positions = _lookup(model.user_index, customer_ids)
+        known = [customer_id for customer_id, row in zip(customer_ids, positions) if row >= 0]
+        rows = positions[positions >= 0]
+        
+        if model.user_factors.shape[1]:
+            # One dense product per batch of customers with every book's factors
+            top_cols = []
+            for start in range(0, len(rows), FACTOR_BATCH_SIZE):
+                top_cols.extend(_factor_top_n(model, rows[start:start + FACTOR_BATCH_SIZE], n))
+        else:
+            top_cols = _neighbor_top_n(model, rows, n)
+        
+        results = {}
+        for customer_id, cols in zip(known, top_cols):
+            if len(cols):
+                results[customer_id] = _recommendations(model.catalog, model.item_offsets[cols], 'collaborative_filtering')
+        
+        # Unknown customers and customers without neighbors get the popular books
+        popular = None
+        for customer_id in customer_ids:
+            if customer_id not in results:
+                popular = popular if popular is not None else self._fallback(n)
+                results[customer_id] = popular
+        return {customer_id: results[customer_id] for customer_id in customer_ids}
+    
+    def warm_up(self):
+        """Map the saved model if there is one, otherwise build everything from the database"""
+        try:
+            if self.snapshot is None and self.load_model():
+                return
+        except ModelArtifactError as e:
+            print(f"Ignoring saved recommendation model: {e}")
+        self._model()
+        self._popularity()
+        if self.book_table is None:
+            self.build_book_neighbors()
     
     def get_content_based_recommendations(self, book_id, n=5):
         """
@@ -117,66 +765,49 @@ class RecommendationService:
         Args:
             book_id: The ID of the book to find similar books for
             n: Number of recommendations to return
-            
+        
         Returns:
             List of dictionaries containing book recommendations
         """
-        if self.book_features_matrix is None:
-            self._build_book_features()
-            
-        if book_id not in self.book_features_matrix.index:
-            return self.get_popular_books(n)
-            
-        book_similarity = cosine_similarity(self.book_features_matrix)
-        book_similarity_df = pd.DataFrame(
-            book_similarity,
-            index=self.book_features_matrix.index,
-            columns=self.book_features_matrix.index
-        )
+        books = self.book_table
+        if books is None:
+            books = self.build_book_neighbors()
         
-        similar_books = book_similarity_df[book_id].sort_values(ascending=False)[1:n+1].index
-        
-        recommendations = []
-        for sim_book_id in similar_books:
-            book = self.books_df[self.books_df['book_id'] == sim_book_id].iloc[0]
-            recommendations.append({
-                'book_id': int(book['book_id']),
-                'title': book['title'],
-                'author': book['author'],
-                'price': float(book['price']),
-                'recommendation_type': 'content_based'
-            })
-            
-        return recommendations
+        row = _position(books.index, book_id)
+        if row < 0:
+            return self._fallback(n)
+        
+        # The table may predate deletions from the catalog
+        catalog = self._model().catalog
+        neighbors = books.neighbors[row]
+        offsets = _lookup(catalog.offsets, neighbors[neighbors >= 0])
+        return _recommendations(catalog, offsets[offsets >= 0][:n], 'content_based')
     
-    def get_popular_books(self, n=5):
+    def get_popular_books(self, n=5, window=None):
         """
-        Get most popular books based on sales quantity
+        Get the best-selling books, all-time or over a trending window
+        
+        Served from the in-memory rankings, which every sale written through the
+        API updates, so the cost is O(n) however many sales there are.
         
         Args:
             n: Number of recommendations to return
-            
+            window: Trending window in days (one of self.popularity.windows), or None for all-time
+        
         Returns:
             List of dictionaries containing book recommendations
         """
-        if self.sales_df is None or self.books_df is None:
-            self._load_data()
-            
-        book_popularity = self.sales_df.groupby('book_id')['quantity'].sum().sort_values(ascending=False)
-        top_books = book_popularity.index[:n]
-        
-        recommendations = []
-        for book_id in top_books:
-            book = self.books_df[self.books_df['book_id'] == book_id].iloc[0]
-            recommendations.append({
-                'book_id': int(book['book_id']),
-                'title': book['title'],
-                'author': book['author'],
-                'price': float(book['price']),
-                'recommendation_type': 'popularity_based'
-            })
-            
-        return recommendations
+        popularity = self._popularity()
+        if window is not None and window not in popularity.windows:
+            raise ValueError(f"Unknown trending window {window}; expected one of {popularity.windows}")
+        catalog = self._model().catalog
+        book_ids = popularity.top(n, window, keep=lambda book_id: _position(catalog.offsets, book_id) >= 0)
+        return _recommendations(catalog, _lookup(catalog.offsets, book_ids),
+                                'popularity_based' if window is None else 'trending')
+    
+    def _fallback(self, n):
+        """Recommendations for customers and books with nothing personal to go on"""
+        return self.get_popular_books(n, window=self.fallback_window)
     
     def get_personalized_recommendations(self, customer_id, n=5):
         """
@@ -185,24 +816,49 @@ class RecommendationService:
         Args:
             customer_id: The ID of the customer to recommend books for
             n: Number of recommendations to return
-            
+        
         Returns:
             List of dictionaries containing book recommendations
         """
-        if self.sales_df is None:
-            self._load_data()
-            
-        customer_purchases = self.sales_df[self.sales_df['customer_id'] == customer_id]
-        if customer_purchases.empty:
-            return self.get_popular_books(n)
+        model = self._model()
+        row = _position(model.user_index, customer_id)
+        if row < 0:
+            return self._fallback(n)
         
         collab_recs = self.get_collaborative_recommendations(customer_id, n=n//2)
         
-        last_book_purchased = customer_purchases.sort_values('date', ascending=False).iloc[0]['book_id']
+        last_book_purchased = int(model.last_purchases[row])
         content_recs = self.get_content_based_recommendations(last_book_purchased, n=n-len(collab_recs))
         
         recommendations = collab_recs + content_recs
         
         return recommendations
 
-recommendation_service = RecommendationService()
\ No newline at end of file
+recommendation_service = RecommendationService(popularity=popularity_rankings)
+
+if __name__ == "__main__":
+    import sys
+    import time
+    
+    if '--build' in sys.argv:
+        # Offline build from the database, e.g. nightly or after a bulk import
+        start = time.perf_counter()
+        service = RecommendationService()
+        service.build()
+        service.build_book_neighbors()
+        path = service.save_model()
+        print(f"Built model up to sale {service.snapshot.last_sale_id} in {time.perf_counter() - start:.2f} s: {path}")
+    elif '--verify' in sys.argv:
+        start = time.perf_counter()
+        service = RecommendationService()
+        try:
+            if not service.load_model(verify=True):
+                print("No saved model; run with --build first")
+                sys.exit(1)
+        except ModelArtifactError as e:
+            print(f"Invalid model: {e}")
+            sys.exit(1)
+        print(f"Model up to sale {service.snapshot.last_sale_id} verified and mapped in "
+              f"{time.perf_counter() - start:.3f} s")
+    else:
+        print("Usage: python -m Machine_Learning.recommendation.recommendation_service --build | --verify")
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from fastapi import Request
+from fastapi.responses import Response
+
+# Size and lifetime of the in-process GET response cache
+CACHE_MAX_ENTRIES = int(os.environ.get('BOOKSTORE_CACHE_MAX_ENTRIES', 256))
+CACHE_TTL = float(os.environ.get('BOOKSTORE_CACHE_TTL', 30))
+
+# Tables each route prefix reads from; a write to any of them invalidates the cached responses.
+# Sales responses embed book titles/prices and customer names, so they depend on all three.
+CACHE_DEPENDENCIES = {
+    '/books': ('books',),
+    '/customers': ('customers',),
+    '/sales': ('sales', 'books', 'customers'),
+    '/dashboard': ('sales', 'books', 'customers'),
+}
+
+# Response headers stored with a cached body and replayed on a hit
+CACHED_HEADERS = ('content-type', 'x-total-count', 'x-next-cursor')
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'headers', 'etag', 'expires', 'tags'])
+
+class ResponseCache:
+    """
+    LRU cache of serialized GET responses with TTLs and tag-based invalidation.
+
+    Each table tag has a generation counter. A response is only stored if none
+    of its tags were invalidated while it was being computed, so a write that
+    races with a read can never leave a stale entry behind.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generations(self, tags):
+        with self._lock:
+            return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, headers, tags, generations):
+        """Store a response computed while the tags were at `generations`; returns its ETag"""
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        with self._lock:
+            if tuple(self._generations.get(tag, 0) for tag in tags) != generations:
+                return etag  # Invalidated mid-request; serve it but don't keep it
+            self._entries[key] = CachedResponse(body, headers, etag, time.monotonic() + self.ttl, tags)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self, *tags):
+        """Drop every cached response that depends on any of the given tables"""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            stale = [key for key, entry in self._entries.items() if not entry.tags.isdisjoint(tags)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Shared cache; the model write paths call response_cache.invalidate(<table>)
+response_cache = ResponseCache()
+
+def _dependencies(path):
+    if path.endswith('/export'):
+        return None  # Streams are never buffered into the cache
+    for prefix, tags in CACHE_DEPENDENCIES.items():
+        if path == prefix or path.startswith(prefix + '/'):
+            return frozenset(tags)
+    return None
+
+def _not_modified(request, etag):
+    return etag in (tag.strip() for tag in request.headers.get('if-none-match', '').split(','))
+
+async def cache_responses(request: Request, call_next):
+    """HTTP middleware serving GET responses from response_cache, with ETag/If-None-Match support"""
+    tags = _dependencies(request.url.path) if request.method == 'GET' else None
+    if tags is None:
+        return await call_next(request)
+
+    key = request.url.path + '?' + '&'.join(sorted(request.url.query.split('&')))
+    entry = response_cache.get(key)
+    if entry is not None:
+        if _not_modified(request, entry.etag):
+            return Response(status_code=304, headers={'ETag': entry.etag})
+        return Response(content=entry.body, headers={**entry.headers, 'ETag': entry.etag, 'X-Cache': 'HIT'})
+
+    generations = response_cache.generations(tags)
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b''.join([chunk async for chunk in response.body_iterator])
+    headers = {name: value for name, value in response.headers.items() if name in CACHED_HEADERS}
+    etag = response_cache.set(key, body, headers, tags, generations)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={'ETag': etag})
+
+    # Only CACHED_HEADERS are stored, but this response goes out with all of its own
+    async def replay():
+        yield body
+    response.body_iterator = replay()
+    response.headers['ETag'] = etag
+    response.headers['X-Cache'] = 'MISS'
+    return response
@@ -1,13 +1,145 @@
+import asyncio
 import sqlite3
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 
-# Function to get a connection to the database
-def get_db_connection():
-    
-    # Get the project root directory
-    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    db_path = os.path.join(root_dir, 'db', 'bookstore.db')
-    
-    conn = sqlite3.connect(db_path)
+# Get the project root directory
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# The database path can be overridden (e.g. for benchmarks against a scratch copy)
+DB_PATH = os.environ.get('BOOKSTORE_DB_PATH', os.path.join(ROOT_DIR, 'db', 'bookstore.db'))
+
+# PRAGMAs applied once when a connection is opened
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",      # Readers don't block the writer and vice versa
+    "PRAGMA synchronous = NORMAL",    # Safe with WAL, avoids an fsync per commit
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",     # ~16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",   # Map up to 256 MB of the file
+    "PRAGMA busy_timeout = 5000",
+)
+
+def _connect(db_path=DB_PATH):
+    # check_same_thread is off because pooled connections move between threads,
+    # but a connection is only ever used by the thread that checked it out
+    conn = sqlite3.connect(db_path, check_same_thread=False)
     conn.row_factory = sqlite3.Row  # To access columns by name (not just index)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
+
+class ConnectionPool:
+    """
+    Bounded pool of tuned SQLite connections.
+
+    Connections are created lazily up to max_size and handed out with
+    checkout/checkin semantics; callers block for up to `timeout` seconds
+    when every connection is in use.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_size=8, timeout=30.0):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_size)  # LIFO keeps hot connections warm
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Check a connection out of the pool, opening a new one if there is room"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._size < self.max_size:
+                self._size += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return _connect(self.db_path)
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError("Timed out waiting for a database connection")
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any uncommitted work"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A connection that can't roll back is replaced rather than reused
+            self.discard(conn)
+            return
+        self._idle.put_nowait(conn)
+
+    def discard(self, conn):
+        """Close a connection that should not be reused"""
+        with self._lock:
+            self._size -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection (e.g. on application shutdown)"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
+# Shared pool used by the model layer
+pool = ConnectionPool()
+
+# Dedicated threads for database work, one per pooled connection, so blocking
+# sqlite3 calls never run on the event loop and never wait on each other for a connection
+db_executor = ThreadPoolExecutor(max_workers=pool.max_size, thread_name_prefix='bookstore-db')
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking model function on the database executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, partial(func, *args, **kwargs))
+
+# Function to get a dedicated (unpooled) connection to the database,
+# for long-lived consumers such as the recommendation service
+def get_db_connection():
+    return _connect(DB_PATH)
+
+# Streaming exports read on dedicated connections, never pooled ones: a slow client can keep
+# an export open for minutes, and must not hold a pool slot (or its read snapshot) meanwhile.
+# At most MAX_EXPORTS run at once; a controller takes a slot before it starts streaming.
+MAX_EXPORTS = int(os.environ.get('BOOKSTORE_MAX_EXPORTS', 4))
+export_slots = threading.BoundedSemaphore(MAX_EXPORTS)
+
+@contextmanager
+def export_connection():
+    """A dedicated connection for one export, closed when the export ends"""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
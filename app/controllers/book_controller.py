@@ -1,48 +1,100 @@
 # book_controller.py
-from fastapi import APIRouter, HTTPException
-from app.models.book import get_all_books, get_book_by_id, add_book, update_book, delete_book
-from app.views.book_schema import Book, BookCreate
+from fastapi import APIRouter, Body, HTTPException, Query, Response
+from typing import Literal, Optional
+from app.connection import export_slots, run_db
+from app.models.book import (
+    get_all_books, count_books, iter_books, get_book_by_id, add_book, update_book, delete_book,
+    add_books, update_books, delete_books,
+)
+from app.views.book_schema import Book, BookCreate, BookBulkResult
+from app.views.bulk_schema import BulkError, BulkDeleteResult
+from app.services.export_service import ExportResponse
 
 router = APIRouter()
 
+# Export columns: (output field, database column)
+BOOK_EXPORT_FIELDS = [('id', 'BookID'), ('title', 'Title'), ('author', 'Author'), ('price', 'Price')]
+
+def _to_book(row):
+    return Book(id=row['BookID'], title=row['Title'], author=row['Author'], price=row['Price'])
+
 @router.post("/", response_model=Book)
 async def create_book(book: BookCreate):  # Changed from Book to BookCreate
-    # Add the book to the database
-    added_book_id = add_book(book.title, book.author, book.price)
-    # Get the newly added book by its ID
-    new_book = get_book_by_id(added_book_id)
-    if new_book is None:
-        raise HTTPException(status_code=404, detail="Book not found after creation")
+    # Add the book to the database; the inserted row comes back from the same statement
+    new_book = await run_db(add_book, book.title, book.author, book.price)
     # Return the book as a Pydantic model
-    return Book(id=new_book['BookID'], title=new_book['Title'], author=new_book['Author'], price=new_book['Price'])
+    return _to_book(new_book)
 
-# Get all books
+# Get books, optionally filtered and paginated by BookID cursor
 @router.get("/", response_model=list[Book])
-async def read_books():
-    books = get_all_books()
+async def read_books(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="Return books with an ID greater than this"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    author: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+):
+    books = await run_db(get_all_books, after_id=cursor, limit=limit, author=author, min_price=min_price, max_price=max_price)
+    response.headers["X-Total-Count"] = str(await run_db(count_books, author=author, min_price=min_price, max_price=max_price))
+    if limit is not None and len(books) == limit:
+        response.headers["X-Next-Cursor"] = str(books[-1]['BookID'])
     # Convert the query result to a list of Pydantic models
     return [Book(id=book['BookID'], title=book['Title'], author=book['Author'], price=book['Price']) for book in books]
 
+# Bulk endpoints write the whole list in one transaction and report per-item errors
+@router.post("/bulk", response_model=BookBulkResult)
+async def create_books_bulk(books: list[BookCreate]):
+    created, errors = await run_db(add_books, [(book.title, book.author, book.price) for book in books])
+    return BookBulkResult(
+        items=[_to_book(row) for row in created],
+        errors=[BulkError(index=index, detail=detail) for index, detail in errors],
+    )
+
+@router.put("/bulk", response_model=BookBulkResult)
+async def update_books_bulk(books: list[Book]):
+    updated, errors = await run_db(update_books, [(book.id, book.title, book.author, book.price) for book in books])
+    return BookBulkResult(
+        items=[_to_book(row) for row in updated],
+        errors=[BulkError(index=index, detail=detail) for index, detail in errors],
+    )
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_books_bulk(book_ids: list[int] = Body(...)):
+    deleted, not_found = await run_db(delete_books, book_ids)
+    return BulkDeleteResult(deleted=deleted, not_found=not_found)
+
+# Stream every matching book as NDJSON or CSV without building the full list in memory
+@router.get("/export")
+async def export_books(
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+    author: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+):
+    if not export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Too many exports in progress, try again shortly")
+    batches = iter_books(author=author, min_price=min_price, max_price=max_price)
+    return ExportResponse(batches, BOOK_EXPORT_FIELDS, format, 'books')
+
 # Get a single book by ID
 @router.get("/{book_id}", response_model=Book)
 async def read_book(book_id: int):
-    book = get_book_by_id(book_id)
+    book = await run_db(get_book_by_id, book_id)
     if book is None:
         raise HTTPException(status_code=404, detail="Book not found")
     return Book(id=book['BookID'], title=book['Title'], author=book['Author'], price=book['Price'])
 
 @router.put("/{book_id}", response_model=Book)
 async def update_book_details(book_id: int, book_update: BookCreate):  # Renamed parameter for clarity
-    updated = update_book(book_id, book_update.title, book_update.author, book_update.price)
-    updated_book = get_book_by_id(book_id)  # Get the updated book
+    updated_book = await run_db(update_book, book_id, book_update.title, book_update.author, book_update.price)
     if not updated_book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return Book(id=updated_book['BookID'], title=updated_book['Title'], author=updated_book['Author'], price=updated_book['Price'])
+    return _to_book(updated_book)
 
 @router.delete("/{book_id}")
 async def delete_book_details(book_id: int):
-    book = get_book_by_id(book_id)
-    if not book:
+    deleted = await run_db(delete_book, book_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Book not found")
-    delete_book(book_id)
     return {"message": "Book deleted successfully!"}
\ No newline at end of file
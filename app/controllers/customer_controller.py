@@ -1,45 +1,92 @@
-from fastapi import APIRouter, HTTPException
-from app.models.customer import get_all_customers, get_customer_by_id, add_customer, update_customer, delete_customer
-from app.views.customer_schema import Customer, CustomerCreate
+from fastapi import APIRouter, Body, HTTPException, Query, Response
+from typing import Literal, Optional
+from app.connection import export_slots, run_db
+from app.models.customer import (
+    get_all_customers, count_customers, iter_customers, get_customer_by_id, add_customer, update_customer, delete_customer,
+    add_customers, update_customers, delete_customers,
+)
+from app.views.customer_schema import Customer, CustomerCreate, CustomerBulkResult
+from app.views.bulk_schema import BulkError, BulkDeleteResult
+from app.services.export_service import ExportResponse
 
 router = APIRouter()
 
+# Export columns: (output field, database column)
+CUSTOMER_EXPORT_FIELDS = [('id', 'CustomerID'), ('name', 'Name'), ('email', 'Email')]
+
+def _to_customer(row):
+    return Customer(id=row['CustomerID'], name=row['Name'], email=row['Email'])
+
 @router.post("/", response_model=Customer)
 async def create_customer(customer: CustomerCreate):
-    # Add the customer to the database
-    added_customer_id = add_customer(customer.name, customer.email)
-    # Get the newly added customer by its ID
-    new_customer = get_customer_by_id(added_customer_id)
-    if new_customer is None:
-        raise HTTPException(status_code=404, detail="Customer not found after creation")
-    # Return the customer as a Pydantic model
-    return Customer(id=new_customer['CustomerID'], name=new_customer['Name'], email=new_customer['Email'])
+    # Add the customer to the database; the inserted row comes back from the same statement
+    new_customer = await run_db(add_customer, customer.name, customer.email)
+    return _to_customer(new_customer)
 
 @router.get("/", response_model=list[Customer])
-async def read_customers():
-    customers = get_all_customers()
+async def read_customers(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="Return customers with an ID greater than this"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+):
+    customers = await run_db(get_all_customers, after_id=cursor, limit=limit, name=name, email=email)
+    response.headers["X-Total-Count"] = str(await run_db(count_customers, name=name, email=email))
+    if limit is not None and len(customers) == limit:
+        response.headers["X-Next-Cursor"] = str(customers[-1]['CustomerID'])
     # Convert the query result to a list of Pydantic models
     return [Customer(id=customer['CustomerID'], name=customer['Name'], email=customer['Email']) for customer in customers]
 
+@router.post("/bulk", response_model=CustomerBulkResult)
+async def create_customers_bulk(customers: list[CustomerCreate]):
+    created, errors = await run_db(add_customers, [(customer.name, customer.email) for customer in customers])
+    return CustomerBulkResult(
+        items=[_to_customer(row) for row in created],
+        errors=[BulkError(index=index, detail=detail) for index, detail in errors],
+    )
+
+@router.put("/bulk", response_model=CustomerBulkResult)
+async def update_customers_bulk(customers: list[Customer]):
+    updated, errors = await run_db(update_customers, [(customer.id, customer.name, customer.email) for customer in customers])
+    return CustomerBulkResult(
+        items=[_to_customer(row) for row in updated],
+        errors=[BulkError(index=index, detail=detail) for index, detail in errors],
+    )
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_customers_bulk(customer_ids: list[int] = Body(...)):
+    deleted, not_found = await run_db(delete_customers, customer_ids)
+    return BulkDeleteResult(deleted=deleted, not_found=not_found)
+
+@router.get("/export")
+async def export_customers(
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+    name: Optional[str] = None,
+    email: Optional[str] = None,
+):
+    if not export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Too many exports in progress, try again shortly")
+    batches = iter_customers(name=name, email=email)
+    return ExportResponse(batches, CUSTOMER_EXPORT_FIELDS, format, 'customers')
+
 @router.get("/{customer_id}", response_model=Customer)
 async def read_customer(customer_id: int):
-    customer = get_customer_by_id(customer_id)
+    customer = await run_db(get_customer_by_id, customer_id)
     if customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
     return Customer(id=customer['CustomerID'], name=customer['Name'], email=customer['Email'])
 
 @router.put("/{customer_id}", response_model=Customer)
 async def update_customer_details(customer_id: int, customer_update: CustomerCreate):
-    updated = update_customer(customer_id, customer_update.name, customer_update.email)
-    if not updated:
+    updated_customer = await run_db(update_customer, customer_id, customer_update.name, customer_update.email)
+    if not updated_customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    updated_customer = get_customer_by_id(customer_id)
-    return Customer(id=updated_customer['CustomerID'], name=updated_customer['Name'], email=updated_customer['Email'])
+    return _to_customer(updated_customer)
 
 @router.delete("/{customer_id}")
 async def delete_customer_details(customer_id: int):
-    customer = get_customer_by_id(customer_id)
-    if not customer:
+    deleted = await run_db(delete_customer, customer_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Customer not found")
-    delete_customer(customer_id)
     return {"message": "Customer deleted successfully!"}
\ No newline at end of file
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Query
+from app.connection import run_db
+from app.models.dashboard import get_dashboard_summary
+from app.views.dashboard_schema import DashboardSummary, MonthlySales, TopBook, TopAuthor
+
+router = APIRouter()
+
+@router.get("/summary", response_model=DashboardSummary)
+async def dashboard_summary(top: int = Query(7, ge=1, le=100)):
+    summary = await run_db(get_dashboard_summary, top_n=top)
+    return DashboardSummary(
+        total_books=summary['total_books'],
+        total_customers=summary['total_customers'],
+        total_sales=summary['total_sales'],
+        total_revenue=summary['total_revenue'],
+        monthly_sales=[
+            MonthlySales(month=row['Month'], transactions=row['Transactions'], books_sold=row['BooksSold'], revenue=row['Revenue'])
+            for row in summary['monthly_sales']
+        ],
+        top_books=[
+            TopBook(book_id=row['BookID'], title=row['Title'], total_sold=row['TotalSold'], total_revenue=row['TotalRevenue'])
+            for row in summary['top_books']
+        ],
+        top_authors=[
+            TopAuthor(author=row['Author'], total_sold=row['TotalSold'], total_revenue=row['TotalRevenue'])
+            for row in summary['top_authors']
+        ],
+    )
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from app.connection import run_db
+from app.services.metrics_service import recommendation_metrics
+from app.views.recommendation_schema import (
+    Recommendation, BatchRecommendationRequest, CustomerRecommendations, RecommendationMetrics,
+)
+from Machine_Learning.recommendation.recommendation_service import recommendation_service
+
+router = APIRouter()
+
+# Personalized recommendations (collaborative + content-based) for a customer
+@router.get("/customers/{customer_id}", response_model=list[Recommendation])
+async def recommend_for_customer(customer_id: int, n: int = Query(5, ge=1, le=50)):
+    with recommendation_metrics.timer('customer'):
+        return await run_db(recommendation_service.get_personalized_recommendations, customer_id, n=n)
+
+# Books most similar to a given book
+@router.get("/books/{book_id}", response_model=list[Recommendation])
+async def recommend_similar_books(book_id: int, n: int = Query(5, ge=1, le=50)):
+    with recommendation_metrics.timer('book'):
+        return await run_db(recommendation_service.get_content_based_recommendations, book_id, n=n)
+
+# Best sellers of all time, or trending over the last `window` days (up to the latest sale)
+@router.get("/popular", response_model=list[Recommendation])
+async def recommend_popular_books(n: int = Query(5, ge=1, le=50), window: Optional[int] = Query(None, ge=1)):
+    if window is not None and window not in recommendation_service.popularity.windows:
+        windows = ", ".join(str(days) for days in recommendation_service.popularity.windows)
+        raise HTTPException(status_code=400, detail=f"window must be one of: {windows}")
+    with recommendation_metrics.timer('popular' if window is None else 'trending'):
+        return await run_db(recommendation_service.get_popular_books, n=n, window=window)
+
+# Collaborative recommendations for many customers, scored together in one pass
+@router.post("/batch", response_model=list[CustomerRecommendations])
+async def recommend_batch(request: BatchRecommendationRequest):
+    with recommendation_metrics.timer('batch'):
+        results = await run_db(recommendation_service.get_batch_recommendations, request.customer_ids, n=request.n)
+        return [
+            CustomerRecommendations(customer_id=customer_id, recommendations=recommendations)
+            for customer_id, recommendations in results.items()
+        ]
+
+@router.get("/metrics", response_model=RecommendationMetrics)
+async def recommendation_latency_metrics():
+    snapshot = recommendation_service.snapshot
+    return RecommendationMetrics(
+        model_loaded=snapshot is not None,
+        last_sale_id=snapshot.last_sale_id if snapshot is not None else 0,
+        endpoints=recommendation_metrics.summary(),
+    )
@@ -1,38 +1,64 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Query, Response
+from app.connection import export_slots, run_db
 from datetime import date as date_type
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 from app.models.sales import (
-    get_all_sales, get_sale_by_id, add_sale, update_sale, delete_sale,
+    get_all_sales, count_sales, iter_sales, get_sale_by_id, add_sale, update_sale, delete_sale,
+    add_sales, update_sales, delete_sales,
     get_sales_by_book, get_bestselling_authors, get_top_customers
 )
-from app.views.sales_schema import Sale, SaleCreate, SaleDetail
+from app.views.sales_schema import Sale, SaleCreate, SaleDetail, SaleUpdate, SaleBulkResult
+from app.views.bulk_schema import BulkError, BulkDeleteResult
+from app.services.export_service import ExportResponse
 
 router = APIRouter()
 
+# Export columns: (output field, database column)
+SALE_EXPORT_FIELDS = [
+    ('id', 'SaleID'), ('book_id', 'BookID'), ('book_title', 'BookTitle'), ('book_price', 'BookPrice'),
+    ('customer_id', 'CustomerID'), ('customer_name', 'CustomerName'), ('date', 'Date'),
+    ('quantity', 'Quantity'), ('total_amount', 'TotalAmount'),
+]
+
+def _to_sale_detail(row):
+    return SaleDetail(
+        id=row['SaleID'],
+        book_id=row['BookID'],
+        book_title=row['BookTitle'],
+        book_price=row['BookPrice'],
+        customer_id=row['CustomerID'],
+        customer_name=row['CustomerName'],
+        date=row['Date'],
+        quantity=row['Quantity'],
+        total_amount=row['TotalAmount']
+    )
+
 @router.post("/", response_model=SaleDetail)
 async def create_sale(sale: SaleCreate):
-    # Add the sale to the database
-    new_sale_id = add_sale(sale.book_id, sale.customer_id, sale.date, sale.quantity)
-    # Get the newly added sale with details
-    new_sale = get_sale_by_id(new_sale_id)
+    # Add the sale to the database; the row comes back joined with book and customer details
+    new_sale = await run_db(add_sale, sale.book_id, sale.customer_id, sale.date, sale.quantity)
     if new_sale is None:
-        raise HTTPException(status_code=404, detail="Sale not found after creation")
+        raise HTTPException(status_code=404, detail="Book or customer not found")
     # Return the sale with details
-    return SaleDetail(
-        id=new_sale['SaleID'],
-        book_id=new_sale['BookID'],
-        book_title=new_sale['BookTitle'],
-        book_price=new_sale['BookPrice'],
-        customer_id=new_sale['CustomerID'],
-        customer_name=new_sale['CustomerName'],
-        date=new_sale['Date'],
-        quantity=new_sale['Quantity'],
-        total_amount=new_sale['TotalAmount']
-    )
+    return _to_sale_detail(new_sale)
 
 @router.get("/", response_model=List[SaleDetail])
-async def read_sales():
-    sales = get_all_sales()
+async def read_sales(
+    response: Response,
+    cursor: Optional[int] = Query(None, description="Return sales with an ID greater than this"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    customer_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    start_date: Optional[date_type] = None,
+    end_date: Optional[date_type] = None,
+):
+    filters = dict(customer_id=customer_id, book_id=book_id, start_date=start_date, end_date=end_date)
+    sales = await run_db(get_all_sales, after_id=cursor, limit=limit, **filters)
+    total = await run_db(count_sales, first_page=cursor is None, **filters)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    if limit is not None and len(sales) == limit:
+        response.headers["X-Next-Cursor"] = str(sales[-1]['SaleID'])
     return [
         SaleDetail(
             id=sale['SaleID'],
@@ -47,9 +73,49 @@ async def read_sales():
         ) for sale in sales
     ]
 
+# Bulk endpoints for POS sync: one transaction per request, per-item errors
+@router.post("/bulk", response_model=SaleBulkResult)
+async def create_sales_bulk(sales: List[SaleCreate]):
+    created, errors = await run_db(
+        add_sales, [(sale.book_id, sale.customer_id, sale.date, sale.quantity) for sale in sales]
+    )
+    return SaleBulkResult(
+        items=[_to_sale_detail(row) for row in created],
+        errors=[BulkError(index=index, detail=detail) for index, detail in errors],
+    )
+
+@router.put("/bulk", response_model=SaleBulkResult)
+async def update_sales_bulk(sales: List[SaleUpdate]):
+    updated, errors = await run_db(
+        update_sales, [(sale.id, sale.book_id, sale.customer_id, sale.date, sale.quantity) for sale in sales]
+    )
+    return SaleBulkResult(
+        items=[_to_sale_detail(row) for row in updated],
+        errors=[BulkError(index=index, detail=detail) for index, detail in errors],
+    )
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_sales_bulk(sale_ids: List[int] = Body(...)):
+    deleted, not_found = await run_db(delete_sales, sale_ids)
+    return BulkDeleteResult(deleted=deleted, not_found=not_found)
+
+# Stream every matching sale as NDJSON or CSV without building the full list in memory
+@router.get("/export")
+async def export_sales(
+    format: Literal['ndjson', 'csv'] = 'ndjson',
+    customer_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    start_date: Optional[date_type] = None,
+    end_date: Optional[date_type] = None,
+):
+    if not export_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Too many exports in progress, try again shortly")
+    batches = iter_sales(customer_id=customer_id, book_id=book_id, start_date=start_date, end_date=end_date)
+    return ExportResponse(batches, SALE_EXPORT_FIELDS, format, 'sales')
+
 @router.get("/{sale_id}", response_model=SaleDetail)
 async def read_sale(sale_id: int):
-    sale = get_sale_by_id(sale_id)
+    sale = await run_db(get_sale_by_id, sale_id)
     if sale is None:
         raise HTTPException(status_code=404, detail="Sale not found")
     return SaleDetail(
@@ -66,45 +132,34 @@ async def read_sale(sale_id: int):
 
 @router.put("/{sale_id}", response_model=SaleDetail)
 async def update_sale_details(sale_id: int, sale_update: SaleCreate):
-    updated = update_sale(
+    updated_sale = await run_db(
+        update_sale,
         sale_id, sale_update.book_id, sale_update.customer_id, 
         sale_update.date, sale_update.quantity
     )
-    if not updated:
+    if not updated_sale:
         raise HTTPException(status_code=404, detail="Sale not found")
-    updated_sale = get_sale_by_id(sale_id)
-    return SaleDetail(
-        id=updated_sale['SaleID'],
-        book_id=updated_sale['BookID'],
-        book_title=updated_sale['BookTitle'],
-        book_price=updated_sale['BookPrice'],
-        customer_id=updated_sale['CustomerID'],
-        customer_name=updated_sale['CustomerName'],
-        date=updated_sale['Date'],
-        quantity=updated_sale['Quantity'],
-        total_amount=updated_sale['TotalAmount']
-    )
+    return _to_sale_detail(updated_sale)
 
 @router.delete("/{sale_id}")
 async def delete_sale_details(sale_id: int):
-    sale = get_sale_by_id(sale_id)
-    if not sale:
+    deleted = await run_db(delete_sale, sale_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Sale not found")
-    delete_sale(sale_id)
     return {"message": "Sale deleted successfully!"}
 
 # Analytics endpoints
 @router.get("/analytics/by-book", response_model=List[Dict[str, Any]])
-async def sales_by_book():
-    result = get_sales_by_book()
+async def sales_by_book(limit: Optional[int] = Query(None, ge=1)):
+    result = await run_db(get_sales_by_book, limit=limit)
     return [dict(row) for row in result]
 
 @router.get("/analytics/bestselling-authors", response_model=List[Dict[str, Any]])
-async def bestselling_authors():
-    result = get_bestselling_authors()
+async def bestselling_authors(limit: Optional[int] = Query(None, ge=1)):
+    result = await run_db(get_bestselling_authors, limit=limit)
     return [dict(row) for row in result]
 
 @router.get("/analytics/top-customers", response_model=List[Dict[str, Any]])
-async def top_customers():
-    result = get_top_customers()
+async def top_customers(limit: Optional[int] = Query(None, ge=1)):
+    result = await run_db(get_top_customers, limit=limit)
     return [dict(row) for row in result]
\ No newline at end of file
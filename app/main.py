@@ -1,11 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.connection import pool, run_db
+from app.migrations import apply_migrations
+from app.cache import cache_responses
 from app.controllers.book_controller import router as book_router
 from app.controllers.customer_controller import router as customer_router
 from app.controllers.sales_controller import router as sale_router
+from app.controllers.dashboard_controller import router as dashboard_router
+from app.controllers.recommendation_controller import router as recommendation_router
+from Machine_Learning.recommendation.recommendation_service import recommendation_service
 
 app = FastAPI(title="Bookstore Management System")
 
+# Serve repeated GETs from the in-process response cache. Registered first so it sits
+# inside CORS, which then adds its headers to cached responses and 304s too
+app.middleware("http")(cache_responses)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -13,11 +23,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag"],  # Pagination/cache headers readable from the browser
 )
 
 app.include_router(book_router, prefix="/books", tags=["books"])
 app.include_router(customer_router, prefix="/customers", tags=["customers"])
 app.include_router(sale_router, prefix="/sales", tags=["sales"])
+app.include_router(dashboard_router, prefix="/dashboard", tags=["dashboard"])
+app.include_router(recommendation_router, prefix="/recommendations", tags=["recommendations"])
+
+@app.on_event("startup")
+async def migrate_database():
+    with pool.connection() as conn:
+        apply_migrations(conn)
+
+# Load the recommendation model once, then keep it current in the background
+@app.on_event("startup")
+async def load_recommendation_model():
+    await run_db(recommendation_service.warm_up)
+    recommendation_service.start_refresh_scheduler()
+
+@app.on_event("shutdown")
+async def stop_recommendation_refresh():
+    recommendation_service.stop_refresh_scheduler()
+
+@app.on_event("shutdown")
+async def close_connection_pool():
+    pool.close_all()
 
 @app.get("/")
 async def root():
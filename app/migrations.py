@@ -0,0 +1,62 @@
+import os
+import re
+import sqlite3
+from app.connection import ROOT_DIR, DB_PATH
+
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, 'db', 'migrations')
+
+# Migration files are named <version>_<name>.sql, e.g. 0001_hot_path_indexes.sql
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+def list_migrations(migrations_dir=MIGRATIONS_DIR):
+    """Return (version, name, path) for every migration file, ordered by version"""
+    migrations = []
+    for filename in os.listdir(migrations_dir):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(migrations_dir, filename)))
+    return sorted(migrations)
+
+def applied_versions(conn):
+    """Return the set of migration versions already recorded in the database"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS SchemaMigrations (
+            Version INTEGER PRIMARY KEY,
+            Name TEXT NOT NULL,
+            AppliedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    return {row[0] for row in conn.execute("SELECT Version FROM SchemaMigrations")}
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+    """
+    Apply every pending migration, each in its own transaction.
+
+    Returns the list of versions that were applied.
+    """
+    done = applied_versions(conn)
+    applied = []
+    for version, name, path in list_migrations(migrations_dir):
+        if version in done:
+            continue
+        with open(path) as f:
+            sql = f.read()
+        try:
+            conn.executescript(
+                "BEGIN;\n" + sql + "\n"
+                f"INSERT INTO SchemaMigrations (Version, Name) VALUES ({version}, '{name}');\n"
+                "COMMIT;"
+            )
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+if __name__ == "__main__":
+    conn = sqlite3.connect(DB_PATH)
+    versions = apply_migrations(conn)
+    conn.close()
+    print(f"Applied migrations: {versions}" if versions else "Database is up to date")
@@ -1,53 +1,152 @@
-from app.connection import get_db_connection
+import sqlite3
+from app.connection import export_connection, pool
+from app.cache import response_cache
 
-# Function to fetch all books
-def get_all_books():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Books")
-    books = cursor.fetchall()
-    conn.close()
-    return books
+# Upper bound on bound parameters per IN (...) list
+MAX_IN_PARAMS = 500
+
+# Build the WHERE clauses shared by the list and count queries
+def _book_filters(author=None, min_price=None, max_price=None):
+    clauses, params = [], []
+    if author is not None:
+        clauses.append("Author = ?")
+        params.append(author)
+    if min_price is not None:
+        clauses.append("Price >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        clauses.append("Price <= ?")
+        params.append(max_price)
+    return clauses, params
+
+# Build the SELECT for a keyset page (after_id is the last BookID already seen)
+def _select_books(after_id=None, limit=None, author=None, min_price=None, max_price=None):
+    clauses, params = _book_filters(author, min_price, max_price)
+    if after_id is not None:
+        clauses.append("BookID > ?")
+        params.append(after_id)
+    query = "SELECT * FROM Books"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY BookID"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+# Function to fetch books, one keyset page at a time
+def get_all_books(after_id=None, limit=None, author=None, min_price=None, max_price=None):
+    query, params = _select_books(after_id, limit, author, min_price, max_price)
+    with pool.connection() as conn:
+        return conn.execute(query, params).fetchall()
+
+# Generator that yields books in fetchmany batches, for streaming exports (on its own connection)
+def iter_books(batch_size=1000, author=None, min_price=None, max_price=None):
+    query, params = _select_books(author=author, min_price=min_price, max_price=max_price)
+    with export_connection() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+# Function to count the books matching the same filters
+def count_books(author=None, min_price=None, max_price=None):
+    clauses, params = _book_filters(author, min_price, max_price)
+    query = "SELECT COUNT(*) FROM Books"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    with pool.connection() as conn:
+        return conn.execute(query, params).fetchone()[0]
 
 # Function to fetch a single book by ID
 def get_book_by_id(book_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Books WHERE BookID = ?", (book_id,))
-    book = cursor.fetchone()
-    conn.close()
-    return book
-
-# Function to add a new book
+    with pool.connection() as conn:
+        return conn.execute("SELECT * FROM Books WHERE BookID = ?", (book_id,)).fetchone()
+
+# Function to add a new book; returns the inserted row
 def add_book(title, author, price):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO Books (Title, Author, Price) VALUES (?, ?, ?)", (title, author, price))
-    conn.commit()
-    new_book_id = cursor.lastrowid  # Get the last inserted ID
-    conn.close()
-    return new_book_id
-
-# Function to update a book
+    with pool.connection() as conn:
+        book = conn.execute(
+            "INSERT INTO Books (Title, Author, Price) VALUES (?, ?, ?) RETURNING *", (title, author, price)
+        ).fetchone()
+        conn.commit()
+        response_cache.invalidate('books')
+        return book
+
+# Function to update a book; returns the updated row, or None if the book doesn't exist
 def update_book(book_id, title, author, price):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE Books
-        SET Title = ?, Author = ?, Price = ?
-        WHERE BookID = ?
-    """, (title, author, price, book_id))
-    affected = cursor.rowcount  # Get number of rows affected
-    conn.commit()
-    conn.close()
-    return affected > 0  # Return True if at least one row was updated
-
-# Function to delete a book
+    with pool.connection() as conn:
+        book = conn.execute("""
+            UPDATE Books
+            SET Title = ?, Author = ?, Price = ?
+            WHERE BookID = ?
+            RETURNING *
+        """, (title, author, price, book_id)).fetchone()
+        conn.commit()
+        response_cache.invalidate('books')
+        return book
+
+# Function to delete a book; returns the deleted row, or None if the book doesn't exist
 def delete_book(book_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Books WHERE BookID = ?", (book_id,))
-    affected = cursor.rowcount  # Get number of rows affected
-    conn.commit()
-    conn.close()
-    return affected > 0  # Return True if at least one row was deleted
\ No newline at end of file
+    with pool.connection() as conn:
+        book = conn.execute("DELETE FROM Books WHERE BookID = ? RETURNING *", (book_id,)).fetchone()
+        conn.commit()
+        response_cache.invalidate('books')
+        return book
+
+# Function to add many books in one transaction.
+# Returns (inserted rows, [(index, error message)]) so one bad item doesn't fail the batch
+def add_books(books):
+    created, errors = [], []
+    with pool.connection() as conn:
+        for index, (title, author, price) in enumerate(books):
+            try:
+                created.append(conn.execute(
+                    "INSERT INTO Books (Title, Author, Price) VALUES (?, ?, ?) RETURNING *",
+                    (title, author, price)
+                ).fetchone())
+            except sqlite3.IntegrityError as e:
+                errors.append((index, str(e)))
+        conn.commit()
+        response_cache.invalidate('books')
+    return created, errors
+
+# Function to update many books in one transaction; items are (book_id, title, author, price)
+def update_books(books):
+    updated, errors = [], []
+    with pool.connection() as conn:
+        for index, (book_id, title, author, price) in enumerate(books):
+            try:
+                row = conn.execute("""
+                    UPDATE Books
+                    SET Title = ?, Author = ?, Price = ?
+                    WHERE BookID = ?
+                    RETURNING *
+                """, (title, author, price, book_id)).fetchone()
+            except sqlite3.IntegrityError as e:
+                errors.append((index, str(e)))
+                continue
+            if row is None:
+                errors.append((index, "Book not found"))
+            else:
+                updated.append(row)
+        conn.commit()
+        response_cache.invalidate('books')
+    return updated, errors
+
+# Function to delete many books in one transaction; returns (deleted IDs, IDs not found)
+def delete_books(book_ids):
+    deleted = []
+    with pool.connection() as conn:
+        for start in range(0, len(book_ids), MAX_IN_PARAMS):
+            chunk = book_ids[start:start + MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            deleted.extend(row[0] for row in conn.execute(
+                f"DELETE FROM Books WHERE BookID IN ({placeholders}) RETURNING BookID", chunk
+            ).fetchall())
+        conn.commit()
+        response_cache.invalidate('books')
+    found = set(deleted)
+    return deleted, [book_id for book_id in book_ids if book_id not in found]
@@ -1,48 +1,139 @@
-from app.connection import get_db_connection
+import sqlite3
+from app.connection import export_connection, pool
+from app.cache import response_cache
 
-def get_all_customers():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Customers")
-    customers = cursor.fetchall()
-    conn.close()
-    return customers
+# Upper bound on bound parameters per IN (...) list
+MAX_IN_PARAMS = 500
+
+def _customer_filters(name=None, email=None):
+    clauses, params = [], []
+    if name is not None:
+        clauses.append("Name = ?")
+        params.append(name)
+    if email is not None:
+        clauses.append("Email = ?")
+        params.append(email)
+    return clauses, params
+
+def _select_customers(after_id=None, limit=None, name=None, email=None):
+    clauses, params = _customer_filters(name, email)
+    if after_id is not None:
+        clauses.append("CustomerID > ?")
+        params.append(after_id)
+    query = "SELECT * FROM Customers"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY CustomerID"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
+
+def get_all_customers(after_id=None, limit=None, name=None, email=None):
+    query, params = _select_customers(after_id, limit, name, email)
+    with pool.connection() as conn:
+        return conn.execute(query, params).fetchall()
+
+def iter_customers(batch_size=1000, name=None, email=None):
+    query, params = _select_customers(name=name, email=email)
+    with export_connection() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+def count_customers(name=None, email=None):
+    clauses, params = _customer_filters(name, email)
+    query = "SELECT COUNT(*) FROM Customers"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    with pool.connection() as conn:
+        return conn.execute(query, params).fetchone()[0]
 
 def get_customer_by_id(customer_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Customers WHERE CustomerID = ?", (customer_id,))
-    customer = cursor.fetchone()
-    conn.close()
-    return customer
+    with pool.connection() as conn:
+        return conn.execute("SELECT * FROM Customers WHERE CustomerID = ?", (customer_id,)).fetchone()
 
 def add_customer(name, email):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO Customers (Name, Email) VALUES (?, ?)", (name, email))
-    conn.commit()
-    new_customer_id = cursor.lastrowid
-    conn.close()
-    return new_customer_id
+    with pool.connection() as conn:
+        customer = conn.execute(
+            "INSERT INTO Customers (Name, Email) VALUES (?, ?) RETURNING *", (name, email)
+        ).fetchone()
+        conn.commit()
+        response_cache.invalidate('customers')
+        return customer
 
 def update_customer(customer_id, name, email):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE Customers
-        SET Name = ?, Email = ?
-        WHERE CustomerID = ?
-    """, (name, email, customer_id))
-    affected = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return affected > 0
+    # Returns the updated row, or None if the customer doesn't exist
+    with pool.connection() as conn:
+        customer = conn.execute("""
+            UPDATE Customers
+            SET Name = ?, Email = ?
+            WHERE CustomerID = ?
+            RETURNING *
+        """, (name, email, customer_id)).fetchone()
+        conn.commit()
+        response_cache.invalidate('customers')
+        return customer
 
 def delete_customer(customer_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Customers WHERE CustomerID = ?", (customer_id,))
-    affected = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return affected > 0
\ No newline at end of file
+    with pool.connection() as conn:
+        customer = conn.execute("DELETE FROM Customers WHERE CustomerID = ? RETURNING *", (customer_id,)).fetchone()
+        conn.commit()
+        response_cache.invalidate('customers')
+        return customer
+
+def add_customers(customers):
+    # Returns (inserted rows, [(index, error message)]), e.g. for duplicate emails
+    created, errors = [], []
+    with pool.connection() as conn:
+        for index, (name, email) in enumerate(customers):
+            try:
+                created.append(conn.execute(
+                    "INSERT INTO Customers (Name, Email) VALUES (?, ?) RETURNING *", (name, email)
+                ).fetchone())
+            except sqlite3.IntegrityError as e:
+                errors.append((index, str(e)))
+        conn.commit()
+        response_cache.invalidate('customers')
+    return created, errors
+
+def update_customers(customers):
+    # Items are (customer_id, name, email)
+    updated, errors = [], []
+    with pool.connection() as conn:
+        for index, (customer_id, name, email) in enumerate(customers):
+            try:
+                row = conn.execute("""
+                    UPDATE Customers
+                    SET Name = ?, Email = ?
+                    WHERE CustomerID = ?
+                    RETURNING *
+                """, (name, email, customer_id)).fetchone()
+            except sqlite3.IntegrityError as e:
+                errors.append((index, str(e)))
+                continue
+            if row is None:
+                errors.append((index, "Customer not found"))
+            else:
+                updated.append(row)
+        conn.commit()
+        response_cache.invalidate('customers')
+    return updated, errors
+
+def delete_customers(customer_ids):
+    # Returns (deleted IDs, IDs not found)
+    deleted = []
+    with pool.connection() as conn:
+        for start in range(0, len(customer_ids), MAX_IN_PARAMS):
+            chunk = customer_ids[start:start + MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            deleted.extend(row[0] for row in conn.execute(
+                f"DELETE FROM Customers WHERE CustomerID IN ({placeholders}) RETURNING CustomerID", chunk
+            ).fetchall())
+        conn.commit()
+        response_cache.invalidate('customers')
+    found = set(deleted)
+    return deleted, [customer_id for customer_id in customer_ids if customer_id not in found]
@@ -0,0 +1,42 @@
+from app.connection import pool
+
+# Function to compute everything the dashboard shows in one pass over a single connection.
+# Sales totals come from the trigger-maintained summary tables, so the cost is
+# independent of the size of the Sales table.
+def get_dashboard_summary(top_n=7):
+    with pool.connection() as conn:
+        total_books = conn.execute("SELECT COUNT(*) FROM Books").fetchone()[0]
+        total_customers = conn.execute("SELECT COUNT(*) FROM Customers").fetchone()[0]
+        totals = conn.execute("""
+            SELECT COALESCE(SUM(SaleCount), 0) as TotalSales, COALESCE(SUM(TotalRevenue), 0) as TotalRevenue
+            FROM SalesByDay
+        """).fetchone()
+        monthly_sales = conn.execute("""
+            SELECT substr(Date, 1, 7) as Month, SUM(SaleCount) as Transactions,
+                   SUM(TotalSold) as BooksSold, SUM(TotalRevenue) as Revenue
+            FROM SalesByDay
+            GROUP BY Month
+            ORDER BY Month
+        """).fetchall()
+        top_books = conn.execute("""
+            SELECT b.BookID, b.Title, sb.TotalSold, sb.TotalRevenue
+            FROM SalesByBook sb
+            JOIN Books b ON sb.BookID = b.BookID
+            ORDER BY sb.TotalSold DESC
+            LIMIT ?
+        """, (top_n,)).fetchall()
+        top_authors = conn.execute("""
+            SELECT Author, TotalSold, TotalRevenue
+            FROM SalesByAuthor
+            ORDER BY TotalRevenue DESC
+            LIMIT ?
+        """, (top_n,)).fetchall()
+    return {
+        'total_books': total_books,
+        'total_customers': total_customers,
+        'total_sales': totals['TotalSales'],
+        'total_revenue': totals['TotalRevenue'],
+        'monthly_sales': monthly_sales,
+        'top_books': top_books,
+        'top_authors': top_authors,
+    }
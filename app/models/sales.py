@@ -1,10 +1,34 @@
 from datetime import date as date_type
-from app.connection import get_db_connection
+import sqlite3
+from app.connection import export_connection, pool
+from app.cache import response_cache
+from app.popularity import popularity_rankings
 
-def get_all_sales():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
+# Upper bound on bound parameters per IN (...) list
+MAX_IN_PARAMS = 500
+
+def _sale_filters(customer_id=None, book_id=None, start_date=None, end_date=None):
+    clauses, params = [], []
+    if customer_id is not None:
+        clauses.append("s.CustomerID = ?")
+        params.append(customer_id)
+    if book_id is not None:
+        clauses.append("s.BookID = ?")
+        params.append(book_id)
+    if start_date is not None:
+        clauses.append("s.Date >= ?")
+        params.append(str(start_date))
+    if end_date is not None:
+        clauses.append("s.Date <= ?")
+        params.append(str(end_date))
+    return clauses, params
+
+def _select_sales(after_id=None, limit=None, customer_id=None, book_id=None, start_date=None, end_date=None):
+    clauses, params = _sale_filters(customer_id, book_id, start_date, end_date)
+    if after_id is not None:
+        clauses.append("s.SaleID > ?")
+        params.append(after_id)
+    query = """
         SELECT 
             s.SaleID, s.BookID, b.Title as BookTitle, b.Price as BookPrice,
             s.CustomerID, c.Name as CustomerName, s.Date, s.Quantity,
@@ -12,103 +36,271 @@ def get_all_sales():
         FROM Sales s
         JOIN Books b ON s.BookID = b.BookID
         JOIN Customers c ON s.CustomerID = c.CustomerID
-    """)
-    sales = cursor.fetchall()
-    conn.close()
-    return sales
+    """
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY s.SaleID"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return query, params
 
-def get_sale_by_id(sale_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT 
-            s.SaleID, s.BookID, b.Title as BookTitle, b.Price as BookPrice,
-            s.CustomerID, c.Name as CustomerName, s.Date, s.Quantity,
-            (s.Quantity * b.Price) as TotalAmount
+def get_all_sales(after_id=None, limit=None, customer_id=None, book_id=None, start_date=None, end_date=None):
+    query, params = _select_sales(after_id, limit, customer_id, book_id, start_date, end_date)
+    with pool.connection() as conn:
+        return conn.execute(query, params).fetchall()
+
+def iter_sales(batch_size=1000, customer_id=None, book_id=None, start_date=None, end_date=None):
+    # Yields fetchmany batches so exports never hold the whole table in memory; reads on its
+    # own connection, not a pooled one, since the client sets the pace
+    query, params = _select_sales(customer_id=customer_id, book_id=book_id, start_date=start_date, end_date=end_date)
+    with export_connection() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+
+def count_sales(customer_id=None, book_id=None, start_date=None, end_date=None, first_page=True):
+    # Unfiltered or per customer, the trigger-maintained SalesByCustomer totals hold the answer:
+    # they count exactly the sales whose book and customer exist, like the joins below
+    if book_id is None and start_date is None and end_date is None:
+        query, params = "SELECT COALESCE(SUM(TotalTransactions), 0) FROM SalesByCustomer", []
+        if customer_id is not None:
+            query += " WHERE CustomerID = ?"
+            params.append(customer_id)
+        with pool.connection() as conn:
+            return conn.execute(query, params).fetchone()[0]
+
+    # Other filters need a join over every matching sale, so later pages aren't counted (None)
+    if not first_page:
+        return None
+    clauses, params = _sale_filters(customer_id, book_id, start_date, end_date)
+    # Same joins as get_all_sales so the count matches the rows it can return
+    query = """
+        SELECT COUNT(*)
         FROM Sales s
         JOIN Books b ON s.BookID = b.BookID
         JOIN Customers c ON s.CustomerID = c.CustomerID
-        WHERE s.SaleID = ?
-    """, (sale_id,))
-    sale = cursor.fetchone()
-    conn.close()
+    """
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    with pool.connection() as conn:
+        return conn.execute(query, params).fetchone()[0]
+
+def get_sale_by_id(sale_id):
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT 
+                s.SaleID, s.BookID, b.Title as BookTitle, b.Price as BookPrice,
+                s.CustomerID, c.Name as CustomerName, s.Date, s.Quantity,
+                (s.Quantity * b.Price) as TotalAmount
+            FROM Sales s
+            JOIN Books b ON s.BookID = b.BookID
+            JOIN Customers c ON s.CustomerID = c.CustomerID
+            WHERE s.SaleID = ?
+        """, (sale_id,)).fetchone()
+
+# RETURNING clause that yields the same columns as get_sale_by_id, so writes need no read-back
+SALE_DETAIL_RETURNING = """
+    RETURNING
+        SaleID, BookID,
+        (SELECT Title FROM Books WHERE Books.BookID = Sales.BookID) as BookTitle,
+        (SELECT Price FROM Books WHERE Books.BookID = Sales.BookID) as BookPrice,
+        CustomerID,
+        (SELECT Name FROM Customers WHERE Customers.CustomerID = Sales.CustomerID) as CustomerName,
+        Date, Quantity,
+        (Quantity * (SELECT Price FROM Books WHERE Books.BookID = Sales.BookID)) as TotalAmount
+"""
+
+def _commit_sale_detail(conn, sale):
+    # A sale whose book or customer doesn't exist would never be listed by get_all_sales, so don't keep it
+    if sale is None or sale['BookTitle'] is None or sale['CustomerName'] is None:
+        conn.rollback()
+        return None
+    conn.commit()
+    response_cache.invalidate('sales')
     return sale
 
+def _record_popularity(removed=(), added=(), inserted=False):
+    # Move committed writes into the in-memory bestseller rankings: `removed` rows (deleted
+    # sales, or the old side of updates) come out, `added` rows go in
+    for row in removed:
+        popularity_rankings.record(row['BookID'], row['Date'], -row['Quantity'])
+    for row in added:
+        popularity_rankings.record(row['BookID'], row['Date'], row['Quantity'],
+                                   sale_id=row['SaleID'] if inserted else None)
+
 def add_sale(book_id, customer_id, date, quantity):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO Sales (BookID, CustomerID, Date, Quantity) 
-        VALUES (?, ?, ?, ?)
-    """, (book_id, customer_id, date, quantity))
-    conn.commit()
-    new_sale_id = cursor.lastrowid
-    conn.close()
-    return new_sale_id
+    # Returns the new sale with book and customer details, or None if either doesn't exist
+    with pool.connection() as conn:
+        sale = conn.execute("""
+            INSERT INTO Sales (BookID, CustomerID, Date, Quantity) 
+            VALUES (?, ?, ?, ?)
+        """ + SALE_DETAIL_RETURNING, (book_id, customer_id, date, quantity)).fetchone()
+        sale = _commit_sale_detail(conn, sale)
+    if sale is not None:
+        _record_popularity(added=[sale], inserted=True)
+    return sale
 
 def update_sale(sale_id, book_id, customer_id, date, quantity):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE Sales
-        SET BookID = ?, CustomerID = ?, Date = ?, Quantity = ?
-        WHERE SaleID = ?
-    """, (book_id, customer_id, date, quantity, sale_id))
-    affected = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return affected > 0
+    # Returns the updated sale with details, or None if the sale, book or customer doesn't exist.
+    # RETURNING only gives the new values, so the old row (for the bestseller rankings) is read
+    # first, in the same write transaction so no other write can land in between
+    with pool.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        old = conn.execute("SELECT BookID, Date, Quantity FROM Sales WHERE SaleID = ?", (sale_id,)).fetchone()
+        sale = conn.execute("""
+            UPDATE Sales
+            SET BookID = ?, CustomerID = ?, Date = ?, Quantity = ?
+            WHERE SaleID = ?
+        """ + SALE_DETAIL_RETURNING, (book_id, customer_id, date, quantity, sale_id)).fetchone()
+        sale = _commit_sale_detail(conn, sale)
+    if sale is not None:
+        _record_popularity(removed=[old], added=[sale])
+    return sale
 
 def delete_sale(sale_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM Sales WHERE SaleID = ?", (sale_id,))
-    affected = cursor.rowcount
+    # Returns the deleted row, or None if the sale doesn't exist
+    with pool.connection() as conn:
+        sale = conn.execute("DELETE FROM Sales WHERE SaleID = ? RETURNING *", (sale_id,)).fetchone()
+        conn.commit()
+        response_cache.invalidate('sales')
+    if sale is not None:
+        _record_popularity(removed=[sale])
+    return sale
+
+def _fetch_by_ids(conn, query, ids):
+    # Run `query` (which ends in "IN ({})") over ids in chunks and key the rows by their first column
+    ids = list(ids)
+    rows = {}
+    for start in range(0, len(ids), MAX_IN_PARAMS):
+        chunk = ids[start:start + MAX_IN_PARAMS]
+        for row in conn.execute(query.format(", ".join("?" * len(chunk))), chunk):
+            rows[row[0]] = row
+    return rows
+
+def _sale_detail(row, book, customer):
+    # Same shape as the rows returned by get_sale_by_id
+    return {
+        'SaleID': row['SaleID'], 'BookID': row['BookID'], 'BookTitle': book['Title'], 'BookPrice': book['Price'],
+        'CustomerID': row['CustomerID'], 'CustomerName': customer['Name'], 'Date': row['Date'],
+        'Quantity': row['Quantity'], 'TotalAmount': row['Quantity'] * book['Price'],
+    }
+
+def _write_sales(conn, statement, items):
+    # Shared body of add_sales/update_sales. Items are (book_id, customer_id, statement params);
+    # references are validated with one query per table instead of one per item
+    books = _fetch_by_ids(conn, "SELECT BookID, Title, Price FROM Books WHERE BookID IN ({})",
+                          {book_id for book_id, _, _ in items})
+    customers = _fetch_by_ids(conn, "SELECT CustomerID, Name FROM Customers WHERE CustomerID IN ({})",
+                              {customer_id for _, customer_id, _ in items})
+    written, errors = [], []
+    for index, (book_id, customer_id, params) in enumerate(items):
+        if book_id not in books:
+            errors.append((index, "Book not found"))
+            continue
+        if customer_id not in customers:
+            errors.append((index, "Customer not found"))
+            continue
+        try:
+            row = conn.execute(statement, params).fetchone()
+        except sqlite3.IntegrityError as e:
+            errors.append((index, str(e)))
+            continue
+        if row is None:
+            errors.append((index, "Sale not found"))
+        else:
+            written.append(_sale_detail(row, books[book_id], customers[customer_id]))
     conn.commit()
-    conn.close()
-    return affected > 0
+    response_cache.invalidate('sales')
+    return written, errors
+
+def add_sales(sales):
+    # Items are (book_id, customer_id, date, quantity); returns (sale details, [(index, error message)])
+    with pool.connection() as conn:
+        written, errors = _write_sales(conn, """
+            INSERT INTO Sales (BookID, CustomerID, Date, Quantity)
+            VALUES (?, ?, ?, ?)
+            RETURNING SaleID, BookID, CustomerID, Date, Quantity
+        """, [(book_id, customer_id, (book_id, customer_id, date, quantity))
+              for book_id, customer_id, date, quantity in sales])
+    _record_popularity(added=written, inserted=True)
+    return written, errors
+
+def update_sales(sales):
+    # Items are (sale_id, book_id, customer_id, date, quantity)
+    with pool.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")  # The old rows are read in the transaction that replaces them
+        old = _fetch_by_ids(conn, "SELECT SaleID, BookID, Date, Quantity FROM Sales WHERE SaleID IN ({})",
+                            {sale_id for sale_id, _, _, _, _ in sales})
+        written, errors = _write_sales(conn, """
+            UPDATE Sales
+            SET BookID = ?, CustomerID = ?, Date = ?, Quantity = ?
+            WHERE SaleID = ?
+            RETURNING SaleID, BookID, CustomerID, Date, Quantity
+        """, [(book_id, customer_id, (book_id, customer_id, date, quantity, sale_id))
+              for sale_id, book_id, customer_id, date, quantity in sales])
+    # A sale updated more than once in the batch replaces what its previous update wrote
+    removed = []
+    for sale in written:
+        removed.append(old[sale['SaleID']])
+        old[sale['SaleID']] = sale
+    _record_popularity(removed=removed, added=written)
+    return written, errors
+
+def delete_sales(sale_ids):
+    # Returns (deleted IDs, IDs not found)
+    removed = []
+    with pool.connection() as conn:
+        for start in range(0, len(sale_ids), MAX_IN_PARAMS):
+            chunk = sale_ids[start:start + MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            removed.extend(conn.execute(
+                f"DELETE FROM Sales WHERE SaleID IN ({placeholders}) RETURNING SaleID, BookID, Date, Quantity", chunk
+            ).fetchall())
+        conn.commit()
+        response_cache.invalidate('sales')
+    _record_popularity(removed=removed)
+    deleted = [row['SaleID'] for row in removed]
+    found = set(deleted)
+    return deleted, [sale_id for sale_id in sale_ids if sale_id not in found]
 
 # Analytics functions
-def get_sales_by_book():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT b.BookID, b.Title, SUM(s.Quantity) as TotalSold, SUM(s.Quantity * b.Price) as TotalRevenue
-        FROM Sales s
-        JOIN Books b ON s.BookID = b.BookID
-        GROUP BY b.BookID, b.Title
-        ORDER BY TotalSold DESC
-    """)
-    sales_by_book = cursor.fetchall()
-    conn.close()
-    return sales_by_book
-
-def get_bestselling_authors():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT b.Author, SUM(s.Quantity) as TotalSold, SUM(s.Quantity * b.Price) as TotalRevenue
-        FROM Sales s
-        JOIN Books b ON s.BookID = b.BookID
-        GROUP BY b.Author
-        ORDER BY TotalSold DESC
-    """)
-    bestselling_authors = cursor.fetchall()
-    conn.close()
-    return bestselling_authors
-
-def get_top_customers():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT c.CustomerID, c.Name, COUNT(s.SaleID) as TotalTransactions, 
-               SUM(s.Quantity) as TotalBooksBought, SUM(s.Quantity * b.Price) as TotalSpent
-        FROM Sales s
-        JOIN Customers c ON s.CustomerID = c.CustomerID
-        JOIN Books b ON s.BookID = b.BookID
-        GROUP BY c.CustomerID, c.Name
-        ORDER BY TotalSpent DESC
-    """)
-    top_customers = cursor.fetchall()
-    conn.close()
-    return top_customers
\ No newline at end of file
+# These read the summary tables maintained by triggers (see db/migrations/0002_sales_summaries.sql)
+# rather than re-aggregating Sales, and walk the ranking indexes so cost follows the result size
+def _limit_clause(limit, params):
+    if limit is None:
+        return ""
+    params.append(limit)
+    return " LIMIT ?"
+
+def get_sales_by_book(limit=None):
+    params = []
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT b.BookID, b.Title, sb.TotalSold, sb.TotalRevenue
+            FROM SalesByBook sb
+            JOIN Books b ON sb.BookID = b.BookID
+            ORDER BY sb.TotalSold DESC
+        """ + _limit_clause(limit, params), params).fetchall()
+
+def get_bestselling_authors(limit=None):
+    params = []
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT Author, TotalSold, TotalRevenue
+            FROM SalesByAuthor
+            ORDER BY TotalSold DESC
+        """ + _limit_clause(limit, params), params).fetchall()
+
+def get_top_customers(limit=None):
+    params = []
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT c.CustomerID, c.Name, sc.TotalTransactions, sc.TotalBooksBought, sc.TotalSpent
+            FROM SalesByCustomer sc
+            JOIN Customers c ON sc.CustomerID = c.CustomerID
+            ORDER BY sc.TotalSpent DESC
+        """ + _limit_clause(limit, params), params).fetchall()
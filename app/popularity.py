@@ -0,0 +1,194 @@
+import bisect
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+# Trending windows in days; each ends at the most recent sale date
+POPULARITY_WINDOWS = tuple(int(days) for days in os.environ.get('BOOKSTORE_POPULARITY_WINDOWS', '7,30').split(','))
+
+def _day(value):
+    """Sale date as a date, or None if missing or malformed"""
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+class Ranking:
+    """Books ordered by quantity sold (ties by book ID), kept sorted as quantities change"""
+
+    def __init__(self, totals=()):
+        self.totals = {book_id: quantity for book_id, quantity in dict(totals).items() if quantity > 0}
+        self._order = sorted((-quantity, book_id) for book_id, quantity in self.totals.items())
+
+    def add(self, book_id, quantity):
+        old = self.totals.pop(book_id, 0)
+        if old > 0:
+            del self._order[bisect.bisect_left(self._order, (-old, book_id))]
+        new = old + quantity
+        if new > 0:
+            self.totals[book_id] = new
+            bisect.insort(self._order, (-new, book_id))
+
+    def top(self, n, keep=None):
+        """The first n book IDs (for which keep(book_id) is true, if given)"""
+        if keep is None:
+            return [book_id for _, book_id in self._order[:n]]
+        books = []
+        for _, book_id in self._order:
+            if len(books) == n:
+                break
+            if keep(book_id):
+                books.append(book_id)
+        return books
+
+class PopularityRankings:
+    """
+    All-time and trending bestseller rankings, kept in memory and updated per sale.
+
+    Rankings are loaded in bulk from the database (or a sales DataFrame), then the
+    sales write paths call record() so a new sale counts immediately. Because other
+    processes write too, load() is repeated periodically. It reads one consistent
+    snapshot, and record() calls that arrive while it runs are held back and applied
+    on top of it; new sales with an ID at or below the loaded high-water mark are
+    already counted and are skipped. An update or delete committed just before a
+    load starts but recorded during it is counted twice until the next load, and the
+    windows only move back (when the latest sale is deleted or redated) on a load.
+    """
+
+    def __init__(self, windows=POPULARITY_WINDOWS):
+        self.windows = tuple(sorted(set(windows)))
+        self._lock = threading.Lock()
+        self._reset({}, {}, None, 0)
+        self.loaded = False
+        self._pending = None  # record() calls held back while load() runs
+
+    def _reset(self, totals, daily, latest, last_sale_id):
+        self.all_time = Ranking(totals)
+        self.latest = latest  # Most recent sale date; the trending windows end here
+        self.last_sale_id = last_sale_id
+        self._daily = daily  # date -> {book_id: quantity}, for the days inside the longest window
+        self._roll_windows()
+        self.loaded = True  # record() only applies on top of a loaded state
+
+    def _roll_windows(self):
+        """Rebuild the trending rankings for the current latest date, dropping days that fell out"""
+        if self.latest is not None:
+            oldest = self.latest - timedelta(days=max(self.windows, default=0))
+            self._daily = {day: books for day, books in self._daily.items() if day > oldest}
+        trending = {}
+        for days in self.windows:
+            totals = Counter()
+            for day, books in self._daily.items():
+                if day > self.latest - timedelta(days=days):
+                    totals.update(books)
+            trending[days] = Ranking(totals)
+        self.trending = trending
+
+    def load(self, conn):
+        """Reload every ranking from the database (SalesByBook and the recent Sales rows)"""
+        with self._lock:
+            self._pending = []
+        try:
+            # One read transaction, so the high-water mark and the totals come from the same snapshot
+            conn.execute("BEGIN")
+            try:
+                last_sale_id = conn.execute("SELECT COALESCE(MAX(SaleID), 0) FROM Sales").fetchone()[0]
+                totals = dict(conn.execute("SELECT BookID, TotalSold FROM SalesByBook").fetchall())
+                latest = _day(conn.execute("SELECT MAX(Date) FROM Sales").fetchone()[0])
+                daily = defaultdict(dict)
+                if latest is not None:
+                    oldest = latest - timedelta(days=max(self.windows, default=0))
+                    for book_id, sale_date, quantity in conn.execute("""
+                        SELECT s.BookID, s.Date, SUM(s.Quantity)
+                        FROM Sales s JOIN Books b ON s.BookID = b.BookID
+                        WHERE s.Date > ?
+                        GROUP BY s.Date, s.BookID
+                    """, (oldest.isoformat(),)):
+                        day = _day(sale_date)
+                        if day is not None:
+                            daily[day][book_id] = daily[day].get(book_id, 0) + quantity
+            finally:
+                conn.commit()
+            with self._lock:
+                self._reset(totals, dict(daily), latest, last_sale_id)
+                # Writes recorded during the load; new sales the snapshot already saw are skipped
+                for args in self._pending:
+                    self._apply(*args)
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def load_sales(self, sales_df):
+        """Rebuild every ranking from a DataFrame with sale_id, book_id, date and quantity columns"""
+        totals = sales_df.groupby('book_id')['quantity'].sum()
+        # ISO dates order like strings, so the window filter needs no parsing
+        dates = sales_df['date'].astype(str).str[:10]
+        dates = dates[dates.str.match(r'^\d{4}-\d{2}-\d{2}$')]
+        latest = _day(dates.max()) if len(dates) else None
+        daily = defaultdict(dict)
+        if latest is not None:
+            recent = dates[dates > (latest - timedelta(days=max(self.windows, default=0))).isoformat()]
+            quantities = sales_df.loc[recent.index].groupby([recent, sales_df.loc[recent.index, 'book_id']])['quantity'].sum()
+            for (sale_date, book_id), quantity in quantities.items():
+                daily[_day(sale_date)][int(book_id)] = int(quantity)
+        with self._lock:
+            self._reset({int(book_id): int(quantity) for book_id, quantity in totals.items()},
+                        dict(daily), latest, int(sales_df['sale_id'].max()) if len(sales_df) else 0)
+
+    def record(self, book_id, sale_date, quantity, sale_id=None):
+        """
+        Apply one written sale to the rankings
+
+        Args:
+            book_id: The sale's book
+            sale_date: The sale's date ('YYYY-MM-DD')
+            quantity: Copies sold; negative to take a deleted (or the old side of an updated) sale out
+            sale_id: ID of a newly inserted sale, so one already counted by the last load is skipped
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((book_id, sale_date, quantity, sale_id))
+            self._apply(book_id, sale_date, quantity, sale_id)
+
+    def _apply(self, book_id, sale_date, quantity, sale_id):
+        """Apply one sale to the rankings; the caller holds self._lock"""
+        if not self.loaded or (sale_id is not None and sale_id <= self.last_sale_id):
+            return
+        self.all_time.add(book_id, quantity)
+        day = _day(sale_date)
+        if day is None:
+            return
+        if self.latest is None or day > self.latest:
+            # The windows move forward: rebuild them from the daily totals
+            books = self._daily.setdefault(day, {})
+            books[book_id] = books.get(book_id, 0) + quantity
+            self.latest = day
+            self._roll_windows()
+            return
+        if day <= self.latest - timedelta(days=max(self.windows, default=0)):
+            return
+        books = self._daily.setdefault(day, {})
+        books[book_id] = books.get(book_id, 0) + quantity
+        for days in self.windows:
+            if day > self.latest - timedelta(days=days):
+                self.trending[days].add(book_id, quantity)
+
+    def top(self, n, window=None, keep=None):
+        """
+        The n best-selling book IDs, all-time or over a trending window
+
+        Args:
+            n: Number of books
+            window: One of self.windows (days), or None for all-time
+            keep: Optional predicate; books for which it is false are skipped
+
+        Returns:
+            List of book IDs, best-selling first
+        """
+        with self._lock:
+            ranking = self.all_time if window is None else self.trending[window]
+            return ranking.top(n, keep)
+
+# Shared rankings; the sales write paths call popularity_rankings.record(...)
+popularity_rankings = PopularityRankings()
@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from fastapi.responses import StreamingResponse
+from app.connection import export_slots
+
+# Media type for each supported export format
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+def stream_export(batches, fields, fmt):
+    """
+    Encode batches of database rows as NDJSON or CSV, one chunk per batch
+
+    Args:
+        batches: Iterable of row batches (e.g. from iter_sales)
+        fields: List of (output name, row column) pairs
+        fmt: 'ndjson' or 'csv'
+
+    Yields:
+        Encoded text chunks, so memory stays bounded by a single batch
+    """
+    names = [name for name, _ in fields]
+    columns = [column for _, column in fields]
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        yield buffer.getvalue()  # Send the header straight away
+        for rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([row[column] for column in columns] for row in rows)
+            yield buffer.getvalue()
+    else:
+        for rows in batches:
+            yield ''.join(
+                json.dumps(dict(zip(names, (row[column] for column in columns)))) + '\n'
+                for row in rows
+            )
+
+class ExportResponse(StreamingResponse):
+    """
+    Streaming export of row batches (e.g. from iter_sales) holding one of the export slots
+
+    The caller takes the slot (export_slots.acquire) before creating the response. When
+    the stream ends, fails or the client disconnects, the batches generator is closed,
+    which closes its dedicated connection, and the slot is released. Starlette lets a
+    threadpool step in progress finish before the response is cancelled, so nothing is
+    still reading from the generator when it is closed.
+    """
+
+    def __init__(self, batches, fields, fmt, filename):
+        self._batches = batches
+        self._chunks = stream_export(batches, fields, fmt)
+        super().__init__(
+            self._chunks,
+            media_type=EXPORT_MEDIA_TYPES[fmt],
+            headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+        )
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._chunks.close()
+            self._batches.close()
+            export_slots.release()
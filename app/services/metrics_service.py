@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+class LatencyMetrics:
+    """
+    Per-endpoint request latencies, keeping the most recent `window` samples
+    of each for percentiles plus a running request count.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            self._samples[name].append(seconds * 1000)
+            self._counts[name] += 1
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self):
+        """Request count and p50/p95/p99/max latency in milliseconds for each endpoint"""
+        with self._lock:
+            snapshot = {name: (self._counts[name], list(samples)) for name, samples in self._samples.items()}
+        summary = {}
+        for name, (count, samples) in snapshot.items():
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            summary[name] = {
+                'count': count,
+                'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(max(samples), 3),
+            }
+        return summary
+
+# Latencies of the /recommendations endpoints
+recommendation_metrics = LatencyMetrics()
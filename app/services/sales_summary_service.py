@@ -0,0 +1,70 @@
+import math
+from app.connection import pool
+
+# Each summary table with its key column and the query that computes it from scratch.
+# These match the initial population in db/migrations/0002_sales_summaries.sql.
+SUMMARIES = {
+    'SalesByBook': ('BookID', """
+        SELECT s.BookID, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+        FROM Sales s JOIN Books b ON s.BookID = b.BookID
+        GROUP BY s.BookID
+    """),
+    'SalesByAuthor': ('Author', """
+        SELECT b.Author, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+        FROM Sales s JOIN Books b ON s.BookID = b.BookID
+        GROUP BY b.Author
+    """),
+    'SalesByCustomer': ('CustomerID', """
+        SELECT s.CustomerID, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+        FROM Sales s
+        JOIN Books b ON s.BookID = b.BookID
+        JOIN Customers c ON s.CustomerID = c.CustomerID
+        GROUP BY s.CustomerID
+    """),
+    'SalesByDay': ('Date', """
+        SELECT s.Date, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+        FROM Sales s JOIN Books b ON s.BookID = b.BookID
+        WHERE s.Date IS NOT NULL
+        GROUP BY s.Date
+    """),
+}
+
+def check_sales_summaries(tolerance=1e-6):
+    """
+    Compare every summary table against a fresh aggregation of Sales
+
+    Returns:
+        List of (table, key, stored totals, expected totals) for each row that differs
+    """
+    mismatches = []
+    with pool.connection() as conn:
+        for table, (key, query) in SUMMARIES.items():
+            expected = {row[0]: tuple(row[1:]) for row in conn.execute(query)}
+            stored = {row[0]: tuple(row[1:]) for row in conn.execute(f"SELECT * FROM {table}")}
+            for row_key in expected.keys() | stored.keys():
+                have, want = stored.get(row_key), expected.get(row_key)
+                if have is None or want is None or not all(
+                    math.isclose(a, b, rel_tol=tolerance, abs_tol=tolerance) for a, b in zip(have, want)
+                ):
+                    mismatches.append((table, row_key, have, want))
+    return mismatches
+
+def rebuild_sales_summaries():
+    """Recompute every summary table from scratch in a single transaction"""
+    with pool.connection() as conn:
+        for table, (key, query) in SUMMARIES.items():
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"INSERT INTO {table} {query}")
+        conn.commit()
+
+if __name__ == "__main__":
+    import sys
+
+    if '--rebuild' in sys.argv:
+        rebuild_sales_summaries()
+        print("Sales summaries rebuilt")
+    mismatches = check_sales_summaries()
+    for table, row_key, have, want in mismatches:
+        print(f"{table}[{row_key!r}]: stored {have}, expected {want}")
+    print(f"{len(mismatches)} mismatched summary rows" if mismatches else "Sales summaries are consistent")
+    sys.exit(1 if mismatches else 0)
@@ -1,4 +1,6 @@
 from pydantic import BaseModel
+from typing import List
+from app.views.bulk_schema import BulkError
 
 # Pydantic model for creating a new book
 class BookCreate(BaseModel):
@@ -14,4 +16,9 @@ class Book(BaseModel):
     price: float
 
     class Config:
-        orm_mode = True 
+        orm_mode = True
+
+# Result of a bulk create/update: the written books plus per-item errors
+class BookBulkResult(BaseModel):
+    items: List[Book]
+    errors: List[BulkError]
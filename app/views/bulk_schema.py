@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import List
+
+# A single item of a bulk request that could not be written
+class BulkError(BaseModel):
+    index: int  # Position of the item in the request list
+    detail: str
+
+# Result of a bulk delete
+class BulkDeleteResult(BaseModel):
+    deleted: List[int]
+    not_found: List[int]
@@ -1,4 +1,6 @@
 from pydantic import BaseModel, EmailStr
+from typing import List
+from app.views.bulk_schema import BulkError
 
 class CustomerCreate(BaseModel):
     name: str
@@ -10,4 +12,8 @@ class Customer(BaseModel):
     email: str
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class CustomerBulkResult(BaseModel):
+    items: List[Customer]
+    errors: List[BulkError]
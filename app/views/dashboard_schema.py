@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List
+
+class MonthlySales(BaseModel):
+    month: str  # YYYY-MM
+    transactions: int
+    books_sold: int
+    revenue: float
+
+class TopBook(BaseModel):
+    book_id: int
+    title: str
+    total_sold: int
+    total_revenue: float
+
+class TopAuthor(BaseModel):
+    author: str
+    total_sold: int
+    total_revenue: float
+
+# Everything the dashboard page needs, in one response
+class DashboardSummary(BaseModel):
+    total_books: int
+    total_customers: int
+    total_sales: int
+    total_revenue: float
+    monthly_sales: List[MonthlySales]
+    top_books: List[TopBook]
+    top_authors: List[TopAuthor]
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List
+
+class Recommendation(BaseModel):
+    book_id: int
+    title: str
+    author: str
+    price: float
+    recommendation_type: str  # collaborative_filtering, content_based, popularity_based or trending
+
+class BatchRecommendationRequest(BaseModel):
+    customer_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    n: int = Field(5, ge=1, le=50)
+
+class CustomerRecommendations(BaseModel):
+    customer_id: int
+    recommendations: List[Recommendation]
+
+# Latency of one endpoint over its most recent requests
+class EndpointLatency(BaseModel):
+    count: int  # Requests served since startup
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+class RecommendationMetrics(BaseModel):
+    model_loaded: bool
+    last_sale_id: int  # High-water mark of the loaded model
+    endpoints: Dict[str, EndpointLatency]
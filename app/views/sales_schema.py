@@ -1,6 +1,7 @@
 from datetime import date as date_type
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from app.views.bulk_schema import BulkError
 
 class SaleCreate(BaseModel):
     book_id: int
@@ -31,4 +32,12 @@ class SaleDetail(BaseModel):
     total_amount: float  # This will be calculated (quantity * book price)
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+# For bulk updates, where each item carries the ID of the sale to change
+class SaleUpdate(SaleCreate):
+    id: int
+
+class SaleBulkResult(BaseModel):
+    items: List[SaleDetail]
+    errors: List[BulkError]
@@ -1,39 +1,123 @@
+import argparse
+import glob
+import hashlib
+import itertools
+import multiprocessing
 import pandas as pd
 import numpy as np
 import sqlite3
 import os
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def clean_and_import_data(sales_csv_path):
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+from app.connection import DB_PATH, PRAGMAS
+from app.migrations import apply_migrations
+
+# Sales rows inserted per executemany call
+IMPORT_BATCH_SIZE = 50000
+
+# Raw rows read, cleaned and imported at a time by stream_clean_and_import
+STREAM_CHUNK_SIZE = 100000
+
+# Folder the stores' daily CSVs are dropped into, for ingest_directory
+RAW_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'raw')
+
+# Columns (once cleaned) every file ingested by ingest_directory must have
+INGEST_COLUMNS = ['title', 'author', 'price', 'customer_name', 'date', 'quantity']
+
+# Types the raw columns are read as (by cleaned column name): titles and authors as categories,
+# so each distinct one is stored once, and quantity (which has gaps, so can't be read as an
+# integer) as float32. Customer columns stay plain text: with one category per customer,
+# building the categories costs more than it saves. Price stays float64: float32 would change
+# the stored prices (12.99 becomes 12.9899998).
+READ_DTYPES = {
+    'title': 'category',
+    'author': 'category',
+    'quantity': 'float32',
+}
+
+# What one import added, the sales it skipped as already imported, and how long it took
+ImportResult = namedtuple('ImportResult', ['books', 'customers', 'sales', 'skipped', 'seconds'])
+
+# What one batch ingest did: files imported, skipped as already ingested and failed, raw rows
+# read and sales imported, and the wall-clock seconds taken
+IngestResult = namedtuple('IngestResult', ['files', 'skipped', 'failed', 'rows', 'sales', 'seconds'])
+
+# Book and customer IDs by natural key: books by (title, author), customers by name and by email
+ImportKeys = namedtuple('ImportKeys', ['books', 'customer_names', 'customer_emails'])
+
+# Per-row trigger that adds each new sale to the summary tables (db/migrations/0002_sales_summaries.sql).
+# A bulk import suspends it and applies these set-based equivalents to all its sales (SaleID > ?) at once.
+SALES_INSERT_TRIGGER = 'trg_sales_insert_summaries'
+SUMMARY_DELTAS = (
     """
-    Cleans the raw sales data and imports it into the bookstore database.
+    INSERT INTO SalesByBook (BookID, SaleCount, TotalSold, TotalRevenue)
+    SELECT s.BookID, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+    FROM Sales s JOIN Books b ON s.BookID = b.BookID
+    WHERE s.SaleID > ?
+    GROUP BY s.BookID
+    ON CONFLICT (BookID) DO UPDATE SET
+        SaleCount = SaleCount + excluded.SaleCount,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue
+    """,
+    """
+    INSERT INTO SalesByAuthor (Author, SaleCount, TotalSold, TotalRevenue)
+    SELECT b.Author, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+    FROM Sales s JOIN Books b ON s.BookID = b.BookID
+    WHERE s.SaleID > ?
+    GROUP BY b.Author
+    ON CONFLICT (Author) DO UPDATE SET
+        SaleCount = SaleCount + excluded.SaleCount,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue
+    """,
+    """
+    INSERT INTO SalesByCustomer (CustomerID, TotalTransactions, TotalBooksBought, TotalSpent)
+    SELECT s.CustomerID, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+    FROM Sales s
+    JOIN Books b ON s.BookID = b.BookID
+    JOIN Customers c ON s.CustomerID = c.CustomerID
+    WHERE s.SaleID > ?
+    GROUP BY s.CustomerID
+    ON CONFLICT (CustomerID) DO UPDATE SET
+        TotalTransactions = TotalTransactions + excluded.TotalTransactions,
+        TotalBooksBought = TotalBooksBought + excluded.TotalBooksBought,
+        TotalSpent = TotalSpent + excluded.TotalSpent
+    """,
+    """
+    INSERT INTO SalesByDay (Date, SaleCount, TotalSold, TotalRevenue)
+    SELECT s.Date, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+    FROM Sales s JOIN Books b ON s.BookID = b.BookID
+    WHERE s.SaleID > ? AND s.Date IS NOT NULL
+    GROUP BY s.Date
+    ON CONFLICT (Date) DO UPDATE SET
+        SaleCount = SaleCount + excluded.SaleCount,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue
+    """,
+)
+
+def clean_sales_frame(df, verbose=True):
+    """
+    Cleans raw sales rows (already de-duplicated): normalizes column names, fills
+    missing values, fixes types and adds the derived columns.
     """
-    print("Loading raw sales data...")
-    # Load the raw sales data
-    df = pd.read_csv(sales_csv_path)
-    
-    # Display initial data info
-    print(f"Initial data shape: {df.shape}")
-    print("\nData types before cleaning:")
-    print(df.dtypes)
-    
-    # Step 1: Basic cleaning
-    print("\nPerforming basic cleaning...")
-    
-    # Remove duplicates
-    initial_rows = len(df)
-    df = df.drop_duplicates()
-    print(f"Removed {initial_rows - len(df)} duplicate rows")
-    
     # Clean column names (remove spaces, make lowercase)
-    df.columns = [col.strip().lower().replace(' ', '_') for col in df.columns]
+    df.columns = [_column_name(col) for col in df.columns]
     
     # Step 2: Handle missing values
-    print("\nHandling missing values...")
-    
-    # Check for missing values
-    missing_values = df.isnull().sum()
-    print(f"Missing values per column:\n{missing_values}")
+    if verbose:
+        print("\nHandling missing values...")
+        
+        # Check for missing values
+        missing_values = df.isnull().sum()
+        print(f"Missing values per column:\n{missing_values}")
     
     # Fill missing numeric values with mean or median
     if 'price' in df.columns:
@@ -41,21 +125,23 @@ def clean_and_import_data(sales_csv_path):
     
     if 'quantity' in df.columns:
         df['quantity'] = df['quantity'].fillna(1)  # Default quantity to 1
-        # Ensure quantity is at least 1 and an integer
-        df['quantity'] = df['quantity'].apply(lambda x: max(1, int(x)))
+        # Ensure quantity is at least 1 and an integer (truncated, like int())
+        df['quantity'] = df['quantity'].astype(np.int32).clip(lower=1)
     
     # Fill missing text values with placeholder
     for col in ['title', 'author']:
         if col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and "Unknown" not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories("Unknown")
             df[col] = df[col].fillna("Unknown")
     
     # Step 3: Data transformation
-    print("\nTransforming data...")
+    if verbose:
+        print("\nTransforming data...")
     
     # Ensure price is a float and positive
     if 'price' in df.columns:
-        df['price'] = pd.to_numeric(df['price'], errors='coerce')
-        df['price'] = df['price'].apply(lambda x: max(0, x) if not pd.isna(x) else 0)
+        df['price'] = pd.to_numeric(df['price'], errors='coerce').fillna(0).clip(lower=0)
     
     # Format dates properly
     if 'date' in df.columns:
@@ -71,115 +157,484 @@ def clean_and_import_data(sales_csv_path):
         df['total_amount'] = df['price'] * df['quantity']
     
     # Step 4: Data validation
-    print("\nValidating data...")
-    
-    # Check for any remaining missing values
-    remaining_missing = df.isnull().sum().sum()
-    print(f"Remaining missing values: {remaining_missing}")
+    if verbose:
+        print("\nValidating data...")
+        
+        # Check for any remaining missing values
+        remaining_missing = df.isnull().sum().sum()
+        print(f"Remaining missing values: {remaining_missing}")
     
     # Skip rows that still have missing critical values
     critical_columns = ['title', 'author', 'price'] if 'price' in df.columns else []
     if critical_columns:
         initial_count = len(df)
         df = df.dropna(subset=critical_columns)
-        print(f"Removed {initial_count - len(df)} rows with missing critical values")
+        if verbose:
+            print(f"Removed {initial_count - len(df)} rows with missing critical values")
+    
+    return df
+
+def _column_name(col):
+    """Normalized column name: stripped, lowercase, spaces as underscores"""
+    return col.strip().lower().replace(' ', '_')
+
+def _read_dtypes(columns):
+    """READ_DTYPES keyed by the raw column names it applies to"""
+    return {col: READ_DTYPES[_column_name(col)] for col in columns if _column_name(col) in READ_DTYPES}
+
+def _read_raw(sales_csv_path, verbose=True):
+    """Read a raw sales CSV with the READ_DTYPES column types"""
+    try:
+        return pd.read_csv(sales_csv_path, dtype=_read_dtypes(pd.read_csv(sales_csv_path, nrows=0).columns))
+    except ValueError:
+        # A quantity that isn't a number; read untyped and let cleaning coerce it
+        if verbose:
+            print("Non-numeric quantities found, reading without column types")
+        return pd.read_csv(sales_csv_path)
+
+def _open_database(db_path):
+    """Connect to the bookstore database, creating the tables and applying migrations as needed"""
+    conn = sqlite3.connect(db_path)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    
+    # Create tables if they don't exist, then bring indexes up to date
+    create_tables(conn.cursor())
+    conn.commit()
+    apply_migrations(conn)
+    return conn
+
+def _print_import(result):
+    """Print what an import added and its throughput"""
+    print(f"Imported {result.books} new books, {result.customers} new customers and "
+          f"{result.sales} sales in {result.seconds:.2f}s "
+          f"({result.sales / max(result.seconds, 1e-9):,.0f} sales/sec); "
+          f"skipped {result.skipped} sales already imported")
+
+def clean_and_import_data(sales_csv_path, db_path=DB_PATH):
+    """
+    Cleans the raw sales data and imports it into the bookstore database.
+    """
+    print("Loading raw sales data...")
+    # Load the raw sales data
+    df = _read_raw(sales_csv_path)
+    
+    # Display initial data info
+    print(f"Initial data shape: {df.shape}")
+    print("\nData types before cleaning:")
+    print(df.dtypes)
+    
+    # Step 1: Basic cleaning
+    print("\nPerforming basic cleaning...")
+    
+    # Remove duplicates
+    initial_rows = len(df)
+    df = df.drop_duplicates()
+    print(f"Removed {initial_rows - len(df)} duplicate rows")
+    
+    # Steps 2-4: missing values, transformation and validation
+    df = clean_sales_frame(df)
     
     # Step 5: Import to database
     print("\nImporting data to database...")
+    conn = _open_database(db_path)
+    result = import_sales_frame(conn, df)
+    conn.close()
     
-    # Connect to SQLite database
-    conn = sqlite3.connect('../db/bookstore.db')
-    cursor = conn.cursor()
+    _print_import(result)
+    print("Data import complete!")
+    return df
+
+def _unseen(hashes, seen):
+    """Mask of the hashes that are neither in the sorted array `seen` nor repeats of an earlier one"""
+    first = np.zeros(len(hashes), dtype=bool)
+    first[np.unique(hashes, return_index=True)[1]] = True
+    if len(seen):
+        positions = np.minimum(np.searchsorted(seen, hashes), len(seen) - 1)
+        first &= seen[positions] != hashes
+    return first
+
+def stream_clean_and_import(sales_csv_path, db_path=DB_PATH, output_path=None, chunksize=STREAM_CHUNK_SIZE):
+    """
+    Clean and import a raw sales CSV chunk by chunk, in memory bounded by the chunk size
+
+    Each chunk of `chunksize` rows is de-duplicated against every row before it,
+    cleaned, imported in its own transaction and appended to `output_path`, so the
+    whole file is never in memory. Duplicates are found by a 64-bit hash of each
+    raw row, kept in a sorted array: the only state that grows with the input is
+    8 bytes per distinct row (plus the book and customer key dictionaries). Unlike
+    clean_and_import_data, missing prices are filled with the chunk's median price,
+    and a failure leaves the chunks before it imported.
+
+    Args:
+        sales_csv_path: Raw sales CSV
+        db_path: Database to import into
+        output_path: CSV the cleaned rows are appended to, if given (overwritten first)
+        chunksize: Raw rows read, cleaned and imported at a time
+
+    Returns:
+        ImportResult totals over every chunk
+    """
+    # Columns are read as text (repeated text as categories) and the numeric ones converted
+    # the same way in every chunk, so a duplicate row hashes the same wherever it appears
+    columns = pd.read_csv(sales_csv_path, nrows=0).columns
+    dtypes = {col: str for col in columns}
+    dtypes.update({col: dtype for col, dtype in _read_dtypes(columns).items() if dtype == 'category'})
+    numeric = {col: np.float32 if _column_name(col) == 'quantity' else np.float64
+               for col in columns if _column_name(col) in ('price', 'quantity')}
+    seen = np.empty(0, dtype=np.uint64)
+    totals = ImportResult(0, 0, 0, 0, 0.0)
+    rows_read = duplicates = 0
+    start = time.perf_counter()
+    
+    conn = _open_database(db_path)
+    keys = load_import_keys(conn)
+    try:
+        chunks = pd.read_csv(sales_csv_path, dtype=dtypes, chunksize=chunksize)
+        for number, chunk in enumerate(chunks, 1):
+            rows_read += len(chunk)
+            for col, dtype in numeric.items():
+                chunk[col] = pd.to_numeric(chunk[col], errors='coerce').astype(dtype)
+            
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            unseen = _unseen(hashes, seen)
+            new_hashes = np.sort(hashes[unseen])
+            seen = np.insert(seen, np.searchsorted(seen, new_hashes), new_hashes)
+            duplicates += len(chunk) - int(unseen.sum())
+            
+            df = clean_sales_frame(chunk[unseen].copy(), verbose=False)
+            if len(df):
+                result = import_sales_frame(conn, df, keys=keys, verbose=False)
+                totals = ImportResult(*(a + b for a, b in zip(totals, result)))
+            if output_path:
+                df.to_csv(output_path, mode='w' if number == 1 else 'a', header=number == 1, index=False)
+            print(f"Chunk {number}: {rows_read} rows read, {duplicates} duplicates, {totals.sales} sales imported "
+                  f"({rows_read / (time.perf_counter() - start):,.0f} rows/sec)")
+    finally:
+        conn.close()
+    
+    _print_import(totals)
+    return totals
+
+def _file_hash(path):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _clean_file(path):
+    """Read, de-duplicate and clean one raw file (run in a worker process); returns (rows read, cleaned rows)"""
+    df = _read_raw(path, verbose=False)
+    rows_read = len(df)
+    df = clean_sales_frame(df.drop_duplicates(), verbose=False)
+    # Anything else would import no sales yet be recorded as ingested
+    missing = [col for col in INGEST_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"not a sales file, missing {', '.join(missing)}")
+    return rows_read, df
+
+def _cleaned_files(executor, pending, max_in_flight):
+    """
+    Clean the pending (path, content hash) files on the executor, yielding ((path,
+    content hash), future) in file order. At most max_in_flight files are submitted
+    at once, so cleaned frames never pile up ahead of the writer. Importing in file
+    order keeps the result the same whatever the number of workers (a book's price
+    and a customer's email are taken from the first file they appear in).
+    """
+    pending = iter(pending)
+    in_flight = deque()
+    while True:
+        for path, content_hash in itertools.islice(pending, max_in_flight - len(in_flight)):
+            in_flight.append(((path, content_hash), executor.submit(_clean_file, path)))
+        if not in_flight:
+            return
+        yield in_flight.popleft()
+
+def ingest_directory(raw_dir=RAW_DIR, db_path=DB_PATH, workers=None, pattern='*.csv'):
+    """
+    Ingest every raw sales file in a folder that hasn't been ingested before
+
+    Files are cleaned in parallel by a pool of worker processes. Cleaned rows go
+    back to this process, the only one writing to the database (SQLite allows a
+    single writer), which imports each file in one transaction and records it in
+    the IngestedFiles manifest in that same transaction. A file is identified by
+    its SHA-256, so one already in the manifest is skipped whatever its name,
+    and a file that fails is left out of it and retried on the next run.
+
+    Args:
+        raw_dir: Folder to scan
+        db_path: Database to import into
+        workers: Cleaning processes (default: one per core)
+        pattern: File name pattern to ingest
+
+    Returns:
+        IngestResult
+    """
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    conn = _open_database(db_path)
+    try:
+        ingested = {row[0] for row in conn.execute("SELECT ContentHash FROM IngestedFiles")}
+        pending = []
+        skipped = 0
+        for path in sorted(glob.glob(os.path.join(raw_dir, pattern))):
+            content_hash = _file_hash(path)
+            if content_hash in ingested:
+                skipped += 1
+                print(f"Skipping {os.path.basename(path)} (already ingested)")
+            else:
+                pending.append((path, content_hash))
+                ingested.add(content_hash)  # The same file twice in one folder
+        print(f"Ingesting {len(pending)} files with {workers} workers ({skipped} already ingested)")
+        
+        keys = load_import_keys(conn)
+        files = failed = rows = sales = 0
+        # Workers are started fresh rather than forked, so none inherits the open connection
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            for number, ((path, content_hash), future) in enumerate(
+                    _cleaned_files(executor, pending, 2 * workers), 1):
+                name = os.path.basename(path)
+                try:
+                    rows_read, df = future.result()
+                    result = import_sales_frame(conn, df, keys=keys, verbose=False, commit=False)
+                    conn.execute("""
+                        INSERT INTO IngestedFiles (ContentHash, FileName, RowsRead, SalesImported)
+                        VALUES (?, ?, ?, ?)
+                    """, (content_hash, name, rows_read, result.sales))
+                    conn.commit()
+                except Exception as e:
+                    if conn.in_transaction:
+                        conn.rollback()
+                    # Keys inserted by a rolled-back import no longer exist
+                    keys = load_import_keys(conn)
+                    failed += 1
+                    print(f"[{number}/{len(pending)}] {name}: failed ({type(e).__name__}: {e})")
+                    continue
+                files += 1
+                rows += rows_read
+                sales += result.sales
+                elapsed = time.perf_counter() - start
+                print(f"[{number}/{len(pending)}] {name}: {rows_read} rows, {result.sales} sales imported, "
+                      f"{result.skipped} already imported ({rows / elapsed:,.0f} rows/sec overall)")
+    finally:
+        conn.close()
+    
+    result = IngestResult(files, skipped, failed, rows, sales, time.perf_counter() - start)
+    print(f"Ingested {result.files} files ({result.rows} rows, {result.sales} sales) in {result.seconds:.2f}s "
+          f"({result.rows / max(result.seconds, 1e-9):,.0f} rows/sec); "
+          f"{result.skipped} skipped, {result.failed} failed")
+    return result
+
+def load_import_keys(conn):
+    """IDs of every book and customer in the database by natural key, to resolve imported rows against"""
+    keys = ImportKeys({}, {}, {})
+    for book_id, title, author in conn.execute("SELECT BookID, Title, Author FROM Books ORDER BY BookID"):
+        keys.books.setdefault((title, author), book_id)
+    for customer_id, name, email in conn.execute("SELECT CustomerID, Name, Email FROM Customers ORDER BY CustomerID"):
+        keys.customer_names.setdefault(name, customer_id)
+        keys.customer_emails.setdefault(email, customer_id)
+    return keys
+
+def _resolve_books(cursor, books, keys):
+    """
+    BookID for each (title, author, price) row of `books`, inserting the books not yet known
+
+    A book matches an existing one on title and author; new books are added in one
+    executemany and recorded in `keys`.
+
+    Returns:
+        (array of BookIDs aligned with `books`, number of books inserted)
+    """
+    known = keys.books
+    last_id = cursor.execute("SELECT COALESCE(MAX(BookID), 0) FROM Books").fetchone()[0]
     
-    # Create tables if they don't exist
-    create_tables(cursor)
+    new_books = [(title, author, float(price)) for title, author, price in books
+                 if (title, author) not in known]
+    cursor.executemany("INSERT INTO Books (Title, Author, Price) VALUES (?, ?, ?)", new_books)
+    for book_id, title, author in cursor.execute(
+            "SELECT BookID, Title, Author FROM Books WHERE BookID > ? ORDER BY BookID", (last_id,)):
+        known.setdefault((title, author), book_id)
     
-    # Import unique books
-    if all(col in df.columns for col in ['title', 'author', 'price']):
-        books_df = df[['title', 'author', 'price']].drop_duplicates()
-        print(f"Importing {len(books_df)} unique books...")
+    return np.array([known[(title, author)] for title, author, _ in books], dtype=np.int64), len(new_books)
+
+def _resolve_customers(cursor, customers, keys):
+    """
+    CustomerID for each (name, email) row of `customers`, inserting the customers not yet known
+
+    As with the per-row import this replaces, a customer matches an existing one with the
+    same name or the same email; new customers are added in one executemany and recorded
+    in `keys`.
+
+    Returns:
+        (array of CustomerIDs aligned with `customers`, number of customers inserted)
+    """
+    by_name, by_email = keys.customer_names, keys.customer_emails
+    last_id = cursor.execute("SELECT COALESCE(MAX(CustomerID), 0) FROM Customers").fetchone()[0]
+    
+    new_customers, new_emails = [], set()
+    for name, email in customers:
+        if name not in by_name and email not in by_email and email not in new_emails:
+            new_customers.append((name, email))
+            new_emails.add(email)
+    cursor.executemany("INSERT INTO Customers (Name, Email) VALUES (?, ?)", new_customers)
+    for customer_id, name, email in cursor.execute(
+            "SELECT CustomerID, Name, Email FROM Customers WHERE CustomerID > ? ORDER BY CustomerID", (last_id,)):
+        by_name.setdefault(name, customer_id)
+        by_email.setdefault(email, customer_id)
+    
+    ids = [by_name[name] if name in by_name else by_email[email] for name, email in customers]
+    return np.array(ids, dtype=np.int64), len(new_customers)
+
+def _sale_hashes(book_ids, customer_ids, dates, quantities):
+    """64-bit content hash of each sale (book and customer IDs, date, quantity), signed to fit SQLite's INTEGER"""
+    sales = pd.DataFrame({
+        'book_id': np.asarray(book_ids, dtype=np.int64),
+        'customer_id': np.asarray(customer_ids, dtype=np.int64),
+        'date': np.asarray(dates, dtype=object),
+        'quantity': np.asarray(quantities, dtype=np.int64),
+    })
+    return pd.util.hash_pandas_object(sales, index=False).to_numpy().view(np.int64)
+
+def _record_existing_sales(conn, cursor, batch_size):
+    """
+    Record the sales already in the database in ImportedSaleRows, if no sale has been recorded
+    yet: sales imported before row tracking existed then aren't imported a second time
+    """
+    if cursor.execute("SELECT EXISTS (SELECT 1 FROM ImportedSaleRows)").fetchone()[0]:
+        return
+    existing = conn.execute("SELECT BookID, CustomerID, Date, Quantity FROM Sales")
+    while sales := existing.fetchmany(batch_size):
+        cursor.executemany("INSERT OR IGNORE INTO ImportedSaleRows (RowHash) VALUES (?)",
+                           zip(_sale_hashes(*zip(*sales)).tolist()))
+
+def _new_sales(cursor, hashes):
+    """
+    Positions of the sales whose hash isn't in ImportedSaleRows (the first of any repeated
+    in `hashes`), recording them there. The hashes are staged in a temporary table and
+    anti-joined against ImportedSaleRows in SQLite, so the recorded hashes never leave it.
+    """
+    first = np.sort(np.unique(hashes, return_index=True)[1])
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS ImportBatch (RowHash INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM temp.ImportBatch")
+    # In key order, so each insert appends to the B-tree instead of landing on a random page
+    cursor.executemany("INSERT INTO temp.ImportBatch (RowHash) VALUES (?)", zip(np.sort(hashes[first]).tolist()))
+    cursor.execute("DELETE FROM temp.ImportBatch WHERE RowHash IN (SELECT RowHash FROM main.ImportedSaleRows)")
+    cursor.execute("INSERT INTO main.ImportedSaleRows (RowHash) SELECT RowHash FROM temp.ImportBatch")
+    # Read back in rowid order, so already sorted for the lookup
+    new = np.fromiter((row[0] for row in cursor.execute("SELECT RowHash FROM temp.ImportBatch")), dtype=np.int64)
+    cursor.execute("DELETE FROM temp.ImportBatch")
+    if not len(new):
+        return first[:0]
+    candidates = hashes[first]
+    return first[new[np.minimum(np.searchsorted(new, candidates), len(new) - 1)] == candidates]
+
+def import_sales_frame(conn, df, batch_size=IMPORT_BATCH_SIZE, keys=None, verbose=True, commit=True):
+    """
+    Import cleaned sales rows (with their books and customers) in one transaction
+
+    Books and customers are resolved once per distinct key against dictionaries of
+    what the database already holds, so no row costs a lookup query. Every sale is
+    then mapped to its IDs with array indexing and inserted by executemany in
+    batches of `batch_size`. The per-row summary trigger is suspended for the
+    import and the summary tables are updated once from all the new sales;
+    everything, the trigger's removal included, is one transaction, so other
+    connections never see the tables without it.
+
+    Importing is idempotent: each sale's content hash (book, customer, date and
+    quantity) is recorded in ImportedSaleRows, and a sale whose hash is already
+    there, from an earlier import or earlier in df, is skipped. A sale deleted
+    since it was imported is not imported again.
+
+    Args:
+        conn: Open database connection; committed on success (see `commit`), rolled back on error
+        df: Cleaned sales with title, author, price and, for sales to be imported,
+            customer_name, date and quantity columns (customer_email is optional)
+        batch_size: Sales rows per executemany call
+        keys: ImportKeys to resolve books and customers against, updated with the ones
+            inserted (loaded from the database if not given). Discard them if the import fails.
+        verbose: Print progress
+        commit: Commit the transaction; if false the caller can add to it and commits it
+
+    Returns:
+        ImportResult with the numbers of books, customers and sales inserted, of sales skipped
+        as already imported, and the seconds taken
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    new_books = new_customers = sales = skipped = 0
+    if not conn.in_transaction:
+        cursor.execute("BEGIN")
+    try:
+        if keys is None:
+            keys = load_import_keys(conn)
         
-        for _, book in books_df.iterrows():
-            # Check if book already exists
-            cursor.execute("SELECT BookID FROM Books WHERE Title = ? AND Author = ?", 
-                        (book['title'], book['author']))
-            result = cursor.fetchone()
-            
-            if result:
-                book_id = result[0]
-            else:
-                cursor.execute(
-                    "INSERT INTO Books (Title, Author, Price) VALUES (?, ?, ?)",
-                    (book['title'], book['author'], float(book['price']))
-                )
-                book_id = cursor.lastrowid
-    
-    # Import customers if present in the data
-    customer_id_map = {}  # To map customer names/emails to IDs
-    
-    if 'customer_name' in df.columns:
-        customers_df = df[['customer_name']].drop_duplicates()
-        if 'customer_email' in df.columns:
-            customers_df['customer_email'] = df['customer_email']
-        else:
-            # Generate dummy emails if not present
-            customers_df['customer_email'] = customers_df['customer_name'].apply(
-                lambda name: f"{name.lower().replace(' ', '.')}@example.com"
-            )
+        # Import unique books
+        book_ids = None
+        if all(col in df.columns for col in ['title', 'author', 'price']):
+            book_codes, book_keys = pd.factorize(pd.MultiIndex.from_frame(df[['title', 'author']]))
+            first_rows = np.unique(book_codes, return_index=True)[1]
+            books = list(zip(book_keys.get_level_values(0).tolist(), book_keys.get_level_values(1).tolist(),
+                             df['price'].to_numpy()[first_rows].tolist()))
+            if verbose:
+                print(f"Importing {len(books)} unique books...")
+            book_ids, new_books = _resolve_books(cursor, books, keys)
+            book_ids = book_ids[book_codes]
         
-        print(f"Importing {len(customers_df)} unique customers...")
+        # Import customers if present in the data
+        customer_ids = None
+        if 'customer_name' in df.columns:
+            customer_codes, names = pd.factorize(df['customer_name'])
+            first_rows = np.unique(customer_codes, return_index=True)[1]
+            if 'customer_email' in df.columns:
+                emails = df['customer_email'].to_numpy()[first_rows].tolist()
+            else:
+                # Generate dummy emails if not present
+                emails = (pd.Series(names).str.lower().str.replace(' ', '.', regex=False) + "@example.com").tolist()
+            customers = list(zip(names.tolist(), emails))
+            if verbose:
+                print(f"Importing {len(customers)} unique customers...")
+            customer_ids, new_customers = _resolve_customers(cursor, customers, keys)
+            customer_ids = customer_ids[customer_codes]
         
-        for _, customer in customers_df.iterrows():
-            name = customer['customer_name']
-            email = customer['customer_email']
+        # Import sales if we have all required fields
+        if book_ids is not None and customer_ids is not None and all(col in df.columns for col in ['quantity', 'date']):
+            dates = df['date'].to_numpy()
+            quantities = df['quantity'].to_numpy().astype(np.int64)
             
-            # Check if customer already exists
-            cursor.execute("SELECT CustomerID FROM Customers WHERE Name = ? OR Email = ?", 
-                        (name, email))
-            result = cursor.fetchone()
+            # Keep only the sales not imported before
+            _record_existing_sales(conn, cursor, batch_size)
+            new_rows = _new_sales(cursor, _sale_hashes(book_ids, customer_ids, dates, quantities))
+            book_ids, customer_ids, dates, quantities = (
+                column[new_rows] for column in (book_ids, customer_ids, dates, quantities))
+            skipped = len(df) - len(new_rows)
+            if verbose:
+                print(f"Importing {len(new_rows)} sales records ({skipped} already imported)...")
             
-            if result:
-                customer_id = result[0]
-            else:
-                cursor.execute(
-                    "INSERT INTO Customers (Name, Email) VALUES (?, ?)",
-                    (name, email)
+            last_sale_id = cursor.execute("SELECT COALESCE(MAX(SaleID), 0) FROM Sales").fetchone()[0]
+            trigger = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                                     (SALES_INSERT_TRIGGER,)).fetchone()
+            if trigger:
+                cursor.execute(f"DROP TRIGGER {SALES_INSERT_TRIGGER}")
+            for batch in range(0, len(new_rows), batch_size):
+                rows = slice(batch, batch + batch_size)
+                cursor.executemany(
+                    "INSERT INTO Sales (BookID, CustomerID, Date, Quantity) VALUES (?, ?, ?, ?)",
+                    zip(book_ids[rows].tolist(), customer_ids[rows].tolist(), dates[rows].tolist(),
+                        quantities[rows].tolist())
                 )
-                customer_id = cursor.lastrowid
-                
-            customer_id_map[name] = customer_id
-    
-    # Import sales if we have all required fields
-    if all(col in df.columns for col in ['title', 'quantity', 'date']):
-        if 'customer_name' in df.columns:
-            print(f"Importing {len(df)} sales records...")
-            
-            for _, sale in df.iterrows():
-                # Get book ID
-                cursor.execute("SELECT BookID FROM Books WHERE Title = ? AND Author = ?", 
-                            (sale['title'], sale['author']))
-                book_result = cursor.fetchone()
-                
-                if book_result:
-                    book_id = book_result[0]
-                    
-                    # Get customer ID
-                    customer_name = sale['customer_name']
-                    if customer_name in customer_id_map:
-                        customer_id = customer_id_map[customer_name]
-                        
-                        # Insert sale
-                        cursor.execute(
-                            "INSERT INTO Sales (BookID, CustomerID, Date, Quantity) VALUES (?, ?, ?, ?)",
-                            (book_id, customer_id, sale['date'], int(sale['quantity']))
-                        )
-    
-    # Commit changes and close connection
-    conn.commit()
-    conn.close()
-    
-    print("Data import complete!")
-    return df
+            if trigger:
+                for delta in SUMMARY_DELTAS:
+                    cursor.execute(delta, (last_sale_id,))
+                cursor.execute(trigger[0])
+            sales = len(new_rows)
+        if commit:
+            conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return ImportResult(new_books, new_customers, sales, skipped, time.perf_counter() - start)
 
 def create_tables(cursor):
     """Creates database tables if they don't exist."""
@@ -215,11 +670,67 @@ def create_tables(cursor):
     )
     ''')
 
-def generate_sample_data():
+def generate_sales_frame(num_sales, num_books, num_customers, start_date='2023-01-01', days=365,
+                         taste=0.7, missing_rate=0.05, seed=42):
+    """
+    Generate synthetic raw sales at any scale, in the same layout as the sample CSV.
+
+    Books are spread over num_books // 5 authors. Each customer has a favourite
+    author and buys from them with probability `taste`; other purchases follow a
+    Zipf-like popularity curve. That gives recommenders real signal to find.
+    """
+    rng = np.random.default_rng(seed)
+    num_authors = max(num_books // 5, 1)
+
+    book_authors = rng.integers(0, num_authors, num_books)
+    book_prices = rng.uniform(5, 60, num_books).round(2)
+    popularity = 1.0 / np.arange(1, num_books + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    # Books of each author, for drawing "favourite author" purchases
+    order = np.argsort(book_authors, kind='stable')
+    author_starts = np.searchsorted(book_authors[order], np.arange(num_authors + 1))
+
+    customers = rng.integers(0, num_customers, num_sales)
+    favourites = rng.integers(0, num_authors, num_customers)[customers]
+    books = rng.choice(num_books, size=num_sales, p=popularity)
+    by_taste = rng.random(num_sales) < taste
+    counts = author_starts[favourites + 1] - author_starts[favourites]
+    by_taste &= counts > 0
+    picks = author_starts[favourites] + (rng.random(num_sales) * np.maximum(counts, 1)).astype(int)
+    books[by_taste] = order[picks[by_taste]]
+
+    dates = pd.Timestamp(start_date) + pd.to_timedelta(rng.integers(0, days, num_sales), unit='D')
+    quantities = rng.integers(1, 5, num_sales).astype(float)
+    quantities[rng.random(num_sales) < missing_rate] = np.nan
+
+    customer_numbers = pd.Series(customers + 1).astype(str)
+    return pd.DataFrame({
+        "title": "Book " + pd.Series(books + 1).astype(str),
+        "author": "Author " + pd.Series(book_authors[books] + 1).astype(str),
+        "price": book_prices[books],
+        "customer_name": "Customer " + customer_numbers,
+        "customer_email": "customer" + customer_numbers + "@example.com",
+        "date": dates.strftime('%Y-%m-%d'),
+        "quantity": quantities,
+    })
+
+def generate_sample_data(num_sales=50, num_books=None, num_customers=None, csv_path=None, seed=42):
     """
     Generate a sample CSV file with bookstore sales data for testing purposes.
+
+    With the defaults this is the small fixed sample (10 books, 5 customers, 50
+    sales). Pass num_books/num_customers to generate a synthetic dataset of any
+    size with generate_sales_frame instead.
     """
     print("Generating sample data...")
+    csv_path = csv_path or os.path.join(os.path.dirname(__file__), 'raw', 'sample_bookstore_sales.csv')
+    
+    if num_books is not None or num_customers is not None:
+        df = generate_sales_frame(num_sales, num_books or 1000, num_customers or 10000, seed=seed)
+        df.to_csv(csv_path, index=False)
+        print(f"Sample data generated and saved to {csv_path}")
+        return csv_path
     
     # Define sample data
     books = [
@@ -243,9 +754,8 @@ def generate_sample_data():
         {"name": "Michael Brown", "email": "michael.brown@example.com"}
     ]
     
-    # Generate 50 random sales
-    np.random.seed(42)  # For reproducibility
-    num_sales = 50
+    # Generate random sales
+    np.random.seed(seed)  # For reproducibility
     
     sales_data = []
     for _ in range(num_sales):
@@ -275,20 +785,35 @@ def generate_sample_data():
     
     # Create DataFrame and save to CSV
     df = pd.DataFrame(sales_data)
-    csv_path = os.path.join(os.path.dirname(__file__), 'raw', 'sample_bookstore_sales.csv')
     df.to_csv(csv_path, index=False)
     
     print(f"Sample data generated and saved to {csv_path}")
     return csv_path
 
 if __name__ == "__main__":
-    # Generate sample data if no file path is provided
-    csv_path = generate_sample_data()
+    parser = argparse.ArgumentParser(description="Clean a raw sales CSV and import it into the bookstore database")
+    parser.add_argument('csv_path', nargs='?', help="Raw sales CSV (generates the sample data if omitted)")
+    parser.add_argument('--chunksize', type=int, help="Stream the file in chunks of this many rows")
+    parser.add_argument('--ingest', nargs='?', const=RAW_DIR, metavar='DIR',
+                        help="Ingest every new CSV in DIR (default data/raw) in parallel")
+    parser.add_argument('--workers', type=int, help="Cleaning processes for --ingest (default: one per core)")
+    args = parser.parse_args()
+    
+    if args.ingest:
+        ingest_directory(args.ingest, workers=args.workers)
+        sys.exit(0)
     
-    # Clean and import the data
-    cleaned_df = clean_and_import_data(csv_path)
-    
-    # Save the cleaned data to a new CSV file
+    # Generate sample data if no file path is provided
+    csv_path = args.csv_path or generate_sample_data()
     cleaned_csv_path = os.path.join(os.path.dirname(__file__), 'processed', 'cleaned_bookstore_sales.csv')
-    cleaned_df.to_csv(cleaned_csv_path, index=False)
-    print(f"Cleaned data saved to {cleaned_csv_path}")
\ No newline at end of file
+    
+    if args.chunksize:
+        # Clean, import and save the data chunk by chunk
+        stream_clean_and_import(csv_path, output_path=cleaned_csv_path, chunksize=args.chunksize)
+    else:
+        # Clean and import the data
+        cleaned_df = clean_and_import_data(csv_path)
+        
+        # Save the cleaned data to a new CSV file
+        cleaned_df.to_csv(cleaned_csv_path, index=False)
+    print(f"Cleaned data saved to {cleaned_csv_path}")
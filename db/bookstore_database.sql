@@ -24,3 +24,6 @@ CREATE TABLE IF NOT EXISTS Sales (
     FOREIGN KEY (BookID) REFERENCES Books(BookID),
     FOREIGN KEY (CustomerID) REFERENCES Customers(CustomerID)
 );
+
+-- Indexes and later schema changes live in db/migrations and are applied by
+-- app/migrations.py (automatically on API startup, or: python -m app.migrations)
@@ -0,0 +1,17 @@
+-- Indexes for the joins and lookups on the hot query paths
+
+-- Sales by book (analytics by book/author, filters on book_id); covers Quantity
+CREATE INDEX IF NOT EXISTS idx_sales_book ON Sales (BookID, Quantity);
+
+-- Sales by customer (top customers, filters on customer_id)
+CREATE INDEX IF NOT EXISTS idx_sales_customer ON Sales (CustomerID, BookID, Quantity);
+
+-- Sales by date (date range filters, monthly reports)
+CREATE INDEX IF NOT EXISTS idx_sales_date ON Sales (Date, BookID, Quantity);
+
+-- Book lookups by title/author during import, and author filters
+CREATE INDEX IF NOT EXISTS idx_books_title_author ON Books (Title, Author);
+CREATE INDEX IF NOT EXISTS idx_books_author ON Books (Author, Price);
+
+-- Customer lookups by name (Email already has a UNIQUE index)
+CREATE INDEX IF NOT EXISTS idx_customers_name ON Customers (Name);
@@ -0,0 +1,325 @@
+-- Sales aggregates kept up to date by triggers, so the analytics endpoints
+-- read precomputed totals instead of re-aggregating the whole Sales table.
+-- Like the original analytics queries, revenue is Quantity * the book's current
+-- Price, and sales whose book (or, for customers, customer) no longer exists are
+-- left out. app/services/sales_summary_service.py can check and rebuild them.
+
+CREATE TABLE IF NOT EXISTS SalesByBook (
+    BookID INTEGER PRIMARY KEY,
+    SaleCount INTEGER NOT NULL,
+    TotalSold INTEGER NOT NULL,
+    TotalRevenue REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS SalesByAuthor (
+    Author TEXT PRIMARY KEY,
+    SaleCount INTEGER NOT NULL,
+    TotalSold INTEGER NOT NULL,
+    TotalRevenue REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS SalesByCustomer (
+    CustomerID INTEGER PRIMARY KEY,
+    TotalTransactions INTEGER NOT NULL,
+    TotalBooksBought INTEGER NOT NULL,
+    TotalSpent REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS SalesByDay (
+    Date TEXT PRIMARY KEY,
+    SaleCount INTEGER NOT NULL,
+    TotalSold INTEGER NOT NULL,
+    TotalRevenue REAL NOT NULL
+);
+
+-- Ranking indexes so the endpoints read rows already in result order
+CREATE INDEX IF NOT EXISTS idx_sales_by_book_sold ON SalesByBook (TotalSold DESC);
+CREATE INDEX IF NOT EXISTS idx_sales_by_author_sold ON SalesByAuthor (TotalSold DESC);
+CREATE INDEX IF NOT EXISTS idx_sales_by_customer_spent ON SalesByCustomer (TotalSpent DESC);
+
+-- Initial population
+INSERT INTO SalesByBook (BookID, SaleCount, TotalSold, TotalRevenue)
+SELECT s.BookID, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+FROM Sales s JOIN Books b ON s.BookID = b.BookID
+GROUP BY s.BookID;
+
+INSERT INTO SalesByAuthor (Author, SaleCount, TotalSold, TotalRevenue)
+SELECT b.Author, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+FROM Sales s JOIN Books b ON s.BookID = b.BookID
+GROUP BY b.Author;
+
+INSERT INTO SalesByCustomer (CustomerID, TotalTransactions, TotalBooksBought, TotalSpent)
+SELECT s.CustomerID, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+FROM Sales s
+JOIN Books b ON s.BookID = b.BookID
+JOIN Customers c ON s.CustomerID = c.CustomerID
+GROUP BY s.CustomerID;
+
+INSERT INTO SalesByDay (Date, SaleCount, TotalSold, TotalRevenue)
+SELECT s.Date, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+FROM Sales s JOIN Books b ON s.BookID = b.BookID
+WHERE s.Date IS NOT NULL
+GROUP BY s.Date;
+
+-- Sales: add the new row's contribution
+
+CREATE TRIGGER IF NOT EXISTS trg_sales_insert_summaries AFTER INSERT ON Sales
+BEGIN
+    INSERT INTO SalesByBook (BookID, SaleCount, TotalSold, TotalRevenue)
+    SELECT NEW.BookID, 1, NEW.Quantity, NEW.Quantity * Price FROM Books WHERE BookID = NEW.BookID
+    ON CONFLICT (BookID) DO UPDATE SET
+        SaleCount = SaleCount + 1,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+
+    INSERT INTO SalesByAuthor (Author, SaleCount, TotalSold, TotalRevenue)
+    SELECT Author, 1, NEW.Quantity, NEW.Quantity * Price FROM Books WHERE BookID = NEW.BookID
+    ON CONFLICT (Author) DO UPDATE SET
+        SaleCount = SaleCount + 1,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+
+    INSERT INTO SalesByCustomer (CustomerID, TotalTransactions, TotalBooksBought, TotalSpent)
+    SELECT NEW.CustomerID, 1, NEW.Quantity, NEW.Quantity * b.Price
+    FROM Books b JOIN Customers c ON c.CustomerID = NEW.CustomerID
+    WHERE b.BookID = NEW.BookID
+    ON CONFLICT (CustomerID) DO UPDATE SET
+        TotalTransactions = TotalTransactions + 1,
+        TotalBooksBought = TotalBooksBought + excluded.TotalBooksBought,
+        TotalSpent = TotalSpent + excluded.TotalSpent;
+
+    INSERT INTO SalesByDay (Date, SaleCount, TotalSold, TotalRevenue)
+    SELECT NEW.Date, 1, NEW.Quantity, NEW.Quantity * Price FROM Books
+    WHERE BookID = NEW.BookID AND NEW.Date IS NOT NULL
+    ON CONFLICT (Date) DO UPDATE SET
+        SaleCount = SaleCount + 1,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+END;
+
+-- Sales: remove the old row's contribution
+
+CREATE TRIGGER IF NOT EXISTS trg_sales_delete_summaries AFTER DELETE ON Sales
+BEGIN
+    UPDATE SalesByBook SET
+        SaleCount = SaleCount - 1,
+        TotalSold = TotalSold - OLD.Quantity,
+        TotalRevenue = TotalRevenue - OLD.Quantity * (SELECT Price FROM Books WHERE BookID = OLD.BookID)
+    WHERE BookID = OLD.BookID;
+    DELETE FROM SalesByBook WHERE BookID = OLD.BookID AND SaleCount <= 0;
+
+    UPDATE SalesByAuthor SET
+        SaleCount = SaleCount - 1,
+        TotalSold = TotalSold - OLD.Quantity,
+        TotalRevenue = TotalRevenue - OLD.Quantity * (SELECT Price FROM Books WHERE BookID = OLD.BookID)
+    WHERE Author = (SELECT Author FROM Books WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByAuthor WHERE Author = (SELECT Author FROM Books WHERE BookID = OLD.BookID) AND SaleCount <= 0;
+
+    UPDATE SalesByCustomer SET
+        TotalTransactions = TotalTransactions - 1,
+        TotalBooksBought = TotalBooksBought - OLD.Quantity,
+        TotalSpent = TotalSpent - OLD.Quantity * (SELECT Price FROM Books WHERE BookID = OLD.BookID)
+    WHERE CustomerID = OLD.CustomerID AND EXISTS (SELECT 1 FROM Books WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByCustomer WHERE CustomerID = OLD.CustomerID AND TotalTransactions <= 0;
+
+    UPDATE SalesByDay SET
+        SaleCount = SaleCount - 1,
+        TotalSold = TotalSold - OLD.Quantity,
+        TotalRevenue = TotalRevenue - OLD.Quantity * (SELECT Price FROM Books WHERE BookID = OLD.BookID)
+    WHERE Date = OLD.Date AND EXISTS (SELECT 1 FROM Books WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByDay WHERE Date = OLD.Date AND SaleCount <= 0;
+END;
+
+-- Sales: an update is the old row's removal plus the new row's addition
+
+CREATE TRIGGER IF NOT EXISTS trg_sales_update_summaries AFTER UPDATE OF BookID, CustomerID, Date, Quantity ON Sales
+BEGIN
+    UPDATE SalesByBook SET
+        SaleCount = SaleCount - 1,
+        TotalSold = TotalSold - OLD.Quantity,
+        TotalRevenue = TotalRevenue - OLD.Quantity * (SELECT Price FROM Books WHERE BookID = OLD.BookID)
+    WHERE BookID = OLD.BookID;
+    DELETE FROM SalesByBook WHERE BookID = OLD.BookID AND SaleCount <= 0;
+
+    UPDATE SalesByAuthor SET
+        SaleCount = SaleCount - 1,
+        TotalSold = TotalSold - OLD.Quantity,
+        TotalRevenue = TotalRevenue - OLD.Quantity * (SELECT Price FROM Books WHERE BookID = OLD.BookID)
+    WHERE Author = (SELECT Author FROM Books WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByAuthor WHERE Author = (SELECT Author FROM Books WHERE BookID = OLD.BookID) AND SaleCount <= 0;
+
+    UPDATE SalesByCustomer SET
+        TotalTransactions = TotalTransactions - 1,
+        TotalBooksBought = TotalBooksBought - OLD.Quantity,
+        TotalSpent = TotalSpent - OLD.Quantity * (SELECT Price FROM Books WHERE BookID = OLD.BookID)
+    WHERE CustomerID = OLD.CustomerID AND EXISTS (SELECT 1 FROM Books WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByCustomer WHERE CustomerID = OLD.CustomerID AND TotalTransactions <= 0;
+
+    UPDATE SalesByDay SET
+        SaleCount = SaleCount - 1,
+        TotalSold = TotalSold - OLD.Quantity,
+        TotalRevenue = TotalRevenue - OLD.Quantity * (SELECT Price FROM Books WHERE BookID = OLD.BookID)
+    WHERE Date = OLD.Date AND EXISTS (SELECT 1 FROM Books WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByDay WHERE Date = OLD.Date AND SaleCount <= 0;
+
+    INSERT INTO SalesByBook (BookID, SaleCount, TotalSold, TotalRevenue)
+    SELECT NEW.BookID, 1, NEW.Quantity, NEW.Quantity * Price FROM Books WHERE BookID = NEW.BookID
+    ON CONFLICT (BookID) DO UPDATE SET
+        SaleCount = SaleCount + 1,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+
+    INSERT INTO SalesByAuthor (Author, SaleCount, TotalSold, TotalRevenue)
+    SELECT Author, 1, NEW.Quantity, NEW.Quantity * Price FROM Books WHERE BookID = NEW.BookID
+    ON CONFLICT (Author) DO UPDATE SET
+        SaleCount = SaleCount + 1,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+
+    INSERT INTO SalesByCustomer (CustomerID, TotalTransactions, TotalBooksBought, TotalSpent)
+    SELECT NEW.CustomerID, 1, NEW.Quantity, NEW.Quantity * b.Price
+    FROM Books b JOIN Customers c ON c.CustomerID = NEW.CustomerID
+    WHERE b.BookID = NEW.BookID
+    ON CONFLICT (CustomerID) DO UPDATE SET
+        TotalTransactions = TotalTransactions + 1,
+        TotalBooksBought = TotalBooksBought + excluded.TotalBooksBought,
+        TotalSpent = TotalSpent + excluded.TotalSpent;
+
+    INSERT INTO SalesByDay (Date, SaleCount, TotalSold, TotalRevenue)
+    SELECT NEW.Date, 1, NEW.Quantity, NEW.Quantity * Price FROM Books
+    WHERE BookID = NEW.BookID AND NEW.Date IS NOT NULL
+    ON CONFLICT (Date) DO UPDATE SET
+        SaleCount = SaleCount + 1,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+END;
+
+-- Books: revenue follows the current price, and the author totals follow the book
+
+CREATE TRIGGER IF NOT EXISTS trg_books_update_summaries AFTER UPDATE OF Author, Price ON Books
+BEGIN
+    UPDATE SalesByBook SET TotalRevenue = TotalSold * NEW.Price WHERE BookID = NEW.BookID;
+
+    UPDATE SalesByAuthor SET
+        SaleCount = SaleCount - (SELECT SaleCount FROM SalesByBook WHERE BookID = NEW.BookID),
+        TotalSold = TotalSold - (SELECT TotalSold FROM SalesByBook WHERE BookID = NEW.BookID),
+        TotalRevenue = TotalRevenue - (SELECT TotalSold FROM SalesByBook WHERE BookID = NEW.BookID) * OLD.Price
+    WHERE Author = OLD.Author AND EXISTS (SELECT 1 FROM SalesByBook WHERE BookID = NEW.BookID);
+    DELETE FROM SalesByAuthor WHERE Author = OLD.Author AND SaleCount <= 0;
+
+    INSERT INTO SalesByAuthor (Author, SaleCount, TotalSold, TotalRevenue)
+    SELECT NEW.Author, SaleCount, TotalSold, TotalRevenue FROM SalesByBook WHERE BookID = NEW.BookID
+    ON CONFLICT (Author) DO UPDATE SET
+        SaleCount = SaleCount + excluded.SaleCount,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+
+    UPDATE SalesByCustomer SET
+        TotalSpent = TotalSpent + (NEW.Price - OLD.Price) * (
+            SELECT SUM(Quantity) FROM Sales
+            WHERE Sales.BookID = NEW.BookID AND Sales.CustomerID = SalesByCustomer.CustomerID
+        )
+    WHERE NEW.Price <> OLD.Price
+      AND CustomerID IN (SELECT CustomerID FROM Sales WHERE BookID = NEW.BookID);
+
+    UPDATE SalesByDay SET
+        TotalRevenue = TotalRevenue + (NEW.Price - OLD.Price) * (
+            SELECT SUM(Quantity) FROM Sales
+            WHERE Sales.BookID = NEW.BookID AND Sales.Date = SalesByDay.Date
+        )
+    WHERE NEW.Price <> OLD.Price
+      AND Date IN (SELECT Date FROM Sales WHERE BookID = NEW.BookID);
+END;
+
+-- Books/Customers: IDs can be reused after a delete, so existing sales that
+-- reference a newly inserted ID start counting again
+
+CREATE TRIGGER IF NOT EXISTS trg_books_insert_summaries AFTER INSERT ON Books
+BEGIN
+    INSERT INTO SalesByBook (BookID, SaleCount, TotalSold, TotalRevenue)
+    SELECT NEW.BookID, COUNT(*), SUM(Quantity), SUM(Quantity) * NEW.Price
+    FROM Sales WHERE BookID = NEW.BookID
+    GROUP BY BookID;
+
+    INSERT INTO SalesByAuthor (Author, SaleCount, TotalSold, TotalRevenue)
+    SELECT NEW.Author, SaleCount, TotalSold, TotalRevenue FROM SalesByBook WHERE BookID = NEW.BookID
+    ON CONFLICT (Author) DO UPDATE SET
+        SaleCount = SaleCount + excluded.SaleCount,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+
+    INSERT INTO SalesByCustomer (CustomerID, TotalTransactions, TotalBooksBought, TotalSpent)
+    SELECT s.CustomerID, COUNT(*), SUM(s.Quantity), SUM(s.Quantity) * NEW.Price
+    FROM Sales s JOIN Customers c ON s.CustomerID = c.CustomerID
+    WHERE s.BookID = NEW.BookID
+    GROUP BY s.CustomerID
+    ON CONFLICT (CustomerID) DO UPDATE SET
+        TotalTransactions = TotalTransactions + excluded.TotalTransactions,
+        TotalBooksBought = TotalBooksBought + excluded.TotalBooksBought,
+        TotalSpent = TotalSpent + excluded.TotalSpent;
+
+    INSERT INTO SalesByDay (Date, SaleCount, TotalSold, TotalRevenue)
+    SELECT Date, COUNT(*), SUM(Quantity), SUM(Quantity) * NEW.Price
+    FROM Sales WHERE BookID = NEW.BookID AND Date IS NOT NULL
+    GROUP BY Date
+    ON CONFLICT (Date) DO UPDATE SET
+        SaleCount = SaleCount + excluded.SaleCount,
+        TotalSold = TotalSold + excluded.TotalSold,
+        TotalRevenue = TotalRevenue + excluded.TotalRevenue;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_insert_summaries AFTER INSERT ON Customers
+BEGIN
+    INSERT INTO SalesByCustomer (CustomerID, TotalTransactions, TotalBooksBought, TotalSpent)
+    SELECT NEW.CustomerID, COUNT(*), SUM(s.Quantity), SUM(s.Quantity * b.Price)
+    FROM Sales s JOIN Books b ON s.BookID = b.BookID
+    WHERE s.CustomerID = NEW.CustomerID
+    GROUP BY s.CustomerID;
+END;
+
+-- Books/Customers: sales that lose their book or customer drop out of the totals
+
+CREATE TRIGGER IF NOT EXISTS trg_books_delete_summaries AFTER DELETE ON Books
+BEGIN
+    UPDATE SalesByAuthor SET
+        SaleCount = SaleCount - (SELECT SaleCount FROM SalesByBook WHERE BookID = OLD.BookID),
+        TotalSold = TotalSold - (SELECT TotalSold FROM SalesByBook WHERE BookID = OLD.BookID),
+        TotalRevenue = TotalRevenue - (SELECT TotalRevenue FROM SalesByBook WHERE BookID = OLD.BookID)
+    WHERE Author = OLD.Author AND EXISTS (SELECT 1 FROM SalesByBook WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByAuthor WHERE Author = OLD.Author AND SaleCount <= 0;
+    DELETE FROM SalesByBook WHERE BookID = OLD.BookID;
+
+    UPDATE SalesByCustomer SET
+        TotalTransactions = TotalTransactions - (
+            SELECT COUNT(*) FROM Sales
+            WHERE Sales.BookID = OLD.BookID AND Sales.CustomerID = SalesByCustomer.CustomerID
+        ),
+        TotalBooksBought = TotalBooksBought - (
+            SELECT SUM(Quantity) FROM Sales
+            WHERE Sales.BookID = OLD.BookID AND Sales.CustomerID = SalesByCustomer.CustomerID
+        ),
+        TotalSpent = TotalSpent - OLD.Price * (
+            SELECT SUM(Quantity) FROM Sales
+            WHERE Sales.BookID = OLD.BookID AND Sales.CustomerID = SalesByCustomer.CustomerID
+        )
+    WHERE CustomerID IN (SELECT CustomerID FROM Sales WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByCustomer WHERE TotalTransactions <= 0;
+
+    UPDATE SalesByDay SET
+        SaleCount = SaleCount - (
+            SELECT COUNT(*) FROM Sales WHERE Sales.BookID = OLD.BookID AND Sales.Date = SalesByDay.Date
+        ),
+        TotalSold = TotalSold - (
+            SELECT SUM(Quantity) FROM Sales WHERE Sales.BookID = OLD.BookID AND Sales.Date = SalesByDay.Date
+        ),
+        TotalRevenue = TotalRevenue - OLD.Price * (
+            SELECT SUM(Quantity) FROM Sales WHERE Sales.BookID = OLD.BookID AND Sales.Date = SalesByDay.Date
+        )
+    WHERE Date IN (SELECT Date FROM Sales WHERE BookID = OLD.BookID);
+    DELETE FROM SalesByDay WHERE SaleCount <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_customers_delete_summaries AFTER DELETE ON Customers
+BEGIN
+    DELETE FROM SalesByCustomer WHERE CustomerID = OLD.CustomerID;
+END;
@@ -0,0 +1,10 @@
+-- Raw sales files already imported by the batch ingest (data/bookstore_data_cleaning.py --ingest).
+-- Files are keyed by their content, so one is skipped however it is named or moved.
+
+CREATE TABLE IF NOT EXISTS IngestedFiles (
+    ContentHash TEXT PRIMARY KEY,       -- SHA-256 of the file
+    FileName TEXT NOT NULL,
+    RowsRead INTEGER NOT NULL,
+    SalesImported INTEGER NOT NULL,
+    IngestedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,10 @@
+-- Sales rows already written by the import (data/bookstore_data_cleaning.py), so
+-- re-importing a file, or an export that overlaps an earlier one, adds only the sales
+-- not seen before. Each row is a 64-bit hash of a sale's BookID, CustomerID, Date and
+-- Quantity. As the INTEGER PRIMARY KEY the hash is the rowid, so the import's anti-join
+-- is a B-tree lookup and each recorded sale takes a few bytes. Sales that existed before
+-- this table are recorded by the first import that runs after it is created.
+
+CREATE TABLE IF NOT EXISTS ImportedSaleRows (
+    RowHash INTEGER PRIMARY KEY
+);
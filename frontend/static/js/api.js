@@ -71,6 +71,11 @@ const salesApi = {
     getTopCustomers: () => apiRequest('/sales/analytics/top-customers')
 };
 
+// Dashboard API
+const dashboardApi = {
+    getSummary: () => apiRequest('/dashboard/summary')
+};
+
 // Display error toast
 function showError(message) {
     // You can implement a toast notification system here
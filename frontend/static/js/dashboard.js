@@ -15,81 +15,36 @@ async function loadDashboardData() {
     try {
         console.log('Loading dashboard data...');
         
-        await loadSummaryStats();
+        // Counts, revenue and chart series are all aggregated server-side in one request
+        const summary = await dashboardApi.getSummary();
         
-        await Promise.all([
-            loadTopBooksChart(),
-            loadMonthlySalesChart(),
-            loadAuthorRevenueChart()
-        ]);
+        loadSummaryStats(summary);
+        loadTopBooksChart(summary.top_books);
+        loadMonthlySalesChart(summary.monthly_sales);
+        loadAuthorRevenueChart(summary.top_authors);
         
         console.log('Dashboard data loaded successfully');
     } catch (error) {
         console.error('Error loading dashboard data:', error);
-        showError('Error loading dashboard data: ' + error.message);
-    }
-}
-
-async function loadSummaryStats() {
-    try {
-        console.log('Loading summary stats...');
-        
-        const [books, customers, sales] = await Promise.all([
-            booksApi.getAll(),
-            customersApi.getAll().catch(err => {
-                console.warn('Error fetching customers, trying with corrected endpoint');
-                return apiRequest('/customers/');
-            }),
-            salesApi.getAll()
-        ]);
-        
-        console.log('Data fetched:', { 
-            books: books?.length || 0, 
-            customers: customers?.length || 0, 
-            sales: sales?.length || 0 
-        });
-        
-        const totalBooks = books ? books.length : 0;
-        const totalSales = sales ? sales.length : 0;
-        const totalCustomers = customers ? customers.length : 0;
-        
-        let totalRevenue = 0;
-        if (sales && sales.length > 0) {
-            totalRevenue = sales.reduce((sum, sale) => {
-                const amount = typeof sale.total_amount === 'number' ? sale.total_amount : 0;
-                return sum + amount;
-            }, 0);
-        }
-        
-        console.log('Calculated stats:', { totalBooks, totalSales, totalCustomers, totalRevenue });
-        
-        totalBooksElement.textContent = totalBooks;
-        totalSalesElement.textContent = totalSales;
-        totalCustomersElement.textContent = totalCustomers;
-        totalRevenueElement.textContent = '$' + totalRevenue.toFixed(2);
-        
-    } catch (error) {
-        console.error('Error loading summary stats:', error);
         totalBooksElement.textContent = 'Error';
         totalSalesElement.textContent = 'Error';
         totalCustomersElement.textContent = 'Error';
         totalRevenueElement.textContent = 'Error';
-        throw error;
+        showError('Error loading dashboard data: ' + error.message);
     }
 }
 
-async function loadTopBooksChart() {
+function loadSummaryStats(summary) {
+    console.log('Summary stats:', summary);
+    
+    totalBooksElement.textContent = summary.total_books;
+    totalSalesElement.textContent = summary.total_sales;
+    totalCustomersElement.textContent = summary.total_customers;
+    totalRevenueElement.textContent = '$' + summary.total_revenue.toFixed(2);
+}
+
+function loadTopBooksChart(topBooks) {
     try {
-        console.log('Loading top books chart...');
-        
-        let topBooks;
-        try {
-            topBooks = await salesApi.getSalesByBook();
-        } catch (error) {
-            console.warn('Error fetching sales by book, trying alternative endpoint', error);
-            topBooks = await apiRequest('/sales/analytics/by-book');
-        }
-        
         console.log('Top books data:', topBooks);
         
         if (!topBooks || topBooks.length === 0) {
@@ -97,13 +52,8 @@ async function loadTopBooksChart() {
             return;
         }
         
-        const chartData = topBooks
-            .sort((a, b) => {
-                const soldA = a.TotalSold || a.totalSold || 0;
-                const soldB = b.TotalSold || b.totalSold || 0;
-                return soldB - soldA;
-            })
-            .slice(0, 7);
+        // Already ordered by copies sold and limited server-side
+        const chartData = topBooks;
 
         const ctx = document.getElementById('topBooksChart').getContext('2d');
         
@@ -114,10 +64,10 @@ async function loadTopBooksChart() {
         topBooksChart = new Chart(ctx, {
             type: 'bar',
             data: {
-                labels: chartData.map(book => book.Title || book.title || 'Unknown'),
+                labels: chartData.map(book => book.title || 'Unknown'),
                 datasets: [{
                     label: 'Copies Sold',
-                    data: chartData.map(book => book.TotalSold || book.totalSold || 0),
+                    data: chartData.map(book => book.total_sold || 0),
                     backgroundColor: 'rgba(54, 162, 235, 0.8)',
                     borderColor: 'rgba(54, 162, 235, 1)',
                     borderWidth: 1
@@ -168,28 +118,18 @@ async function loadTopBooksChart() {
     }
 }
 
-async function loadMonthlySalesChart() {
+function loadMonthlySalesChart(monthlySales) {
     try {
-        console.log('Loading monthly sales chart...');
-        
-        let monthlySalesData;
-        try {
-            monthlySalesData = await apiRequest('/sales/analytics/monthly-sales').catch(() => null);
-        } catch (error) {
-            console.warn('Error fetching monthly sales from API endpoint', error);
+        if (!monthlySales || monthlySales.length === 0) {
+            console.warn('No sales data available');
+            return;
         }
         
-        if (!monthlySalesData || monthlySalesData.length === 0) {
-            console.log('Calculating monthly sales from raw data...');
-            const sales = await salesApi.getAll();
-            
-            if (!sales || sales.length === 0) {
-                console.warn('No sales data available');
-                return;
-            }
-            
-            monthlySalesData = processMonthlyData(sales);
-        }
+        const monthlySalesData = {
+            labels: monthlySales.map(month => month.month),
+            salesData: monthlySales.map(month => month.books_sold),
+            revenueData: monthlySales.map(month => month.revenue)
+        };
         
         console.log('Monthly sales data:', monthlySalesData);
         
@@ -314,54 +254,8 @@ async function loadMonthlySalesChart() {
     }
 }
 
-function processMonthlyData(sales) {
-    const monthlySales = {};
-    
-    sales.forEach(sale => {
-        let month = '';
-        if (typeof sale.date === 'string' && sale.date.length >= 7) {
-            month = sale.date.substring(0, 7); // Format: YYYY-MM
-        } else {
-            return;
-        }
-        
-        if (!monthlySales[month]) {
-            monthlySales[month] = {
-                totalSales: 0,
-                totalRevenue: 0
-            };
-        }
-        
-        monthlySales[month].totalSales += (sale.quantity || 0);
-        
-        const amount = sale.total_amount || 
-                      (sale.book_price ? sale.quantity * sale.book_price : 0);
-        monthlySales[month].totalRevenue += amount;
-    });
-    
-    const months = Object.keys(monthlySales).sort();
-    const salesData = months.map(month => monthlySales[month].totalSales);
-    const revenueData = months.map(month => monthlySales[month].totalRevenue);
-    
-    return {
-        labels: months,
-        salesData: salesData,
-        revenueData: revenueData
-    };
-}
-
-async function loadAuthorRevenueChart() {
+function loadAuthorRevenueChart(authors) {
     try {
-        console.log('Loading author revenue chart...');
-        
-        let authors;
-        try {
-            authors = await salesApi.getBestsellingAuthors();
-        } catch (error) {
-            console.warn('Error fetching bestselling authors, trying alternative endpoint', error);
-            authors = await apiRequest('/sales/analytics/bestselling-authors');
-        }
-        
         console.log('Author revenue data:', authors);
         
         if (!authors || authors.length === 0) {
@@ -369,13 +263,8 @@ async function loadAuthorRevenueChart() {
             return;
         }
         
-        const chartData = authors
-            .sort((a, b) => {
-                const revenueA = a.TotalRevenue || a.totalRevenue || 0;
-                const revenueB = b.TotalRevenue || b.totalRevenue || 0;
-                return revenueB - revenueA;
-            })
-            .slice(0, 7);
+        // Already ordered by revenue and limited server-side
+        const chartData = authors;
         
         const ctx = document.getElementById('authorRevenueChart').getContext('2d');
         
@@ -386,9 +275,9 @@ async function loadAuthorRevenueChart() {
         authorRevenueChart = new Chart(ctx, {
             type: 'pie',
             data: {
-                labels: chartData.map(author => author.Author || author.author || 'Unknown'),
+                labels: chartData.map(author => author.author || 'Unknown'),
                 datasets: [{
-                    data: chartData.map(author => author.TotalRevenue || author.totalRevenue || 0),
+                    data: chartData.map(author => author.total_revenue || 0),
                     backgroundColor: [
                         'rgba(255, 99, 132, 0.8)',
                         'rgba(54, 162, 235, 0.8)',
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+def build_scratch_db(path, num_sales):
+    """Copy the real database and pad Sales so GET /sales/ is a genuinely slow query"""
+    shutil.copy(os.path.join(ROOT_DIR, 'db', 'bookstore.db'), path)
+    conn = sqlite3.connect(path)
+    book_ids = [row[0] for row in conn.execute("SELECT BookID FROM Books")]
+    customer_ids = [row[0] for row in conn.execute("SELECT CustomerID FROM Customers")]
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO Sales (BookID, CustomerID, Date, Quantity) VALUES (?, ?, ?, ?)",
+        ((rng.choice(book_ids), rng.choice(customer_ids), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", rng.randint(1, 4))
+         for _ in range(num_sales))
+    )
+    conn.commit()
+    conn.close()
+    return book_ids
+
+async def timed_get(client, url):
+    start = time.perf_counter()
+    response = await client.get(url)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+async def measure(client, book_ids, concurrency, slow_requests):
+    """Fire `concurrency` point lookups alongside a few full-table reads; return lookup latencies"""
+    slow = [asyncio.create_task(timed_get(client, '/sales/')) for _ in range(slow_requests)]
+    fast = [timed_get(client, f'/books/{book_ids[i % len(book_ids)]}') for i in range(concurrency)]
+    latencies = await asyncio.gather(*fast)
+    await asyncio.gather(*slow)
+    return sorted(latencies)
+
+async def main_async(args, book_ids):
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        print(f"GET /books/{{id}} latency with {args.slow} concurrent GET /sales/ over {args.sales} sales")
+        print(f"{'parallel':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        for concurrency in args.levels:
+            latencies = await measure(client, book_ids, concurrency, args.slow)
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+            print(f"{concurrency:>10} {p50:>10.1f} {p99:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure lookup tail latency while slow queries are in flight")
+    parser.add_argument('--sales', type=int, default=200000)
+    parser.add_argument('--slow', type=int, default=4, help="Concurrent GET /sales/ requests")
+    parser.add_argument('--levels', type=int, nargs='+', default=[100, 200, 400])
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp()
+    db_path = os.path.join(scratch_dir, 'bookstore.db')
+    try:
+        book_ids = build_scratch_db(db_path, args.sales)
+        os.environ['BOOKSTORE_DB_PATH'] = db_path
+        asyncio.run(main_async(args, book_ids))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
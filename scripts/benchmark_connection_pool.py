@@ -0,0 +1,71 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+def legacy_get_book_by_id(db_path, book_id):
+    """The pre-pool access pattern: connect, query, close"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM Books WHERE BookID = ?", (book_id,))
+    book = cursor.fetchone()
+    conn.close()
+    return book
+
+def run(lookup, book_ids, requests, threads):
+    """Run `requests` lookups spread over `threads` threads and return requests/sec"""
+    per_thread = requests // threads
+
+    def worker():
+        for i in range(per_thread):
+            lookup(book_ids[i % len(book_ids)])
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return per_thread * threads / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call connections against the connection pool")
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    # Work on a scratch copy so the benchmark never touches the real database
+    scratch_dir = tempfile.mkdtemp()
+    db_path = os.path.join(scratch_dir, 'bookstore.db')
+    shutil.copy(os.path.join(ROOT_DIR, 'db', 'bookstore.db'), db_path)
+    os.environ['BOOKSTORE_DB_PATH'] = db_path
+
+    from app.models.book import get_book_by_id
+    from app.connection import pool
+
+    conn = sqlite3.connect(db_path)
+    book_ids = [row[0] for row in conn.execute("SELECT BookID FROM Books")] or [1]
+    conn.close()
+
+    try:
+        before = run(lambda book_id: legacy_get_book_by_id(db_path, book_id), book_ids, args.requests, args.threads)
+        after = run(get_book_by_id, book_ids, args.requests, args.threads)
+    finally:
+        pool.close_all()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    print(f"get_book_by_id x{args.requests} on {args.threads} threads")
+    print(f"  per-call connection: {before:10.0f} req/s")
+    print(f"  connection pool:     {after:10.0f} req/s  ({after / before:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+def build_synthetic_db(path, num_sales, num_books=5000, num_customers=20000):
+    """Create a bookstore database with `num_sales` random sales"""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+    from bookstore_data_cleaning import create_tables
+    create_tables(cursor)
+    rng = random.Random(42)
+    cursor.executemany("INSERT INTO Books (Title, Author, Price) VALUES (?, ?, ?)",
+                       ((f"Book {i}", f"Author {i % 500}", round(rng.uniform(5, 50), 2)) for i in range(num_books)))
+    cursor.executemany("INSERT INTO Customers (Name, Email) VALUES (?, ?)",
+                       ((f"Customer {i}", f"customer{i}@example.com") for i in range(num_customers)))
+    cursor.executemany(
+        "INSERT INTO Sales (BookID, CustomerID, Date, Quantity) VALUES (?, ?, ?, ?)",
+        ((rng.randint(1, num_books), rng.randint(1, num_customers),
+          f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", rng.randint(1, 4))
+         for _ in range(num_sales))
+    )
+    conn.commit()
+    conn.close()
+
+def measure_export(fmt):
+    """Stream the sales export and return (rows, bytes, seconds, peak traced MB)"""
+    from app.controllers.sales_controller import SALE_EXPORT_FIELDS
+    from app.models.sales import iter_sales
+    from app.services.export_service import stream_export
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    total_bytes = 0
+    for chunk in stream_export(iter_sales(), SALE_EXPORT_FIELDS, fmt):
+        total_bytes += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total_bytes, elapsed, peak / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Show that sales exports stream in bounded memory")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+    args = parser.parse_args()
+
+    import resource
+
+    print(f"{'sales':>10} {'MB out':>10} {'seconds':>10} {'peak MB':>10} {'max RSS MB':>12}")
+    for size in args.sizes:
+        scratch_dir = tempfile.mkdtemp()
+        db_path = os.path.join(scratch_dir, 'bookstore.db')
+        try:
+            build_synthetic_db(db_path, size)
+            from app.connection import pool
+            pool.close_all()
+            pool.db_path = db_path
+            total_bytes, elapsed, peak = measure_export(args.format)
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"{size:>10} {total_bytes / 1024 / 1024:>10.1f} {elapsed:>10.2f} {peak:>10.2f} {max_rss:>12.1f}")
+            pool.close_all()
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+
+from app.migrations import apply_migrations
+from app.services.sales_summary_service import SUMMARIES
+from bookstore_data_cleaning import clean_and_import_data, create_tables, generate_sales_frame, import_sales_frame
+
+def fresh_db(path):
+    """Create an empty bookstore database with the current schema"""
+    conn = sqlite3.connect(path)
+    create_tables(conn.cursor())
+    conn.commit()
+    apply_migrations(conn)
+    return conn
+
+def row_by_row_import(conn, df):
+    """The previous import: a lookup query and an INSERT per book, customer and sale"""
+    cursor = conn.cursor()
+    for _, book in df[['title', 'author', 'price']].drop_duplicates().iterrows():
+        cursor.execute("SELECT BookID FROM Books WHERE Title = ? AND Author = ?", (book['title'], book['author']))
+        if not cursor.fetchone():
+            cursor.execute("INSERT INTO Books (Title, Author, Price) VALUES (?, ?, ?)",
+                           (book['title'], book['author'], float(book['price'])))
+    customer_id_map = {}
+    customers_df = df[['customer_name']].drop_duplicates()
+    customers_df['customer_email'] = df['customer_email']
+    for _, customer in customers_df.iterrows():
+        cursor.execute("SELECT CustomerID FROM Customers WHERE Name = ? OR Email = ?",
+                       (customer['customer_name'], customer['customer_email']))
+        result = cursor.fetchone()
+        if result:
+            customer_id_map[customer['customer_name']] = result[0]
+        else:
+            cursor.execute("INSERT INTO Customers (Name, Email) VALUES (?, ?)",
+                           (customer['customer_name'], customer['customer_email']))
+            customer_id_map[customer['customer_name']] = cursor.lastrowid
+    for _, sale in df.iterrows():
+        cursor.execute("SELECT BookID FROM Books WHERE Title = ? AND Author = ?", (sale['title'], sale['author']))
+        book_result = cursor.fetchone()
+        if book_result and sale['customer_name'] in customer_id_map:
+            cursor.execute("INSERT INTO Sales (BookID, CustomerID, Date, Quantity) VALUES (?, ?, ?, ?)",
+                           (book_result[0], customer_id_map[sale['customer_name']], sale['date'],
+                            int(sale['quantity'])))
+    conn.commit()
+
+def table_contents(conn):
+    """Every imported row, keyed by values rather than IDs, for comparing two imports"""
+    return (
+        sorted(conn.execute("SELECT Title, Author, Price FROM Books")),
+        sorted(conn.execute("SELECT Name, Email FROM Customers")),
+        sorted(conn.execute("""
+            SELECT b.Title, b.Author, c.Name, s.Date, s.Quantity
+            FROM Sales s JOIN Books b ON s.BookID = b.BookID JOIN Customers c ON s.CustomerID = c.CustomerID
+        """)),
+    )
+
+def summaries_consistent(conn):
+    """Whether every summary table matches a fresh aggregation of Sales"""
+    for table, (key, query) in SUMMARIES.items():
+        expected = {row[0]: row[1:] for row in conn.execute(query)}
+        stored = {row[0]: row[1:] for row in conn.execute(f"SELECT * FROM {table}")}
+        if expected.keys() != stored.keys() or not all(
+            math.isclose(a, b, rel_tol=1e-6) for k in expected for a, b in zip(expected[k], stored[k])
+        ):
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales import throughput: set-based engine against the row-by-row import")
+    parser.add_argument('--sales', type=int, default=2000000, help="Rows in the generated CSV")
+    parser.add_argument('--books', type=int, default=20000)
+    parser.add_argument('--customers', type=int, default=200000)
+    parser.add_argument('--baseline-sales', type=int, default=200000,
+                        help="Rows the row-by-row import is timed on (it is too slow for the full file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'sales.csv')
+        generate_sales_frame(args.sales, args.books, args.customers).to_csv(csv_path, index=False)
+        print(f"Generated {args.sales} rows ({os.path.getsize(csv_path) / 1e6:.0f} MB)")
+
+        # End to end: read, clean and import the whole file
+        start = time.perf_counter()
+        df = clean_and_import_data(csv_path, db_path=os.path.join(tmp, 'full.db'))
+        total = time.perf_counter() - start
+
+        # Both imports on the same cleaned rows, and a check that they write the same data
+        sample = df.head(args.baseline_sales)
+        timings = {}
+        contents = {}
+        for name, importer in (('row-by-row', row_by_row_import), ('set-based', import_sales_frame)):
+            conn = fresh_db(os.path.join(tmp, f'{name}.db'))
+            start = time.perf_counter()
+            importer(conn, sample)
+            timings[name] = time.perf_counter() - start
+            contents[name] = table_contents(conn), summaries_consistent(conn)
+            conn.close()
+
+    print(f"\nFull file: {len(df)} rows cleaned and imported in {total:.1f}s ({len(df) / total:,.0f} rows/sec)")
+    print(f"\n{'import':<12}{'rows':>10}{'seconds':>10}{'rows/sec':>12}")
+    for name, seconds in timings.items():
+        print(f"{name:<12}{len(sample):>10}{seconds:>10.2f}{len(sample) / seconds:>12,.0f}")
+    print(f"Speedup: {timings['row-by-row'] / timings['set-based']:.1f}x; "
+          f"same rows imported: {contents['row-by-row'][0] == contents['set-based'][0]}; "
+          f"summary tables consistent: {contents['row-by-row'][1] and contents['set-based'][1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+
+from benchmark_import import summaries_consistent, table_contents
+from bookstore_data_cleaning import generate_sales_frame, ingest_directory
+
+def write_store_files(raw_dir, num_files, rows_per_file, num_books, num_customers):
+    """One generated CSV per store and day, sharing a catalogue and customer base"""
+    os.makedirs(raw_dir, exist_ok=True)
+    for number in range(num_files):
+        df = generate_sales_frame(rows_per_file, num_books, num_customers, seed=number)
+        df.to_csv(os.path.join(raw_dir, f'store{number % 4 + 1}_day{number // 4 + 1:03d}.csv'), index=False)
+
+def quiet_ingest(raw_dir, db_path, workers):
+    """Ingest with the per-file progress silenced"""
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        return ingest_directory(raw_dir, db_path=db_path, workers=workers)
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the folder ingest by number of cleaning workers")
+    parser.add_argument('--files', type=int, default=24)
+    parser.add_argument('--rows', type=int, default=100000, help="Rows per file")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, 'raw')
+        write_store_files(raw_dir, args.files, args.rows, 20000, 200000)
+        print(f"{args.files} files of {args.rows} rows; {os.cpu_count()} CPUs\n")
+        print(f"{'workers':>8}{'seconds':>10}{'rows/sec':>12}{'sales':>10}")
+        contents = {}
+        for workers in dict.fromkeys(args.workers):
+            db_path = os.path.join(tmp, f'{workers}.db')
+            result = quiet_ingest(raw_dir, db_path, workers)
+            print(f"{workers:>8}{result.seconds:>10.2f}{result.rows / result.seconds:>12,.0f}{result.sales:>10}")
+            conn = sqlite3.connect(db_path)
+            contents[workers] = table_contents(conn), summaries_consistent(conn)
+            conn.close()
+
+        # A second run over the same folder finds every file in the manifest
+        rerun = quiet_ingest(raw_dir, db_path, workers)
+
+    results = list(contents.values())
+    print(f"\nSame rows imported: {all(c[0] == results[0][0] for c in results)}; "
+          f"summaries consistent: {all(c[1] for c in results)}")
+    print(f"Re-run: {rerun.skipped} of {args.files} files skipped, {rerun.sales} sales imported "
+          f"in {rerun.seconds:.2f}s")
+
+if __name__ == "__main__":
+    main()
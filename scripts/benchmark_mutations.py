@@ -0,0 +1,82 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+DATA_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+def legacy_create_sale(conn, book_id, customer_id, date, quantity):
+    """The old create_sale handler: INSERT, then read the row back with get_sale_by_id's query"""
+    sale_id = conn.execute(
+        "INSERT INTO Sales (BookID, CustomerID, Date, Quantity) VALUES (?, ?, ?, ?)",
+        (book_id, customer_id, date, quantity)
+    ).lastrowid
+    conn.commit()
+    return conn.execute("""
+        SELECT 
+            s.SaleID, s.BookID, b.Title as BookTitle, b.Price as BookPrice,
+            s.CustomerID, c.Name as CustomerName, s.Date, s.Quantity,
+            (s.Quantity * b.Price) as TotalAmount
+        FROM Sales s
+        JOIN Books b ON s.BookID = b.BookID
+        JOIN Customers c ON s.CustomerID = c.CustomerID
+        WHERE s.SaleID = ?
+    """, (sale_id,)).fetchone()
+
+def legacy_delete_sale(conn, sale_id):
+    """The old delete handler: SELECT to check existence, then DELETE"""
+    if conn.execute("SELECT SaleID FROM Sales WHERE SaleID = ?", (sale_id,)).fetchone() is None:
+        return False
+    conn.execute("DELETE FROM Sales WHERE SaleID = ?", (sale_id,))
+    conn.commit()
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare write-then-reread handlers against RETURNING")
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp()
+    db_path = os.path.join(scratch_dir, 'bookstore.db')
+    shutil.copy(os.path.join(ROOT_DIR, 'db', 'bookstore.db'), db_path)
+    os.environ['BOOKSTORE_DB_PATH'] = db_path
+
+    from app.connection import pool
+    from app.models.sales import add_sale, delete_sale
+
+    statements = []
+    pool.max_size = 1  # Every call goes through the single traced connection
+    with pool.connection() as conn:
+        conn.set_trace_callback(lambda sql: statements.append(sql) if sql.lstrip().upper().startswith(DATA_STATEMENTS) else None)
+
+    def run(label, create, delete):
+        statements.clear()
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            sale = create(1, 1, '2024-01-01', 1)
+            delete(sale['SaleID'])
+        elapsed = time.perf_counter() - start
+        per_call = len(statements) / (args.iterations * 2)
+        print(f"  {label:<22} {per_call:4.1f} statements/request  {args.iterations * 2 / elapsed:10.0f} requests/s")
+
+    def with_conn(func):
+        def call(*params):
+            with pool.connection() as conn:
+                return func(conn, *params)
+        return call
+
+    try:
+        print(f"create + delete sale x{args.iterations}")
+        run("write then re-read", with_conn(legacy_create_sale), with_conn(legacy_delete_sale))
+        run("RETURNING", add_sale, delete_sale)
+    finally:
+        pool.close_all()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
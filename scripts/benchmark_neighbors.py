@@ -0,0 +1,71 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+
+from bookstore_data_cleaning import generate_sales_frame
+from evaluate_recommendations import to_service_frames
+
+def neighbor_lists(backend, normalized, k):
+    """Run a backend over every customer, returning (neighbors, scores, seconds)"""
+    neighbors = np.full((normalized.shape[0], k), -1, dtype=np.int32)
+    scores = np.zeros((normalized.shape[0], k), dtype=np.float32)
+    start = time.perf_counter()
+    backend.fill(normalized, np.arange(normalized.shape[0]), neighbors, scores)
+    return neighbors, scores, time.perf_counter() - start
+
+def recall(exact, exact_scores, approx_scores):
+    """
+    Share of the exact top-k the approximate lists match
+
+    Many customers tie on similarity (e.g. everyone who bought the same two books),
+    and the exact backend keeps the lowest rows among them, so an approximate
+    neighbor counts as found if it is at least as similar as the exact k-th one.
+    """
+    counts = (exact >= 0).sum(axis=1)
+    rows = np.flatnonzero(counts)
+    kth = exact_scores[rows, counts[rows] - 1]
+    found = np.minimum((approx_scores[rows] >= kth[:, None] - 1e-6).sum(axis=1), counts[rows])
+    return found.sum() / counts.sum() if counts.sum() else 1.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and speed of the approximate neighbor backend against the exact one")
+    parser.add_argument('--sales', type=int, default=500000)
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--customers', type=int, default=50000)
+    parser.add_argument('-k', type=int, default=20, help="Neighbors kept per customer")
+    parser.add_argument('--tables', type=int, nargs='+', default=[8, 16, 32], help="LSH table counts to try")
+    parser.add_argument('--hashes', type=int, nargs='+', default=[1, 2], help="LSH min-hashes per table to try")
+    parser.add_argument('--max-bucket', type=int, nargs='+', default=[64], help="LSH bucket sample sizes to try")
+    args = parser.parse_args()
+
+    from Machine_Learning.recommendation.neighbor_search import ExactNeighbors, LSHNeighbors
+    from Machine_Learning.recommendation.recommendation_service import RecommendationService
+
+    books_df, sales_df = to_service_frames(generate_sales_frame(args.sales, args.books, args.customers))
+    service = RecommendationService(n_neighbors=0)
+    model = service.build(books_df, sales_df)
+    normalized = normalize(model.user_item_matrix, norm='l2', axis=1)
+    print(f"{normalized.shape[0]} customers x {normalized.shape[1]} books, {normalized.nnz} interactions, k = {args.k}")
+
+    exact, exact_scores, exact_seconds = neighbor_lists(ExactNeighbors(), normalized, args.k)
+    print(f"\n{'backend':<28}{'seconds':>10}{'speedup':>10}{'recall':>10}{'score ratio':>13}")
+    print(f"{'exact':<28}{exact_seconds:>10.2f}{1:>10.1f}{1:>10.4f}{1:>13.4f}")
+    for tables, hashes, max_bucket in itertools.product(args.tables, args.hashes, args.max_bucket):
+        backend = LSHNeighbors(tables=tables, hashes=hashes, max_bucket=max_bucket)
+        approx, approx_scores, seconds = neighbor_lists(backend, normalized, args.k)
+        # Total similarity kept, relative to the best possible lists
+        score_ratio = approx_scores.sum() / exact_scores.sum()
+        print(f"{f'lsh {tables}x{hashes} bucket {max_bucket}':<28}{seconds:>10.2f}{exact_seconds / seconds:>10.1f}"
+              f"{recall(exact, exact_scores, approx_scores):>10.4f}{score_ratio:>13.4f}")
+
+if __name__ == "__main__":
+    main()
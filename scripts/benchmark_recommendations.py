@@ -0,0 +1,87 @@
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+def synthetic_catalog(n_customers, n_books, purchases_per_customer, seed=42):
+    """Random books and sales with Zipf-like book popularity, as the service's DataFrames"""
+    rng = np.random.default_rng(seed)
+    books_df = pd.DataFrame({
+        'book_id': np.arange(1, n_books + 1),
+        'title': [f"Book {i}" for i in range(1, n_books + 1)],
+        'author': [f"Author {i % max(n_books // 10, 1)}" for i in range(1, n_books + 1)],
+        'price': rng.uniform(5, 50, n_books).round(2),
+    })
+    n_sales = n_customers * purchases_per_customer
+    popularity = 1.0 / np.arange(1, n_books + 1) ** 0.8
+    popularity /= popularity.sum()
+    sales_df = pd.DataFrame({
+        'sale_id': np.arange(1, n_sales + 1),
+        'book_id': rng.choice(books_df['book_id'].to_numpy(), size=n_sales, p=popularity),
+        'customer_id': rng.integers(1, n_customers + 1, size=n_sales),
+        'customer_name': '',
+        'date': pd.to_datetime('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, size=n_sales), unit='D'),
+        'quantity': rng.integers(1, 5, size=n_sales),
+    })
+    sales_df['date'] = sales_df['date'].dt.strftime('%Y-%m-%d')
+    return books_df, sales_df
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"  {label:<32} {time.perf_counter() - start:8.2f} s")
+    return result
+
+def report_latency(method, ids, n=10):
+    latencies = []
+    for item_id in ids:
+        start = time.perf_counter()
+        method(int(item_id), n=n)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    print(f"  {method.__name__} p50 {np.percentile(latencies, 50):.2f} ms, "
+          f"p99 {np.percentile(latencies, 99):.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark collaborative filtering build and query cost")
+    parser.add_argument('--customers', type=int, default=100000)
+    parser.add_argument('--books', type=int, default=50000)
+    parser.add_argument('--purchases', type=int, default=10, help="Purchases per customer")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--neighbor-search', default='exact', help="Customer neighbor backend: exact or lsh")
+    parser.add_argument('--collaborative', default='neighbors', help="Collaborative model: neighbors or als")
+    args = parser.parse_args()
+
+    # Save/load the model in a scratch directory rather than the real artifacts
+    os.environ['BOOKSTORE_RECOMMENDATION_MODELS'] = tempfile.mkdtemp(prefix='bookstore-models-')
+    from Machine_Learning.recommendation.recommendation_service import RecommendationService
+
+    print(f"{args.customers} customers x {args.books} books, {args.purchases} purchases each")
+    books_df, sales_df = timed("generate data", lambda: synthetic_catalog(args.customers, args.books, args.purchases))
+
+    service = RecommendationService(neighbor_search=args.neighbor_search, collaborative=args.collaborative)
+    model = timed("build matrix + neighbor index", lambda: service.build(books_df, sales_df))
+    print(f"  matrix nnz {model.user_item_matrix.nnz}, neighbor index {model.user_neighbors.nbytes / 1e6:.1f} MB")
+
+    timed("build top-k book neighbor table", lambda: service.build_book_neighbors(books_df))
+    timed("save model artifacts", service.save_model)
+
+    # A fresh service, as in a newly started worker, maps the saved model instead of building it
+    service = RecommendationService()
+    timed("load model (memory-mapped)", service.load_model)
+
+    rng = np.random.default_rng(0)
+    report_latency(service.get_collaborative_recommendations, rng.choice(model.user_ids, size=args.queries))
+    report_latency(service.get_content_based_recommendations, rng.choice(service.book_table.book_ids, size=args.queries))
+    print(f"  max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+
+import pandas as pd
+
+from benchmark_import import summaries_consistent, table_contents
+from bookstore_data_cleaning import clean_and_import_data, generate_sales_frame, stream_clean_and_import
+
+def write_raw_csv(path, num_sales, duplicate_rate, seed=42):
+    """Generated raw sales with `duplicate_rate` of the rows repeated later in the file"""
+    df = generate_sales_frame(num_sales, max(num_sales // 100, 10), max(num_sales // 10, 10), seed=seed)
+    repeats = df.sample(frac=duplicate_rate, random_state=seed)
+    pd.concat([df, repeats]).sample(frac=1, random_state=seed + 1).to_csv(path, index=False)
+
+def anonymous_rss_mb():
+    """This process's resident anonymous memory (Linux). Unlike total RSS it leaves out
+    the database pages SQLite memory-maps, which are file cache rather than import state."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) / 1024
+
+def sampled_peak(func, *args):
+    """Run func(*args), returning (its result, peak anonymous RSS MB sampled while it ran)"""
+    peak = [anonymous_rss_mb()]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.02):
+            peak[0] = max(peak[0], anonymous_rss_mb())
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    try:
+        return func(*args), peak[0]
+    finally:
+        done.set()
+        sampler.join()
+
+def run_import(mode, csv_path, db_path, output_path, chunksize):
+    """Run one import with its progress output silenced, returning (seconds, peak anonymous RSS MB)"""
+    sys.stdout = open(os.devnull, 'w')
+    start = time.perf_counter()
+    if mode == 'streaming':
+        _, peak = sampled_peak(stream_clean_and_import, csv_path, db_path, output_path, chunksize)
+    else:
+        _, peak = sampled_peak(lambda: clean_and_import_data(csv_path, db_path=db_path).to_csv(output_path, index=False))
+    return time.perf_counter() - start, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory and speed of the streaming import against the in-memory one")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200000, 1000000, 2000000])
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--duplicate-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    # Each import runs in a fresh interpreter, so its peak RSS is its own
+    context = multiprocessing.get_context('spawn')
+    print(f"{'rows':>10}{'mode':>12}{'seconds':>10}{'peak MB':>10}{'sales':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, 'raw.csv')
+            write_raw_csv(csv_path, size, args.duplicate_rate)
+            results = {}
+            for mode in ('in-memory', 'streaming'):
+                db_path = os.path.join(tmp, f'{mode}.db')
+                with context.Pool(1) as pool:
+                    seconds, peak = pool.apply(run_import, (mode, csv_path, db_path,
+                                                            os.path.join(tmp, f'{mode}.csv'), args.chunksize))
+                conn = sqlite3.connect(db_path)
+                results[mode] = table_contents(conn), summaries_consistent(conn)
+                sales = len(results[mode][0][2])
+                conn.close()
+                print(f"{size:>10}{mode:>12}{seconds:>10.2f}{peak:>10.0f}{sales:>10}")
+            cleaned = [pd.read_csv(os.path.join(tmp, f'{mode}.csv')) for mode in results]
+            print(f"{'':>10}same rows imported: {results['in-memory'][0] == results['streaming'][0]}; "
+                  f"summaries consistent: {results['in-memory'][1] and results['streaming'][1]}; "
+                  f"same cleaned output: {cleaned[0].equals(cleaned[1])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+
+import pandas as pd
+
+from benchmark_import import summaries_consistent
+from bookstore_data_cleaning import (clean_and_import_data, clean_sales_frame, generate_sales_frame,
+                                     stream_clean_and_import)
+
+# What identifies a sale once its book and customer are resolved
+SALE_COLUMNS = ['title', 'author', 'customer_name', 'date', 'quantity']
+
+def sales_count(db_path):
+    """Rows in Sales, and whether the summary tables match them"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM Sales").fetchone()[0], summaries_consistent(conn)
+    finally:
+        conn.close()
+
+def timed_import(importer, csv_path, db_path):
+    """Run one import with its progress output silenced, returning (seconds, Sales rows, summaries consistent)"""
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        importer(csv_path, db_path=db_path)
+    return (time.perf_counter() - start, *sales_count(db_path))
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that re-importing sales adds no duplicate rows")
+    parser.add_argument('--sales', type=int, default=1000000)
+    parser.add_argument('--min-speedup', type=float, default=2.0,
+                        help="How much faster the second import of the same file must be")
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(condition, message):
+        print(f"{'ok  ' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = generate_sales_frame(args.sales, 20000, 200000)
+        csv_path = os.path.join(tmp, 'sales.csv')
+        df.to_csv(csv_path, index=False)
+        db_path = os.path.join(tmp, 'bookstore.db')
+
+        # The same file twice
+        first = timed_import(clean_and_import_data, csv_path, db_path)
+        second = timed_import(clean_and_import_data, csv_path, db_path)
+        print(f"First import: {first[1]} sales in {first[0]:.2f}s; second: {second[1] - first[1]} new sales "
+              f"in {second[0]:.2f}s")
+        check(second[1] == first[1], "importing the same file twice adds no Sales rows")
+        check(first[0] / second[0] >= args.min_speedup,
+              f"the second import is at least {args.min_speedup}x faster ({first[0] / second[0]:.1f}x)")
+
+        # An export overlapping the first: its second half is new
+        overlap_path = os.path.join(tmp, 'overlap.csv')
+        new_rows = generate_sales_frame(args.sales // 2, 20000, 200000, start_date='2024-01-01', seed=7)
+        pd.concat([df.tail(args.sales // 2), new_rows]).to_csv(overlap_path, index=False)
+        _, overlapped, consistent = timed_import(clean_and_import_data, overlap_path, db_path)
+        # Raw rows that differ only in what cleaning normalizes are one sale
+        expected = len(clean_sales_frame(new_rows.copy(), verbose=False).drop_duplicates(SALE_COLUMNS))
+        check(overlapped - second[1] == expected,
+              f"an overlapping export adds only its new sales ({overlapped - second[1]} of {expected})")
+        check(consistent, "summary tables match the Sales rows")
+
+        # The streaming import sees the rows the in-memory one imported
+        _, streamed, _ = timed_import(stream_clean_and_import, overlap_path, db_path)
+        check(streamed == overlapped, "the streaming import skips the rows already imported")
+
+    if failures:
+        print(f"{len(failures)} checks failed")
+        sys.exit(1)
+    print("Re-imports are idempotent")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+
+from bookstore_data_cleaning import generate_sales_frame
+from evaluate_recommendations import to_service_frames
+
+def create_database(db_path, books_df, sales_df):
+    """The tables the recommendation service reads, filled from the service frames"""
+    conn = sqlite3.connect(db_path)
+    books_df.rename(columns={'book_id': 'BookID', 'title': 'Title', 'author': 'Author', 'price': 'Price'}) \
+        .to_sql('Books', conn, index=False)
+    sales_df[['customer_id', 'customer_name']].drop_duplicates('customer_id') \
+        .rename(columns={'customer_id': 'CustomerID', 'customer_name': 'Name'}).to_sql('Customers', conn, index=False)
+    conn.execute("CREATE TABLE Sales (SaleID INTEGER PRIMARY KEY, BookID INTEGER, CustomerID INTEGER, "
+                 "Date TEXT, Quantity INTEGER)")
+    conn.commit()
+    return conn
+
+def add_sales(conn, sales_df):
+    conn.executemany(
+        "INSERT INTO Sales (SaleID, BookID, CustomerID, Date, Quantity) VALUES (?, ?, ?, ?, ?)",
+        sales_df[['sale_id', 'book_id', 'customer_id', 'date', 'quantity']].astype(str).itertuples(index=False)
+    )
+    conn.commit()
+
+def neighbor_ids(model):
+    """Each customer's neighbor customer IDs (-1 padded) and scores, in customer ID order"""
+    order = np.argsort(model.user_ids)
+    neighbors = model.user_neighbors[order]
+    ids = np.where(neighbors >= 0, model.user_ids[np.maximum(neighbors, 0)], -1)
+    return model.user_ids[order], ids, model.user_neighbor_scores[order]
+
+def boundary_ties(model):
+    """Customers with a full neighbor list whose k-th score is shared by another customer left out"""
+    k = model.user_neighbors.shape[1]
+    if k == 0:
+        return 0
+    full = np.flatnonzero(model.user_neighbors[:, -1] >= 0)
+    normalized = normalize(model.user_item_matrix, norm='l2', axis=1)
+    sims = (normalized[full] @ normalized.T).tocsr()
+    ties = 0
+    for offset, row in enumerate(full):
+        row_sims = sims.data[sims.indptr[offset]:sims.indptr[offset + 1]]
+        ties += np.isclose(row_sims, model.user_neighbor_scores[row, -1], rtol=0, atol=1e-6).sum() > \
+            np.isclose(model.user_neighbor_scores[row], model.user_neighbor_scores[row, -1], rtol=0, atol=1e-6).sum()
+    return ties
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that incremental refreshes match a full rebuild")
+    parser.add_argument('--sales', type=int, default=20000)
+    parser.add_argument('--books', type=int, default=500)
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('-k', type=int, default=10, help="Neighbors kept per customer")
+    parser.add_argument('--refreshes', type=int, default=5, help="Batches of new sales folded in after the first build")
+    args = parser.parse_args()
+
+    from app.popularity import PopularityRankings
+    from Machine_Learning.recommendation.recommendation_service import RecommendationService
+
+    failures = []
+
+    def check(condition, message):
+        print(f"{'ok  ' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    books_df, sales_df = to_service_frames(generate_sales_frame(args.sales, args.books, args.customers))
+    # IDs that fall as sales arrive, so the customers and books a refresh appends to the
+    # matrix sort before the existing ones and row order alone can't settle ties
+    sales_df['customer_id'] = sales_df['customer_id'].max() + 1 - sales_df['customer_id']
+    sales_df['book_id'] = len(books_df) + 1 - sales_df['book_id']
+    books_df['book_id'] = len(books_df) + 1 - books_df['book_id']
+    batches = np.array_split(np.arange(len(sales_df)), [len(sales_df) // 2] + [
+        len(sales_df) // 2 + i * (len(sales_df) // 2) // args.refreshes for i in range(1, args.refreshes)
+    ])
+
+    # Customers without neighbors fall back to the same bestsellers in both services
+    popularity = PopularityRankings()
+    popularity.load_sales(sales_df)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = create_database(os.path.join(tmp, 'bookstore.db'), books_df, sales_df)
+        add_sales(conn, sales_df.iloc[batches[0]])
+        incremental = RecommendationService(conn=conn, n_neighbors=args.k, neighbor_search='exact',
+                                            popularity=popularity)
+        incremental.build()
+        for batch in batches[1:]:
+            add_sales(conn, sales_df.iloc[batch])
+            incremental.refresh()
+        rebuilt = RecommendationService(conn=conn, n_neighbors=args.k, neighbor_search='exact', popularity=popularity)
+        rebuilt.build()
+
+        refreshed_model, rebuilt_model = incremental.snapshot, rebuilt.snapshot
+        ties = boundary_ties(rebuilt_model)
+        print(f"{len(rebuilt_model.user_ids)} customers, {len(sales_df)} sales in {len(batches)} batches, "
+              f"{ties} neighbor lists with ties at the k-th score")
+        check(ties > 0, "the data has ties at the neighbor list cut")
+
+        refreshed_ids, refreshed_neighbors, refreshed_scores = neighbor_ids(refreshed_model)
+        rebuilt_ids, rebuilt_neighbors, rebuilt_scores = neighbor_ids(rebuilt_model)
+        check(np.array_equal(refreshed_ids, rebuilt_ids), "the refreshed model has the rebuilt model's customers")
+        differing = (refreshed_neighbors != rebuilt_neighbors).any(axis=1).sum()
+        check(differing == 0, f"neighbor lists match the rebuild ({differing} customers differ)")
+        check(np.allclose(refreshed_scores, rebuilt_scores, atol=1e-6), "neighbor scores match the rebuild")
+
+        customer_ids = rebuilt_ids.tolist()
+        refreshed_recs = incremental.get_batch_recommendations(customer_ids)
+        rebuilt_recs = rebuilt.get_batch_recommendations(customer_ids)
+        differing = sum(
+            [r['book_id'] for r in refreshed_recs[c]] != [r['book_id'] for r in rebuilt_recs[c]] for c in customer_ids
+        )
+        check(differing == 0, f"recommendations match the rebuild ({differing} customers differ)")
+        conn.close()
+
+    if failures:
+        print(f"{len(failures)} checks failed")
+        sys.exit(1)
+    print("Incremental refreshes match a full rebuild")
+
+if __name__ == "__main__":
+    main()
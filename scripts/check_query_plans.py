@@ -0,0 +1,119 @@
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'analytics'))
+
+# A plan step that walks the whole Sales table or a whole index on it (covering or not),
+# rather than searching it
+SALES_SCAN = re.compile(r'^SCAN (Sales|s)\b')
+
+# The only scan allowed on a request path: a rowid-order walk with nothing to sort, which
+# a LIMIT stops after one page (the unfiltered first page of GET /sales)
+BOUNDED_PAGE_SCAN = re.compile(r'^SCAN (Sales|s)$')
+
+# Analytics reports that aggregate every sale by design, so must read all of Sales; they are
+# offline reports, not request paths. Their scans are listed but don't fail the check.
+WHOLE_TABLE_REPORTS = {'monthly_sales', 'customer_spending', 'price_range_analysis'}
+
+def model_queries():
+    """Run the read paths of the model layer once and capture the SQL each call executes"""
+    from app.connection import pool
+    from app.models import book, customer, sales
+
+    calls = [
+        ('books page', book.get_all_books, dict(limit=50)),
+        ('books count', book.count_books, dict()),
+        ('books filtered page', book.get_all_books, dict(after_id=10, limit=50, author='George Orwell')),
+        ('book', book.get_book_by_id, dict(book_id=1)),
+        ('customers page', customer.get_all_customers, dict(after_id=10, limit=50)),
+        ('customers count', customer.count_customers, dict()),
+        ('customers by name', customer.get_all_customers, dict(name='Alice')),
+        ('customer', customer.get_customer_by_id, dict(customer_id=1)),
+        # What GET /sales/ runs unfiltered: the first page, a later page and the total
+        ('sales first page', sales.get_all_sales, dict(limit=50)),
+        ('sales later page', sales.get_all_sales, dict(after_id=10, limit=50)),
+        ('sales count', sales.count_sales, dict()),
+        ('sales by customer', sales.get_all_sales, dict(customer_id=1, limit=50)),
+        ('sales by book', sales.get_all_sales, dict(book_id=1, limit=50)),
+        ('sales by date', sales.get_all_sales, dict(start_date='2024-01-01', end_date='2024-01-31', limit=50)),
+        ('sales count by customer', sales.count_sales, dict(customer_id=1)),
+        ('sales count by book', sales.count_sales, dict(book_id=1)),
+        ('sales count by date', sales.count_sales, dict(start_date='2024-01-01', end_date='2024-01-31')),
+        ('sale', sales.get_sale_by_id, dict(sale_id=1)),
+        ('sales by book totals', sales.get_sales_by_book, dict()),
+        ('bestselling authors', sales.get_bestselling_authors, dict()),
+        ('top customers', sales.get_top_customers, dict()),
+    ]
+
+    captured = []
+    current = [None]  # Label of the call being traced
+    pool.max_size = 1  # Every call goes through the single traced connection
+    with pool.connection() as conn:
+        conn.set_trace_callback(lambda sql: captured.append((current[0], sql, ())))
+
+    for label, func, kwargs in calls:
+        current[0] = label
+        func(**kwargs)
+
+    with pool.connection() as conn:
+        conn.set_trace_callback(None)
+    return [(label, sql, params) for label, sql, params in captured if sql.lstrip().upper().startswith('SELECT')]
+
+def analytics_queries():
+    """Capture the SQL behind every report in analytics/sales_analysis.py"""
+    import sales_analysis
+
+    queries = []
+    for report in (sales_analysis.top_selling_books, sales_analysis.sales_by_author, sales_analysis.monthly_sales,
+                   sales_analysis.customer_spending, sales_analysis.price_range_analysis):
+        sales_analysis.run_query = lambda query, params=None: queries.append((report.__name__, query, params or ()))
+        report()
+    return queries
+
+def main():
+    scratch_dir = tempfile.mkdtemp()
+    db_path = os.path.join(scratch_dir, 'bookstore.db')
+    shutil.copy(os.path.join(ROOT_DIR, 'db', 'bookstore.db'), db_path)
+    os.environ['BOOKSTORE_DB_PATH'] = db_path
+
+    from app.migrations import apply_migrations
+
+    conn = sqlite3.connect(db_path)
+    apply_migrations(conn)
+
+    failures = 0
+    try:
+        for source, sql, params in model_queries() + analytics_queries():
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            scans = [step for step in plan if SALES_SCAN.match(step)]
+            if not scans:
+                continue
+            bounded = (all(BOUNDED_PAGE_SCAN.match(step) for step in scans)
+                       and not any('TEMP B-TREE' in step for step in plan)
+                       and re.search(r'\bLIMIT (\?|\d+)\s*$', sql))
+            if bounded:
+                continue
+            if source in WHOLE_TABLE_REPORTS:
+                print(f"REPORT SCAN (allowed) [{source}] {' '.join(sql.split())}")
+            else:
+                failures += 1
+                print(f"FULL SCAN [{source}] {' '.join(sql.split())}")
+            for step in plan:
+                print(f"    {step}")
+    finally:
+        conn.close()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    if failures:
+        print(f"{failures} queries scan the Sales table or a whole index on it")
+        sys.exit(1)
+    print("No request-path query scans the Sales table or a whole index on it")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'data'))
+
+from bookstore_data_cleaning import generate_sales_frame
+
+# Recommendation strategies compared, in report order
+STRATEGIES = ('collaborative', 'content', 'personalized', 'popular')
+
+def to_service_frames(raw):
+    """Turn raw generated sales into the books/sales DataFrames the service is built from"""
+    raw = raw.dropna(subset=['quantity']).sort_values('date', kind='stable').reset_index(drop=True)
+    book_codes, book_keys = pd.factorize(pd.MultiIndex.from_frame(raw[['title', 'author']]))
+    customer_codes, _ = pd.factorize(raw['customer_name'])
+
+    prices = raw.groupby(book_codes)['price'].first()
+    books_df = pd.DataFrame({
+        'book_id': np.arange(1, len(book_keys) + 1),
+        'title': book_keys.get_level_values(0),
+        'author': book_keys.get_level_values(1),
+        'price': prices.to_numpy(),
+    })
+    sales_df = pd.DataFrame({
+        'sale_id': np.arange(1, len(raw) + 1),  # In date order, like IDs assigned as sales arrive
+        'book_id': book_codes + 1,
+        'customer_id': customer_codes + 1,
+        'customer_name': raw['customer_name'],
+        'date': raw['date'],
+        'quantity': raw['quantity'].astype(int),
+    })
+    return books_df, sales_df
+
+def time_split(sales_df, test_fraction):
+    """Train on the earliest sales, test on the latest `test_fraction` of days"""
+    cutoff = np.sort(sales_df['date'].unique())[int(sales_df['date'].nunique() * (1 - test_fraction))]
+    return sales_df[sales_df['date'] < cutoff], sales_df[sales_df['date'] >= cutoff], cutoff
+
+def measured(func):
+    """Run func, returning (result, seconds, peak traced MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def evaluation_customers(train, test, max_customers, seed):
+    """Customers seen in training who bought something new in the test period, with those books"""
+    owned = train.groupby('customer_id')['book_id'].apply(set)
+    relevant = {}
+    for customer_id, books in test.groupby('customer_id')['book_id']:
+        if customer_id in owned.index:
+            new_books = set(books) - owned[customer_id]
+            if new_books:
+                relevant[customer_id] = new_books
+    customers = np.array(sorted(relevant))
+    if len(customers) > max_customers:
+        customers = np.random.default_rng(seed).choice(customers, size=max_customers, replace=False)
+    last_books = train.sort_values(['date', 'sale_id']).groupby('customer_id')['book_id'].last()
+    return [(int(c), relevant[c], int(last_books[c])) for c in customers]
+
+def evaluate(service, strategy, customers, k, n_books):
+    calls = {
+        'collaborative': lambda customer_id, last_book: service.get_collaborative_recommendations(customer_id, n=k),
+        'content': lambda customer_id, last_book: service.get_content_based_recommendations(last_book, n=k),
+        'personalized': lambda customer_id, last_book: service.get_personalized_recommendations(customer_id, n=k),
+        'popular': lambda customer_id, last_book: service.get_popular_books(n=k),
+    }
+    call = calls[strategy]
+    latencies, precisions, recalls = [], [], []
+    recommended = set()
+    for customer_id, relevant, last_book in customers:
+        start = time.perf_counter()
+        results = call(customer_id, last_book)
+        latencies.append(time.perf_counter() - start)
+        books = {r['book_id'] for r in results}
+        hits = len(books & relevant)
+        precisions.append(hits / k)
+        recalls.append(hits / len(relevant))
+        recommended |= books
+    latencies = np.array(latencies) * 1000
+    return {
+        f'precision@{k}': float(np.mean(precisions)),
+        f'recall@{k}': float(np.mean(recalls)),
+        'coverage': len(recommended) / n_books,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+def regressions(report, baseline, quality_tolerance, latency_tolerance, latency_floor_ms):
+    """Metrics that got worse than the baseline by more than the allowed tolerance"""
+    problems = []
+    for strategy, metrics in report['strategies'].items():
+        before = baseline.get('strategies', {}).get(strategy)
+        if not before:
+            continue
+        for name, value in metrics.items():
+            if name not in before:
+                continue
+            if name.endswith('_ms') and name != 'build_ms':
+                # Sub-millisecond latencies are noisy, so small absolute changes never count
+                limit = max(before[name] * (1 + latency_tolerance), before[name] + latency_floor_ms)
+                if value > limit:
+                    problems.append(f"{strategy} {name}: {value:.3f} > {limit:.3f}")
+            elif name.startswith(('precision', 'recall', 'coverage')):
+                limit = before[name] * (1 - quality_tolerance)
+                if value < limit:
+                    problems.append(f"{strategy} {name}: {value:.4f} < {limit:.4f}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline quality and speed evaluation of the recommendation strategies")
+    parser.add_argument('--sales', type=int, default=200000)
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--test-fraction', type=float, default=0.2, help="Share of days held out for testing")
+    parser.add_argument('-k', type=int, default=10, help="Recommendations per query")
+    parser.add_argument('--eval-customers', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--neighbor-search', default='exact', help="Customer neighbor backend: exact or lsh")
+    parser.add_argument('--collaborative', default='neighbors', help="Collaborative model: neighbors or als")
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    parser.add_argument('--baseline', help="Fail if metrics regressed against this JSON report")
+    parser.add_argument('--quality-tolerance', type=float, default=0.05, help="Allowed relative drop in quality metrics")
+    parser.add_argument('--latency-tolerance', type=float, default=0.5, help="Allowed relative increase in latency")
+    parser.add_argument('--latency-floor-ms', type=float, default=0.5, help="Latency increases below this are ignored")
+    args = parser.parse_args()
+
+    from Machine_Learning.recommendation.recommendation_service import RecommendationService
+
+    raw = generate_sales_frame(args.sales, args.books, args.customers, seed=args.seed)
+    books_df, sales_df = to_service_frames(raw)
+    train, test, cutoff = time_split(sales_df, args.test_fraction)
+    customers = evaluation_customers(train, test, args.eval_customers, args.seed)
+    print(f"{len(train)} training sales before {cutoff}, {len(test)} test sales, "
+          f"{len(customers)} customers evaluated, k = {args.k}")
+
+    service = RecommendationService(neighbor_search=args.neighbor_search, collaborative=args.collaborative)
+    _, model_seconds, model_mb = measured(lambda: service.build(books_df, train))
+    _, books_seconds, books_mb = measured(lambda: service.build_book_neighbors(books_df))
+    builds = {
+        'collaborative': (model_seconds, model_mb),
+        'content': (books_seconds, books_mb),
+        'personalized': (model_seconds + books_seconds, max(model_mb, books_mb)),
+        'popular': (model_seconds, model_mb),
+    }
+
+    report = {'config': vars(args), 'strategies': {}}
+    print(f"\n{'strategy':<15}{'prec@k':>9}{'recall@k':>10}{'coverage':>10}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'build s':>9}{'peak MB':>9}")
+    for strategy in STRATEGIES:
+        metrics = evaluate(service, strategy, customers, args.k, len(books_df))
+        build_seconds, peak_mb = builds[strategy]
+        metrics.update(build_ms=build_seconds * 1000, peak_mb=peak_mb)
+        report['strategies'][strategy] = metrics
+        print(f"{strategy:<15}{metrics[f'precision@{args.k}']:>9.4f}{metrics[f'recall@{args.k}']:>10.4f}"
+              f"{metrics['coverage']:>10.4f}{metrics['p50_ms']:>9.3f}{metrics['p99_ms']:>9.3f}"
+              f"{build_seconds:>9.2f}{peak_mb:>9.0f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = regressions(report, json.load(f), args.quality_tolerance,
+                                   args.latency_tolerance, args.latency_floor_ms)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmark_recommendations import synthetic_catalog
+
+METHODS = ('get_collaborative_recommendations', 'get_content_based_recommendations',
+           'get_personalized_recommendations', 'get_popular_books')
+LABELS = ('collaborative', 'content', 'personalized', 'popular')
+
+def build_service(n_customers, n_books, n_neighbors, purchases=10):
+    from Machine_Learning.recommendation.recommendation_service import RecommendationService
+
+    books_df, sales_df = synthetic_catalog(n_customers, n_books, purchases)
+    service = RecommendationService(n_neighbors=n_neighbors)
+    service.build(books_df, sales_df)
+    service.build_book_neighbors(books_df)
+    return service
+
+def call_args(service, method, rng, queries):
+    model = service.snapshot
+    if method == 'get_content_based_recommendations':
+        return rng.choice(service.book_table.book_ids, size=queries)
+    if method == 'get_popular_books':
+        return [None] * queries
+    return rng.choice(model.user_ids, size=queries)
+
+def median_ms(service, method, queries, n=10):
+    func = getattr(service, method)
+    rng = np.random.default_rng(0)
+    latencies = []
+    for arg in call_args(service, method, rng, queries):
+        start = time.perf_counter()
+        func(n=n) if arg is None else func(int(arg), n=n)
+        latencies.append(time.perf_counter() - start)
+    return np.median(latencies) * 1000
+
+def print_row(label, service, queries):
+    timings = [median_ms(service, method, queries) for method in METHODS]
+    print(f"{label:<32}" + "".join(f"{t:>14.3f}" for t in timings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Show how per-call recommendation latency scales with k and catalog size")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 4000, 16000], help="Catalog sizes (books); customers are 5x")
+    parser.add_argument('--neighbors', type=int, nargs='+', default=[5, 20, 80], help="Values of k (similar customers kept)")
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--profile', action='store_true', help="cProfile personalized recommendations at the largest size")
+    args = parser.parse_args()
+
+    header = f"{'':<32}" + "".join(f"{label:>14}" for label in LABELS)
+    print("Median ms per call, k = 20, varying catalog size")
+    print(header)
+    for size in args.sizes:
+        service = build_service(size * 5, size, 20)
+        print_row(f"{size * 5} customers x {size} books", service, args.queries)
+
+    size = args.sizes[-1]
+    print(f"\nMedian ms per call, {size * 5} customers x {size} books, varying k")
+    print(header)
+    for k in args.neighbors:
+        service = build_service(size * 5, size, k)
+        print_row(f"k = {k}", service, args.queries)
+
+    if args.profile:
+        rng = np.random.default_rng(1)
+        customers = rng.choice(service.snapshot.user_ids, size=args.queries)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        for customer_id in customers:
+            service.get_personalized_recommendations(int(customer_id), n=10)
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+if __name__ == "__main__":
+    main()